@@ -1,34 +1,44 @@
 from flask import Flask
-from app.extensions import db, migrate, jwt
+from app.extensions import db, jwt, init_migrate
+from app.blueprints import register_blueprints, defer_blueprints
+from app.json_provider import JSONProvider
+from app.cache import tour_cache
+from app.pool import init_pool_telemetry, pool_options
+from app.replicas import init_replica_routing, replica_binds
+from app.passwords import hasher
+from app.images import images
+from app.revocation import revocations
+from app.profiling import init_profiling
 
-# Import Blueprints from controllers
-from app.controllers.accommodation_controllers.accommodation_controllers import accommodations
-from app.controllers.customer_controllers.customer_controllers import customer
-from app.controllers.payments_contollers.payments_controllers import payments
-from app.controllers.tour_assignment_controllers.tour_assignment_controllers import tour_assignments
-from app.controllers.tour_controllers.tour_controllers import tours
-from app.controllers.tour_guide_controllers.tour_guide_controllers import tour_guides
-from app.controllers.user_controller.user_controller import users
-from app.controllers.booking_controllers.booking_controllers import bookings
-from app.models import accomodations
-
-def create_app():
+def create_app(lazy=None):
+    """Build the app. `lazy` (default: the LAZY_BLUEPRINTS setting) defers the
+    controllers and Flask-Migrate to the first request or CLI command; see
+    app/blueprints.py.
+    """
     app = Flask(__name__)
+    app.json = JSONProvider(app)
     app.config.from_object('config.Config')
+    if lazy is None:
+        lazy = app.config.get('LAZY_BLUEPRINTS', False)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', pool_options(app.config))
+    app.config['SQLALCHEMY_BINDS'] = replica_binds(app.config)
 
     db.init_app(app)
-    migrate.init_app(app, db)
+    init_pool_telemetry(app)
+    init_profiling(app)
+    init_replica_routing(app)
     jwt.init_app(app)
+    tour_cache.init_app(app, 'TOUR_CACHE')
+    hasher.init_app(app)
+    images.init_app(app)
+    revocations.init_app(app)
 
-    # Registering Blueprints
-    app.register_blueprint(customer)
-    app.register_blueprint(accommodations)
-    app.register_blueprint(payments)
-    app.register_blueprint(tour_assignments)
-    app.register_blueprint(tours)
-    app.register_blueprint(tour_guides)
-    app.register_blueprint(users)
-    app.register_blueprint(bookings)
+    # Registering Blueprints (from the manifest in app/blueprints.py)
+    if lazy:
+        defer_blueprints(app)
+    else:
+        init_migrate(app)
+        register_blueprints(app)
 
     @app.route('/')
     def home():
@@ -0,0 +1,408 @@
+import asyncio
+import sys
+from io import BytesIO
+from urllib.parse import parse_qs
+
+from asgiref.wsgi import WsgiToAsgi
+from flask import jsonify, request
+from flask_jwt_extended import verify_jwt_in_request
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import joinedload, selectinload
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import Map, Rule
+
+from app.availability import available_tours_filter, availability_args
+from app.cache import tour_cache, tour_key, tour_page_key
+from app.conditional import version_of, is_not_modified, with_version, not_modified
+from app.fieldsets import fieldset, FieldsError
+from app.models.accomodations import Accomodation
+from app.models.booking import Booking
+from app.models.tour import Tour
+from app.pagination import keyset_query, keyset_page, PaginationError
+from app.pool import pool_options
+from app.profiling import instrument_engine
+from app.revocation import revocations
+from app.serializers import (
+    accommodation_serializer, booking_serializer, booking_detail_serializer, tour_serializer
+)
+from app.status_codes import (
+    HTTP_200_OK, HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND, HTTP_500_INTERNAL_SERVER_ERROR
+)
+
+# ASGI serving mode.
+#
+# `uvicorn asgi:application` serves the API from an event loop. GETs of the
+# tour, accommodation and booking listings and details are answered by the
+# coroutines below, which query through an async SQLAlchemy engine: a request
+# waiting on the database holds no thread, so concurrency is bounded by the
+# connection pool instead of the worker's threads. Every other request
+# (writes, the other blueprints, booking exports) goes to the Flask app
+# unchanged on asgiref's thread pool, so the URL layout is the same.
+#
+# The coroutines run inside a Flask request context built from the ASGI
+# scope, so JWT checks, before/after_request hooks, error handlers, page args,
+# conditional GETs and the serializers behave as they do under WSGI. They read
+# the primary only (replica routing is per-thread, see app/replicas.py). The
+# JWT check is a dict lookup except when the revocation index has to read
+# revoked_token through the sync session; verify_jwt() then runs it on a
+# thread so the blocking query never stalls the loop.
+#
+# The engine URL is SQLALCHEMY_ASYNC_DATABASE_URI, or SQLALCHEMY_DATABASE_URI
+# with the backend's async driver from ASYNC_DRIVERS swapped in. Its pool uses
+# the DB_POOL_* settings.
+
+ASYNC_DRIVERS = {'sqlite': 'aiosqlite', 'mysql': 'aiomysql', 'postgresql': 'asyncpg'}
+
+_url_map = Map()
+_views = {}
+
+
+def route(rule, wsgi_args=()):
+    """Serve GET `rule` with the decorated coroutine; requests carrying any of
+    `wsgi_args` are left to the Flask view instead."""
+    def register(view):
+        _url_map.add(Rule(rule, endpoint=view.__name__, methods=['GET']))
+        view.wsgi_args = wsgi_args
+        _views[view.__name__] = view
+        return view
+    return register
+
+
+async def verify_jwt():
+    """verify_jwt_in_request(), on a thread when its revocation check may query the database."""
+    if revocations.may_query():
+        # to_thread copies the context, so the thread sees this request and its session
+        await asyncio.to_thread(verify_jwt_in_request)
+    else:
+        verify_jwt_in_request()
+
+
+def async_database_uri(config):
+    uri = config.get('SQLALCHEMY_ASYNC_DATABASE_URI')
+    if uri:
+        return uri
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'No async driver known for {backend}; set SQLALCHEMY_ASYNC_DATABASE_URI')
+    return url.set(drivername=f'{backend}+{ASYNC_DRIVERS[backend]}')
+
+
+def async_engine_options(config):
+    options = pool_options(config)
+    # Async engines need an asyncio-aware pool; keep the sizes, drop TimedQueuePool.
+    options.pop('poolclass', None)
+    return options
+
+
+def _environ(scope):
+    """A WSGI environ for a body-less request from its ASGI scope."""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f'HTTP/{scope["http_version"]}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        value = value.decode('latin-1')
+        environ[name] = f'{environ[name]},{value}' if name in environ else value
+    return environ
+
+
+class AsyncApp:
+    """ASGI application: async views for the read routes, Flask for the rest."""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = WsgiToAsgi(flask_app)
+        self.engine = create_async_engine(async_database_uri(flask_app.config),
+                                          **async_engine_options(flask_app.config))
+        instrument_engine(self.engine.sync_engine)
+        self.session = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        match = self._match(scope) if scope['type'] == 'http' else None
+        if match is None:
+            return await self.wsgi(scope, receive, send)
+        await self._dispatch(scope, send, *match)
+
+    def _match(self, scope):
+        if scope['method'] != 'GET':
+            return None
+        try:
+            endpoint, kwargs = _url_map.bind('', path_info=scope['path']).match(method='GET')
+        except HTTPException:
+            return None  # unknown path or slash redirect: Flask answers it
+        view = _views[endpoint]
+        if view.wsgi_args:
+            args = parse_qs(scope['query_string'].decode('latin-1'))
+            if any(args.get(arg) for arg in view.wsgi_args):
+                return None
+        return view, kwargs
+
+    async def _dispatch(self, scope, send, view, kwargs):
+        # Flask.wsgi_app and full_dispatch_request, with the view awaited.
+        app = self.flask_app
+        environ = _environ(scope)
+        ctx = app.request_context(environ)
+        error = None
+        try:
+            ctx.push()
+            try:
+                rv = app.preprocess_request()
+                if rv is None:
+                    async with self.session() as session:
+                        rv = await view(session, **kwargs)
+            except Exception as e:
+                rv = app.handle_user_exception(e)
+            response = app.finalize_request(rv)
+        except Exception as e:
+            error = e
+            response = app.handle_exception(e)
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': response.status_code,
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                            for name, value in response.get_wsgi_headers(environ).to_wsgi_list()],
+            })
+            await send({'type': 'http.response.body', 'body': response.get_data()})
+        finally:
+            ctx.pop(error)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+# Async views. Each mirrors the Flask view of the same name and must stay in
+# step with it. An async session cannot lazy-load during serialization, so
+# whatever a view reads must be in its fieldset's loader options.
+
+@route('/api/v1/tours/')
+async def get_all_tours(session):
+    await verify_jwt()
+    try:
+        async def load_page():
+            query, limit, sort = keyset_query(select(Tour), Tour)
+            tours_list, next_cursor = keyset_page((await session.scalars(query)).all(), limit, sort)
+            return version_of(*tours_list, next_cursor=next_cursor), tour_serializer.many(tours_list), next_cursor
+
+        fields = fieldset(tour_serializer)
+        key = tour_page_key(*(request.args.get(arg) for arg in ('limit', 'after', 'sort')))
+        version, data, next_cursor = await tour_cache.get_or_load_async(key, load_page)
+        version = fields.vary(version)
+        if is_not_modified(version):
+            return not_modified(version)
+
+        data = fields.project(data)
+        return with_version(jsonify({
+            'message': 'All tours retrieved successfully',
+            'total': len(data),
+            'tours': data,
+            'next_cursor': next_cursor
+        }), version), HTTP_200_OK
+
+    except (PaginationError, FieldsError) as e:
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
+
+
+@route('/api/v1/tours/availability')
+async def get_tour_availability(session):
+    await verify_jwt()
+    try:
+        date_from, date_to, people = availability_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
+
+    try:
+        fields = fieldset(tour_serializer, extra=('start_date',))
+        query, limit, sort = keyset_query(
+            select(Tour).options(*fields.options()).where(*available_tours_filter(date_from, date_to, people)),
+            Tour, sort_keys=('start_date', 'id', 'created_at'), default_sort='start_date'
+        )
+        tours_list, next_cursor = keyset_page((await session.scalars(query)).all(), limit, sort)
+        version = fields.version(tours_list, next_cursor)
+        if is_not_modified(version):
+            return not_modified(version)
+
+        data = fields.serializer.many(tours_list)
+
+        return with_version(jsonify({
+            'message': 'Available tours retrieved successfully',
+            'total': len(data),
+            'tours': data,
+            'next_cursor': next_cursor
+        }), version), HTTP_200_OK
+
+    except (PaginationError, FieldsError) as e:
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
+
+
+@route('/api/v1/tours/<int:id>')
+async def get_tour(session, id):
+    await verify_jwt()
+    try:
+        async def load_tour():
+            tour = await session.get(Tour, id)
+            return (version_of(tour), tour_serializer(tour)) if tour else None
+
+        fields = fieldset(tour_serializer)
+        cached = await tour_cache.get_or_load_async(tour_key(id), load_tour)
+
+        if not cached:
+            return jsonify({'error': 'Tour not found'}), HTTP_404_NOT_FOUND
+
+        version, data = cached
+        version = fields.vary(version)
+        if is_not_modified(version):
+            return not_modified(version)
+
+        return with_version(jsonify({
+            'message': 'Tour details retrieved',
+            'tour': fields.project(data)
+        }), version), HTTP_200_OK
+
+    except FieldsError as e:
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
+
+
+@route('/api/v1/accommodations/')
+async def get_all_accommodations(session):
+    await verify_jwt()
+    try:
+        fields = fieldset(accommodation_serializer)
+        query, limit, sort = keyset_query(select(Accomodation).options(*fields.options()), Accomodation)
+        accommodations_list, next_cursor = keyset_page((await session.scalars(query)).all(), limit, sort)
+        version = fields.version(accommodations_list, next_cursor)
+        if is_not_modified(version):
+            return not_modified(version)
+
+        data = fields.serializer.many(accommodations_list)
+
+        return with_version(jsonify({
+            'message': 'All accommodations retrieved successfully',
+            'total': len(data),
+            'accommodations': data,
+            'next_cursor': next_cursor
+        }), version), HTTP_200_OK
+
+    except (PaginationError, FieldsError) as e:
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
+
+
+@route('/api/v1/accommodations/<int:id>')
+async def get_accommodation(session, id):
+    await verify_jwt()
+    try:
+        fields = fieldset(accommodation_serializer)
+        acc = await session.get(Accomodation, id, options=fields.options())
+
+        if not acc:
+            return jsonify({'error': 'Accommodation not found'}), HTTP_404_NOT_FOUND
+
+        version = fields.version([acc])
+        if is_not_modified(version):
+            return not_modified(version)
+
+        return with_version(jsonify({
+            'message': 'Accommodation details retrieved',
+            'accommodation': fields.serializer(acc)
+        }), version), HTTP_200_OK
+
+    except FieldsError as e:
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
+
+
+# ?format= exports stream from a sync generator, so Flask serves them.
+@route('/api/v1/bookings/', wsgi_args=('format',))
+async def get_all_bookings(session):
+    await verify_jwt()
+    try:
+        fields = fieldset(booking_serializer)
+        query, limit, sort = keyset_query(select(Booking).options(*fields.options(selectinload)), Booking)
+        bookings_list, next_cursor = keyset_page((await session.scalars(query)).all(), limit, sort)
+        version = fields.version(bookings_list, next_cursor)
+        if is_not_modified(version):
+            return not_modified(version)
+
+        data = fields.serializer.many(bookings_list)
+
+        return with_version(jsonify({
+            'message': 'All bookings retrieved successfully',
+            'total': len(data),
+            'bookings': data,
+            'next_cursor': next_cursor
+        }), version), HTTP_200_OK
+
+    except (PaginationError, FieldsError) as e:
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
+
+
+@route('/api/v1/bookings/<int:id>')
+async def get_booking(session, id):
+    await verify_jwt()
+    try:
+        fields = fieldset(booking_detail_serializer)
+        booking = await session.get(Booking, id, options=fields.options(joinedload))
+        if not booking:
+            return jsonify({'error': 'Booking not found'}), HTTP_404_NOT_FOUND
+
+        version = fields.version([booking])
+        if is_not_modified(version):
+            return not_modified(version)
+
+        return with_version(jsonify({
+            'message': 'Booking details retrieved',
+            'booking': fields.serializer(booking)
+        }), version), HTTP_200_OK
+
+    except FieldsError as e:
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
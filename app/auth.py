@@ -0,0 +1,94 @@
+from functools import wraps
+
+from flask import g, jsonify
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
+
+from app.extensions import jwt
+from app.models.users import User
+from app.revocation import revocations
+from app.status_codes import HTTP_403_FORBIDDEN
+
+# Authorization helpers.
+#
+# Access tokens carry the user's type as a `user_type` claim, so "is this an
+# admin / the owner?" is answered from the token without touching the DB.
+# When a handler really needs the User row, load_current_user() fetches it at
+# most once per request. Logged-out tokens are rejected from the in-memory
+# index in app.revocation, also without a query.
+
+_MISSING = object()
+
+
+@jwt.user_identity_loader
+def user_identity_lookup(identity):
+    # Tokens can be created from a User or from a plain id.
+    if isinstance(identity, User):
+        return str(identity.id)
+    return str(identity)
+
+
+@jwt.additional_claims_loader
+def add_user_claims(identity):
+    if isinstance(identity, User):
+        return {'user_type': identity.user_type}
+    return {}
+
+
+@jwt.token_in_blocklist_loader
+def check_if_token_revoked(jwt_header, jwt_payload):
+    return revocations.is_revoked(jwt_payload)
+
+
+def current_user_id():
+    return int(get_jwt_identity())
+
+
+def load_current_user():
+    """The logged-in User, loaded lazily and memoized for the request."""
+    user = g.get('_current_user', _MISSING)
+    if user is _MISSING:
+        user = User.query.get(current_user_id())
+        g._current_user = user
+    return user
+
+
+def current_user_type():
+    user_type = get_jwt().get('user_type')
+    if user_type is None:
+        # Tokens issued before the claim existed: fall back to the DB once.
+        user = load_current_user()
+        user_type = user.user_type if user else None
+    return user_type
+
+
+def is_admin():
+    return current_user_type() == 'admin'
+
+
+def is_owner_or_admin(owner_id):
+    return owner_id == current_user_id() or is_admin()
+
+
+def admin_required(message='Admin access required'):
+    def wrapper(fn):
+        @wraps(fn)
+        @jwt_required()
+        def decorator(*args, **kwargs):
+            if not is_admin():
+                return jsonify({'error': message}), HTTP_403_FORBIDDEN
+            return fn(*args, **kwargs)
+        return decorator
+    return wrapper
+
+
+def owner_or_admin(message='Not authorized', param='id'):
+    """Allow admins, or the user whose id is the `param` URL argument."""
+    def wrapper(fn):
+        @wraps(fn)
+        @jwt_required()
+        def decorator(*args, **kwargs):
+            if not is_owner_or_admin(kwargs.get(param)):
+                return jsonify({'error': message}), HTTP_403_FORBIDDEN
+            return fn(*args, **kwargs)
+        return decorator
+    return wrapper
@@ -0,0 +1,178 @@
+from datetime import date
+
+from sqlalchemy import event, func, inspect, select, update
+
+from app.extensions import db
+from app.models.booking import Booking
+from app.models.tour import Tour
+from app.cache import mark_tours_changed
+
+# Seat availability for tours.
+#
+# Tour.seats_booked is a running total of the people on the tour's active
+# bookings. Booking writes adjust it with an atomic
+# UPDATE tour SET seats_booked = seats_booked + n in the same flush, so
+# "which tours have N free seats" is a plain indexed query on tour and never
+# sums bookings per request.
+#
+# Adding seats is a conditional UPDATE that only matches while they fit
+# (seats_booked + n <= max_group_size), so concurrent bookings cannot
+# overbook a tour: a write whose UPDATE matches no row raises
+# SeatsUnavailable out of the flush, and the handler answers 409.
+
+INACTIVE_BOOKING_STATUSES = ('cancelled',)
+
+_tour_table = Tour.__table__
+
+
+def seats_held(tour_id, people, status):
+    """(tour_id, seats) a booking with these values holds; 0 seats unless it is active."""
+    if tour_id is None or status in INACTIVE_BOOKING_STATUSES:
+        return None, 0
+    return tour_id, people or 0
+
+
+def _previous(state, name):
+    history = state.attrs[name].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(state.object, name)
+
+
+class SeatsUnavailable(Exception):
+    """Raised when a booking write needs more seats than its tour has left."""
+
+    def __init__(self, tour_id, seats):
+        super().__init__(f'Not enough seats on tour {tour_id}: {seats} more needed')
+        self.tour_id = tour_id
+        self.seats = seats
+
+
+def _add_seats(tour_id, seats):
+    # Matches no row when the seats don't fit (or the tour is gone).
+    return (
+        update(_tour_table)
+        .where(_tour_table.c.id == tour_id)
+        .where(_tour_table.c.seats_booked + seats <= _tour_table.c.max_group_size)
+        .values(seats_booked=_tour_table.c.seats_booked + seats)
+    )
+
+
+def _adjust(connection, tour_id, delta):
+    if tour_id is None or not delta:
+        return
+    if delta > 0:
+        if connection.execute(_add_seats(tour_id, delta)).rowcount != 1:
+            raise SeatsUnavailable(tour_id, delta)
+        return
+    connection.execute(
+        update(_tour_table)
+        .where(_tour_table.c.id == tour_id)
+        .values(seats_booked=_tour_table.c.seats_booked + delta)
+    )
+
+
+def reserve_seats(tour_id, seats):
+    """Add `seats` to a tour only if they fit; returns False when full.
+
+    For Core bulk inserts, which bypass the Booking mapper events below.
+    """
+    result = db.session.execute(_add_seats(tour_id, seats))
+    mark_tours_changed(db.session, [tour_id])
+    return result.rowcount == 1
+
+
+def resize_tour(tour_id, max_group_size):
+    """Set a tour's max_group_size unless more seats are already booked; returns False then.
+
+    A conditional UPDATE rather than a read and a write, so a booking
+    committed in between cannot be left over the new size.
+    """
+    result = db.session.execute(
+        update(_tour_table)
+        .where(_tour_table.c.id == tour_id)
+        .where(_tour_table.c.seats_booked <= max_group_size)
+        .values(max_group_size=max_group_size)
+    )
+    mark_tours_changed(db.session, [tour_id])
+    return result.rowcount == 1
+
+
+def availability_args(args):
+    """(date_from, date_to, people) from ?from=&to=&people=; ValueError says what is wrong."""
+    try:
+        date_from = date.fromisoformat(args['from']) if args.get('from') else None
+        date_to = date.fromisoformat(args['to']) if args.get('to') else None
+        people = int(args.get('people', 1))
+    except ValueError:
+        raise ValueError('from/to must be YYYY-MM-DD dates and people an integer')
+
+    if people < 1:
+        raise ValueError('people must be at least 1')
+    if date_from and date_to and date_from > date_to:
+        raise ValueError('from must not be after to')
+    return date_from, date_to, people
+
+
+def available_tours_filter(date_from=None, date_to=None, people=1):
+    """Criteria for tours that run inside [date_from, date_to] with `people` free seats."""
+    criteria = [Tour.max_group_size - Tour.seats_booked >= people]
+    if date_from:
+        criteria.append(Tour.start_date >= date_from)
+    if date_to:
+        # start_date <= end_date, so this bound is implied; it lets the
+        # (start_date, end_date) index serve the date window.
+        criteria += [Tour.end_date <= date_to, Tour.start_date <= date_to]
+    return criteria
+
+
+def available_tours_query(date_from=None, date_to=None, people=1):
+    """Tours that run inside [date_from, date_to] with `people` free seats."""
+    return Tour.query.filter(*available_tours_filter(date_from, date_to, people))
+
+
+def rebuild_seat_counts():
+    """Recompute every tour's seats_booked from bookings (backfill)."""
+    totals = (
+        select(func.coalesce(func.sum(Booking.number_of_people), 0))
+        .where(Booking.tour_id == _tour_table.c.id)
+        .where(Booking.status.notin_(INACTIVE_BOOKING_STATUSES))
+        .scalar_subquery()
+    )
+    db.session.execute(update(_tour_table).values(seats_booked=totals))
+    db.session.commit()
+
+
+# Load the old value when these are reassigned on an expired Booking, so
+# _move_seats can see what the booking held before.
+for _attr in (Booking.tour_id, Booking.number_of_people, Booking.status):
+    event.listen(_attr, 'set', lambda *args: None, active_history=True)
+
+
+@event.listens_for(Booking, 'after_insert')
+def _book_seats(mapper, connection, target):
+    tour_id, seats = seats_held(target.tour_id, target.number_of_people, target.status)
+    _adjust(connection, tour_id, seats)
+
+
+@event.listens_for(Booking, 'after_update')
+def _move_seats(mapper, connection, target):
+    state = inspect(target)
+    if not any(state.attrs[name].history.has_changes()
+               for name in ('tour_id', 'number_of_people', 'status')):
+        return
+    old_tour, old_seats = seats_held(_previous(state, 'tour_id'),
+                                     _previous(state, 'number_of_people'),
+                                     _previous(state, 'status'))
+    new_tour, new_seats = seats_held(target.tour_id, target.number_of_people, target.status)
+    if old_tour == new_tour:
+        _adjust(connection, new_tour, new_seats - old_seats)
+    else:
+        _adjust(connection, old_tour, -old_seats)
+        _adjust(connection, new_tour, new_seats)
+
+
+@event.listens_for(Booking, 'before_delete')
+def _release_seats(mapper, connection, target):
+    tour_id, seats = seats_held(target.tour_id, target.number_of_people, target.status)
+    _adjust(connection, tour_id, -seats)
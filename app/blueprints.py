@@ -0,0 +1,100 @@
+import threading
+
+import click
+from werkzeug.utils import import_string
+
+from app.extensions import init_migrate
+
+# Blueprint manifest and lazy registration.
+#
+# BLUEPRINTS lists every blueprint by import path, so create_app() only has
+# to import the controllers (and through them the models, serializers and
+# their dependencies) when it registers them. With LAZY_BLUEPRINTS on,
+# create_app() registers none of them: the first request that reaches the
+# app registers them all before it is dispatched, so workers boot quickly
+# and pay the imports once, on their first request. CLI commands in lazy
+# mode load everything before they run. Each one may write through the
+# models and needs every mapper event in place, and `flask db migrate`
+# needs every table.
+#
+# BLUEPRINT_COMMANDS names the blueprints with CLI commands, whose groups
+# are registered as placeholders until then;
+# `python -m benchmarks.startup_time` checks both lists against the app.
+
+BLUEPRINTS = (
+    'app.controllers.customer_controllers.customer_controllers:customer',
+    'app.controllers.accommodation_controllers.accommodation_controllers:accommodations',
+    'app.controllers.payments_contollers.payments_controllers:payments',
+    'app.controllers.tour_assignment_controllers.tour_assignment_controllers:tour_assignments',
+    'app.controllers.tour_controllers.tour_controllers:tours',
+    'app.controllers.tour_guide_controllers.tour_guide_controllers:tour_guides',
+    'app.controllers.user_controller.user_controller:users',
+    'app.controllers.booking_controllers.booking_controllers:bookings',
+    'app.controllers.system_controllers.system_controllers:system',
+    'app.controllers.image_controllers.image_controllers:images',
+)
+
+BLUEPRINT_COMMANDS = ('payments', 'system', 'tour_assignments', 'tours', 'users')
+
+_register_lock = threading.Lock()
+
+
+def register_blueprints(app):
+    """Import and register every blueprint in the manifest (once per app)."""
+    with _register_lock:
+        if app.extensions.get('blueprints_registered'):
+            return
+        for path in BLUEPRINTS:
+            app.register_blueprint(import_string(path))
+        app.extensions['blueprints_registered'] = True
+
+
+class _DeferredBlueprints:
+    """WSGI wrapper that registers the blueprints before the first request."""
+
+    def __init__(self, app, wsgi_app):
+        self.app = app
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        if not self.app.extensions.get('blueprints_registered'):
+            register_blueprints(self.app)
+        return self.wsgi_app(environ, start_response)
+
+
+class _LazyGroup(click.Group):
+    """Placeholder CLI group that loads the real one when it is used."""
+
+    def __init__(self, name, load, **kwargs):
+        super().__init__(name, **kwargs)
+        self._load = load
+
+    def make_context(self, info_name, args, parent=None, **extra):
+        # Hand over to the real group so its own options and callback run.
+        return self._load().make_context(info_name, args, parent=parent, **extra)
+
+    def list_commands(self, ctx):
+        return self._load().list_commands(ctx)
+
+    def get_command(self, ctx, name):
+        return self._load().get_command(ctx, name)
+
+
+def defer_blueprints(app):
+    """Register the blueprints, migrations and their CLI groups on first use."""
+    app.wsgi_app = _DeferredBlueprints(app, app.wsgi_app)
+
+    def load_migrate():
+        register_blueprints(app)
+        init_migrate(app)
+        return app.cli.commands['db']
+
+    def load_blueprint_commands(name):
+        def load():
+            register_blueprints(app)
+            return app.blueprints[name].cli
+        return load
+
+    app.cli.add_command(_LazyGroup('db', load_migrate, help='Perform database migrations.'))
+    for name in BLUEPRINT_COMMANDS:
+        app.cli.add_command(_LazyGroup(name, load_blueprint_commands(name)))
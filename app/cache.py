@@ -0,0 +1,149 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.models.booking import Booking
+from app.models.tour import Tour
+
+# In-process read-through caches.
+#
+# LRUCache is a size-bounded, TTL-limited LRU map with hit/miss counters.
+# Readers use get_or_load(); writers never touch the cache directly: the
+# session hooks at the bottom of this file record which tours a transaction
+# changed and invalidate them once it commits. Each worker process has its
+# own cache, so the TTL bounds how long another worker can serve a stale
+# entry.
+
+
+class LRUCache:
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so a load that raced with a write is
+        # not stored (it may have read the old row).
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def init_app(self, app, prefix):
+        self.max_entries = app.config.get(f'{prefix}_MAX_ENTRIES', self.max_entries)
+        self.ttl = app.config.get(f'{prefix}_TTL', self.ttl)
+        self.clear()
+
+    def get_or_load(self, key, load):
+        found, value, generation = self._lookup(key)
+        if not found:
+            value = load()
+            self._store(key, value, generation)
+        return value
+
+    async def get_or_load_async(self, key, load):
+        """get_or_load() for a coroutine function `load` (see app/asgi.py)."""
+        found, value, generation = self._lookup(key)
+        if not found:
+            value = await load()
+            self._store(key, value, generation)
+        return value
+
+    def _lookup(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > now:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return True, entry[1], None
+            self.misses += 1
+            return False, None, self._generation
+
+    def _store(self, key, value, generation):
+        with self._lock:
+            if generation == self._generation:
+                self._data[key] = (time.monotonic() + self.ttl, value)
+                self._data.move_to_end(key)
+                while len(self._data) > self.max_entries:
+                    self._data.popitem(last=False)
+                    self.evictions += 1
+
+    def invalidate(self, keys=(), match=None):
+        """Drop `keys`, plus every key for which match(key) is true."""
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._data.pop(key, None)
+            if match is not None:
+                for key in [key for key in self._data if match(key)]:
+                    del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._data),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+# Tour catalog: ('tour', id) for get_tour, ('tours', ...page args) for pages.
+tour_cache = LRUCache()
+
+
+def tour_key(tour_id):
+    return ('tour', tour_id)
+
+
+def tour_page_key(*page_args):
+    return ('tours',) + tuple(page_args)
+
+
+def _is_tour_page(key):
+    return key[0] == 'tours'
+
+
+def mark_tours_changed(session, tour_ids):
+    session.info.setdefault('changed_tours', set()).update(
+        tour_id for tour_id in tour_ids if tour_id is not None
+    )
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_tours(session, flush_context):
+    changed = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Tour):
+            changed.add(obj.id)
+        elif isinstance(obj, Booking):
+            # Booking writes move Tour.seats_booked (see app.availability).
+            changed.add(obj.tour_id)
+            changed.update(inspect(obj).attrs.tour_id.history.deleted)
+    if changed:
+        mark_tours_changed(session, changed)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_tours(session):
+    changed = session.info.pop('changed_tours', None)
+    if changed:
+        # A changed tour can move between or alter any page, so pages go too.
+        tour_cache.invalidate([tour_key(tour_id) for tour_id in changed], match=_is_tour_page)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_changed_tours(session):
+    session.info.pop('changed_tours', None)
@@ -0,0 +1,61 @@
+import hashlib
+from datetime import timezone
+
+from flask import request, make_response
+
+from app.status_codes import HTTP_304_NOT_MODIFIED
+
+# Conditional GET support (ETag / Last-Modified -> 304).
+#
+# A response's version is derived from the (table, id, updated_at) of the rows
+# it is built from, which the handler has loaded anyway, plus a list page's
+# next_cursor (rows added or removed after the page change it). If the client
+# already holds that version we answer 304 before serializing anything.
+#
+# Timestamps are stored as naive local time (datetime.now), so they are
+# converted to UTC for Last-Modified.
+
+
+def _changed_at(obj):
+    return obj.updated_at or obj.created_at
+
+
+def version_of(*objs, next_cursor=None):
+    """Return (etag, last_modified) for the given model instances and page cursor."""
+    parts = []
+    last_modified = None
+    for obj in objs:
+        if obj is None:
+            continue
+        changed = _changed_at(obj)
+        parts.append(f'{obj.__tablename__}:{obj.id}:{changed.isoformat() if changed else ""}')
+        if changed and (last_modified is None or changed > last_modified):
+            last_modified = changed
+    if next_cursor:
+        parts.append(f'next:{next_cursor}')
+    etag = hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+    if last_modified is not None:
+        last_modified = last_modified.astimezone(timezone.utc)
+    return etag, last_modified
+
+
+def is_not_modified(version):
+    etag, last_modified = version
+    # If-None-Match wins over If-Modified-Since when both are sent (RFC 7232).
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if request.if_modified_since and last_modified:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def with_version(response, version):
+    etag, last_modified = version
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    return response
+
+
+def not_modified(version):
+    return with_version(make_response('', HTTP_304_NOT_MODIFIED), version)
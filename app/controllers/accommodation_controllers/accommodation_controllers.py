@@ -1,13 +1,17 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from app.status_codes import (
     HTTP_400_BAD_REQUEST, HTTP_409_CONFLICT, HTTP_500_INTERNAL_SERVER_ERROR,
     HTTP_201_CREATED, HTTP_401_UNAUTHORIZED, HTTP_200_OK, HTTP_404_NOT_FOUND,
     HTTP_403_FORBIDDEN
 )
 from app.models.accomodations import Accomodation
-from app.models.users import User
 from app.extensions import db
+from app.auth import current_user_id, is_owner_or_admin
+from app.pagination import keyset_paginate, PaginationError
+from app.conditional import is_not_modified, with_version, not_modified
+from app.fieldsets import fieldset, FieldsError
+from app.serializers import accommodation_serializer
 
 # Accommodations Blueprint
 accommodations = Blueprint('accommodations', __name__, url_prefix='/api/v1/accommodations')
@@ -18,31 +22,21 @@ accommodations = Blueprint('accommodations', __name__, url_prefix='/api/v1/accom
 def create_accommodation():
     data = request.get_json()
     name = data.get('name')
-    location = data.get('location')
-    price = data.get('price')
-    description = data.get('description')
-    image = data.get('image')
-    start_date = data.get('start_date')
-    end_date = data.get('end_date')
-    company_id = data.get('company_id')
-    user_id = get_jwt_identity()
-
-    if not name or not location or not price or not description or not start_date or not end_date or not company_id:
+    address = data.get('address')
+    accommodation_type = data.get('type')
+    user_id = current_user_id()
+
+    if not name or not address or not accommodation_type:
         return jsonify({'error': 'All fields are required'}), HTTP_400_BAD_REQUEST
 
-    if accommodations.query.filter_by(name=name, user_id=user_id).first():
+    if Accomodation.query.filter_by(full_names=name, user_id=user_id).first():
         return jsonify({'error': 'You already created an accommodation with this name'}), HTTP_409_CONFLICT
 
     try:
-        new_accommodation = accommodations(
-            name=name,
-            location=location,
-            price=price,
-            description=description,
-            image=image,
-            start_date=start_date,
-            end_date=end_date,
-            company_id=company_id,
+        new_accommodation = Accomodation(
+            full_names=name,
+            address=address,
+            type=accommodation_type,
             user_id=user_id
         )
         db.session.add(new_accommodation)
@@ -50,24 +44,7 @@ def create_accommodation():
 
         return jsonify({
             'message': f'Accommodation "{name}" created successfully',
-            'accommodation': {
-                'name': new_accommodation.name,
-                'location': new_accommodation.location,
-                'price': new_accommodation.price,
-                'description': new_accommodation.description,
-                'image': new_accommodation.image,
-                'start_date': new_accommodation.start_date,
-                'end_date': new_accommodation.end_date,
-                'company': {
-                    'id': new_accommodation.company.id,
-                    'name': new_accommodation.company.first_name,
-                    'origin': new_accommodation.company.origin
-                },
-                'creator': {
-                    'name': new_accommodation.user.get_full_name(),
-                    'email': new_accommodation.user.email
-                }
-            }
+            'accommodation': accommodation_serializer(new_accommodation)
         }), HTTP_201_CREATED
 
     except Exception as e:
@@ -80,25 +57,23 @@ def create_accommodation():
 @jwt_required()
 def get_all_accommodations():
     try:
-        accommodations_list = accommodations.query.all()
-        data = []
-
-        for acc in accommodations_list:
-            data.append({
-                'id': acc.id,
-                'name': acc.name,
-                'location': acc.location,
-                'price': acc.price,
-                'description': acc.description,
-                'start_date': acc.start_date,
-                'end_date': acc.end_date
-            })
+        fields = fieldset(accommodation_serializer)
+        accommodations_list, next_cursor = keyset_paginate(Accomodation.query.options(*fields.options()), Accomodation)
+        version = fields.version(accommodations_list, next_cursor)
+        if is_not_modified(version):
+            return not_modified(version)
 
-        return jsonify({
+        data = fields.serializer.many(accommodations_list)
+
+        return with_version(jsonify({
             'message': 'All accommodations retrieved successfully',
             'total': len(data),
-            'accommodations': data
-        }), HTTP_200_OK
+            'accommodations': data,
+            'next_cursor': next_cursor
+        }), version), HTTP_200_OK
+
+    except (PaginationError, FieldsError) as e:
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
 
     except Exception as e:
         return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
@@ -109,22 +84,23 @@ def get_all_accommodations():
 @jwt_required()
 def get_accommodation(id):
     try:
-        acc = accommodations.query.get(id)
+        fields = fieldset(accommodation_serializer)
+        acc = Accomodation.query.options(*fields.options()).get(id)
 
         if not acc:
             return jsonify({'error': 'Accommodation not found'}), HTTP_404_NOT_FOUND
 
-        return jsonify({
+        version = fields.version([acc])
+        if is_not_modified(version):
+            return not_modified(version)
+
+        return with_version(jsonify({
             'message': 'Accommodation details retrieved',
-            'accommodation': {
-                'name': acc.name,
-                'location': acc.location,
-                'price': acc.price,
-                'description': acc.description,
-                'start_date': acc.start_date,
-                'end_date': acc.end_date
-            }
-        }), HTTP_200_OK
+            'accommodation': fields.serializer(acc)
+        }), version), HTTP_200_OK
+
+    except FieldsError as e:
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
 
     except Exception as e:
         return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
@@ -134,26 +110,19 @@ def get_accommodation(id):
 @accommodations.route('/edit/<int:id>', methods=['PUT', 'PATCH'])
 @jwt_required()
 def update_accommodation(id):
-    current_user = get_jwt_identity()
-    user = User.query.get(current_user)
-
-    acc = accommodations.query.get(id)
+    acc = Accomodation.query.get(id)
     if not acc:
         return jsonify({'error': 'Accommodation not found'}), HTTP_404_NOT_FOUND
 
-    if user.user_type != 'admin' and acc.user_id != current_user:
+    if not is_owner_or_admin(acc.user_id):
         return jsonify({'error': 'Not authorized to update this accommodation'}), HTTP_403_FORBIDDEN
 
     try:
         data = request.get_json()
 
-        acc.name = data.get('name', acc.name)
-        acc.location = data.get('location', acc.location)
-        acc.price = data.get('price', acc.price)
-        acc.description = data.get('description', acc.description)
-        acc.image = data.get('image', acc.image)
-        acc.start_date = data.get('start_date', acc.start_date)
-        acc.end_date = data.get('end_date', acc.end_date)
+        acc.full_names = data.get('name', acc.full_names)
+        acc.address = data.get('address', acc.address)
+        acc.type = data.get('type', acc.type)
 
         db.session.commit()
 
@@ -168,14 +137,11 @@ def update_accommodation(id):
 @accommodations.route('/delete/<int:id>', methods=['DELETE'])
 @jwt_required()
 def delete_accommodation(id):
-    current_user = get_jwt_identity()
-    user = User.query.get(current_user)
-
-    acc = accommodations.query.get(id)
+    acc = Accomodation.query.get(id)
     if not acc:
         return jsonify({'error': 'Accommodation not found'}), HTTP_404_NOT_FOUND
 
-    if user.user_type != 'admin' and acc.user_id != current_user:
+    if not is_owner_or_admin(acc.user_id):
         return jsonify({'error': 'Not authorized to delete this accommodation'}), HTTP_403_FORBIDDEN
 
     try:
@@ -184,4 +150,5 @@ def delete_accommodation(id):
         return jsonify({'message': 'Accommodation deleted successfully'}), HTTP_200_OK
 
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
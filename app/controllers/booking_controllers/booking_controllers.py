@@ -1,90 +1,247 @@
+from collections import defaultdict
+
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import insert
+from sqlalchemy.orm import joinedload, selectinload
+from flask_jwt_extended import jwt_required
 from app.status_codes import (
     HTTP_400_BAD_REQUEST, HTTP_409_CONFLICT, HTTP_500_INTERNAL_SERVER_ERROR,
     HTTP_201_CREATED, HTTP_401_UNAUTHORIZED, HTTP_200_OK, HTTP_404_NOT_FOUND,
     HTTP_403_FORBIDDEN
 )
 from app.models.booking import Booking
-from app.models.booking import Booking
-from app.models.users import User
+from app.models.tour import Tour
+from app.models.accomodations import Accomodation
 from app.extensions import db
+from app.auth import current_user_id, is_owner_or_admin
+from app.pagination import keyset_paginate, PaginationError
+from app.export import stream_export, EXPORT_FORMATS
+from app.conditional import is_not_modified, with_version, not_modified
+from app.fieldsets import fieldset, FieldsError
+from app.serializers import booking_serializer, booking_detail_serializer
+from app.availability import reserve_seats, seats_held, SeatsUnavailable
+from app.idempotency import idempotent
 
 # Bookings Blueprint
 bookings = Blueprint('bookings', __name__, url_prefix='/api/v1/bookings')
 
+MAX_BULK_BOOKINGS = 500
+
+
+def parse_booking(data, user_id):
+    """Validate one booking payload; returns (column values, errors)."""
+    if not isinstance(data, dict):
+        return None, ['Booking must be a JSON object']
+
+    errors = []
+    values = {
+        'user_id': user_id,
+        'status': 'pending',
+    }
+    if data.get('status', 'pending') != 'pending':
+        # Bookings start pending; status changes go through the edit endpoint.
+        errors.append('status cannot be set when creating a booking')
+
+    for field in ('tour_id', 'accommodation_id'):
+        value = data.get(field)
+        if value is None:
+            values[field] = None
+            continue
+        try:
+            values[field] = int(value)
+        except (TypeError, ValueError):
+            values[field] = None
+            errors.append(f'{field} must be an integer')
+
+    for field in ('booking_date', 'number_of_people', 'total_price'):
+        value = data.get(field)
+        if value is None:
+            errors.append(f'{field} is required')
+            continue
+        try:
+            values[field] = int(value)
+        except (TypeError, ValueError):
+            errors.append(f'{field} must be an integer')
+
+    if values.get('number_of_people') is not None and values['number_of_people'] < 1:
+        errors.append('number_of_people must be at least 1')
+
+    if not values['tour_id'] and not values['accommodation_id'] and not errors:
+        errors.append('tour_id or accommodation_id is required')
+
+    return values, errors
+
+
+def check_booking_references(items):
+    """Add errors for unknown tours/accommodations and overbooked tours.
+
+    `items` is a list of (values, errors) from parse_booking; the lookups are
+    batched so a whole upload costs two queries.
+    """
+    valid = [values for values, errors in items if not errors]
+    tour_ids = {values['tour_id'] for values in valid if values['tour_id']}
+    accommodation_ids = {values['accommodation_id'] for values in valid if values['accommodation_id']}
+
+    tours_by_id = {tour.id: tour for tour in Tour.query.filter(Tour.id.in_(tour_ids))} if tour_ids else {}
+    known_accommodations = {
+        row.id for row in db.session.query(Accomodation.id).filter(Accomodation.id.in_(accommodation_ids))
+    } if accommodation_ids else set()
+
+    demand = defaultdict(int)
+    for values, errors in items:
+        if errors:
+            continue
+        if values['tour_id'] and values['tour_id'] not in tours_by_id:
+            errors.append('Tour not found')
+        if values['accommodation_id'] and values['accommodation_id'] not in known_accommodations:
+            errors.append('Accommodation not found')
+        tour_id, seats = seats_held(values['tour_id'], values['number_of_people'], values['status'])
+        if not errors and seats:
+            demand[tour_id] += seats
+
+    for values, errors in items:
+        tour = tours_by_id.get(values['tour_id']) if not errors else None
+        if tour and demand[tour.id] > tour.seats_left:
+            errors.append(f'Not enough seats on tour {tour.id}: {tour.seats_left} left')
+
+    return demand
+
+
 # Create a booking
 @bookings.route('/create', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_booking():
-    data = request.get_json()
-    accommodation_id = data.get('accommodation_id')
-    start_date = data.get('start_date')
-    end_date = data.get('end_date')
-    guests = data.get('guests')
-    user_id = get_jwt_identity()
-
-    if not accommodation_id or not start_date or not end_date or not guests:
-        return jsonify({'error': 'All fields are required'}), HTTP_400_BAD_REQUEST
-
-    accommodation = accommodation.query.get(accommodation_id)
-    if not accommodation:
-        return jsonify({'error': 'Accommodation not found'}), HTTP_404_NOT_FOUND
+    values, errors = parse_booking(request.get_json(), current_user_id())
+    if errors:
+        return jsonify({'error': errors[0]}), HTTP_400_BAD_REQUEST
 
     try:
-        new_booking = Booking(
-            user_id=user_id,
-            accommodation_id=accommodation_id,
-            start_date=start_date,
-            end_date=end_date,
-            guests=guests
-        )
+        check_booking_references([(values, errors)])
+        if errors:
+            status = HTTP_409_CONFLICT if errors[0].startswith('Not enough seats') else HTTP_404_NOT_FOUND
+            return jsonify({'error': errors[0]}), status
+
+        new_booking = Booking(**values)
         db.session.add(new_booking)
         db.session.commit()
 
         return jsonify({
             'message': 'Booking created successfully',
-            'booking': {
-                'id': new_booking.id,
-                'accommodation': {
-                    'id': accommodation.id,
-                    'name': accommodation.name,
-                    'location': accommodation.location
-                },
-                'start_date': new_booking.start_date,
-                'end_date': new_booking.end_date,
-                'guests': new_booking.guests
-            }
+            'booking': booking_detail_serializer(new_booking)
         }), HTTP_201_CREATED
 
+    except SeatsUnavailable as e:
+        # Seats taken by a concurrent booking since the check above.
+        db.session.rollback()
+        return jsonify({'error': str(e)}), HTTP_409_CONFLICT
+
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
 
 
-# Get all bookings
+# Create many bookings in one request and one transaction
+# POST /api/v1/bookings/bulk  {"bookings": [{...}, {...}]}
+@bookings.route('/bulk', methods=['POST'])
+@jwt_required()
+@idempotent
+def create_bookings_bulk():
+    data = request.get_json()
+    payload = data.get('bookings') if isinstance(data, dict) else data
+
+    if not isinstance(payload, list) or not payload:
+        return jsonify({'error': 'bookings must be a non-empty list'}), HTTP_400_BAD_REQUEST
+
+    if len(payload) > MAX_BULK_BOOKINGS:
+        return jsonify({'error': f'At most {MAX_BULK_BOOKINGS} bookings per request'}), HTTP_400_BAD_REQUEST
+
+    # Validate everything before writing anything.
+    user_id = current_user_id()
+    items = [parse_booking(item, user_id) for item in payload]
+    try:
+        demand = check_booking_references(items)
+
+        if any(errors for _, errors in items):
+            return jsonify({
+                'error': 'No bookings were created',
+                'results': [
+                    {'index': index, 'status': 'invalid' if errors else 'valid', 'errors': errors}
+                    for index, (_, errors) in enumerate(items)
+                ]
+            }), HTTP_400_BAD_REQUEST
+
+        rows = [values for values, _ in items]
+
+        # One executemany for all rows. Core inserts skip the mapper events
+        # that maintain Tour.seats_booked, so seats are reserved explicitly
+        # (guarded against concurrent uploads) in the same transaction.
+        stmt = insert(Booking.__table__)
+        if db.session.get_bind().dialect.insert_executemany_returning:
+            # Autoincrement ids are handed out in row order within one
+            # statement, so sorting them lines them up with the payload.
+            # (sort_by_parameter_order would fall back to one INSERT per row.)
+            ids = sorted(db.session.execute(stmt.returning(Booking.__table__.c.id), rows).scalars())
+        else:
+            # No RETURNING for executemany (MySQL): the new ids are unknown here.
+            db.session.execute(stmt, rows)
+            ids = None
+
+        for tour_id, seats in demand.items():
+            if not reserve_seats(tour_id, seats):
+                db.session.rollback()
+                return jsonify({'error': f'Tour {tour_id} no longer has {seats} free seats'}), HTTP_409_CONFLICT
+
+        db.session.commit()
+
+        results = [{'index': index, 'status': 'created'} for index in range(len(rows))]
+        body = {'message': f'{len(rows)} bookings created successfully', 'results': results}
+        if ids is None:
+            body['note'] = 'Booking ids are omitted: this database cannot return them from a bulk insert'
+        else:
+            for result, booking_id in zip(results, ids):
+                result['id'] = booking_id
+        return jsonify(body), HTTP_201_CREATED
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
+
+
+# Get all bookings (?format=ndjson|csv streams the full listing)
 @bookings.route('/', methods=['GET'])
 @jwt_required()
 def get_all_bookings():
+    export_format = request.args.get('format')
+    if export_format and export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f'format must be one of: {", ".join(EXPORT_FORMATS)}'}), HTTP_400_BAD_REQUEST
+
     try:
-        bookings_list = Booking.query.all()
-        data = []
-
-        for booking in bookings_list:
-            data.append({
-                'id': booking.id,
-                'user': booking.user.get_full_name(),
-                'accommodation': booking.accommodation.name,
-                'start_date': booking.start_date,
-                'end_date': booking.end_date,
-                'guests': booking.guests
-            })
+        # Batch-load the related rows the fields use: one SELECT per
+        # relationship per page instead of a lazy SELECT per booking.
+        fields = fieldset(booking_serializer)
+        query = Booking.query.options(*fields.options(selectinload))
 
-        return jsonify({
+        if export_format:
+            return stream_export(query.order_by(Booking.id), fields.serializer, export_format,
+                                 list(fields.serializer.fields), 'bookings')
+
+        bookings_list, next_cursor = keyset_paginate(query, Booking)
+        version = fields.version(bookings_list, next_cursor)
+        if is_not_modified(version):
+            return not_modified(version)
+
+        data = fields.serializer.many(bookings_list)
+
+        return with_version(jsonify({
             'message': 'All bookings retrieved successfully',
             'total': len(data),
-            'bookings': data
-        }), HTTP_200_OK
+            'bookings': data,
+            'next_cursor': next_cursor
+        }), version), HTTP_200_OK
+
+    except (PaginationError, FieldsError) as e:
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
 
     except Exception as e:
         return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
@@ -95,25 +252,22 @@ def get_all_bookings():
 @jwt_required()
 def get_booking(id):
     try:
-        booking = Booking.query.get(id)
+        fields = fieldset(booking_detail_serializer)
+        booking = Booking.query.options(*fields.options(joinedload)).get(id)
         if not booking:
             return jsonify({'error': 'Booking not found'}), HTTP_404_NOT_FOUND
 
-        return jsonify({
+        version = fields.version([booking])
+        if is_not_modified(version):
+            return not_modified(version)
+
+        return with_version(jsonify({
             'message': 'Booking details retrieved',
-            'booking': {
-                'id': booking.id,
-                'user': booking.user.get_full_name(),
-                'accommodation': {
-                    'id': booking.accommodation.id,
-                    'name': booking.accommodation.name,
-                    'location': booking.accommodation.location
-                },
-                'start_date': booking.start_date,
-                'end_date': booking.end_date,
-                'guests': booking.guests
-            }
-        }), HTTP_200_OK
+            'booking': fields.serializer(booking)
+        }), version), HTTP_200_OK
+
+    except FieldsError as e:
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
 
     except Exception as e:
         return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
@@ -123,26 +277,35 @@ def get_booking(id):
 @bookings.route('/edit/<int:id>', methods=['PUT', 'PATCH'])
 @jwt_required()
 def update_booking(id):
-    current_user = get_jwt_identity()
-    user = User.query.get(current_user)
-
     booking = Booking.query.get(id)
     if not booking:
         return jsonify({'error': 'Booking not found'}), HTTP_404_NOT_FOUND
 
-    if user.user_type != 'admin' and booking.user_id != current_user:
+    if not is_owner_or_admin(booking.user_id):
         return jsonify({'error': 'Not authorized to update this booking'}), HTTP_403_FORBIDDEN
 
+    data = request.get_json() or {}
+    try:
+        number_of_people = int(data.get('number_of_people', booking.number_of_people))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'number_of_people must be an integer'}), HTTP_400_BAD_REQUEST
+    if number_of_people < 1:
+        return jsonify({'error': 'number_of_people must be at least 1'}), HTTP_400_BAD_REQUEST
+
     try:
-        data = request.get_json()
-        booking.start_date = data.get('start_date', booking.start_date)
-        booking.end_date = data.get('end_date', booking.end_date)
-        booking.guests = data.get('guests', booking.guests)
+        booking.booking_date = data.get('booking_date', booking.booking_date)
+        booking.number_of_people = number_of_people
+        booking.total_price = data.get('total_price', booking.total_price)
+        booking.status = data.get('status', booking.status)
 
         db.session.commit()
 
         return jsonify({'message': 'Booking updated successfully'}), HTTP_200_OK
 
+    except SeatsUnavailable as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), HTTP_409_CONFLICT
+
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
@@ -152,14 +315,11 @@ def update_booking(id):
 @bookings.route('/delete/<int:id>', methods=['DELETE'])
 @jwt_required()
 def delete_booking(id):
-    current_user = get_jwt_identity()
-    user = User.query.get(current_user)
-
     booking = Booking.query.get(id)
     if not booking:
         return jsonify({'error': 'Booking not found'}), HTTP_404_NOT_FOUND
 
-    if user.user_type != 'admin' and booking.user_id != current_user:
+    if not is_owner_or_admin(booking.user_id):
         return jsonify({'error': 'Not authorized to delete this booking'}), HTTP_403_FORBIDDEN
 
     try:
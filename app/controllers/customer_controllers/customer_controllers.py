@@ -1,5 +1,5 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from app.status_codes import (
     HTTP_400_BAD_REQUEST, HTTP_409_CONFLICT, HTTP_500_INTERNAL_SERVER_ERROR,
     HTTP_201_CREATED, HTTP_401_UNAUTHORIZED, HTTP_200_OK, HTTP_404_NOT_FOUND,
@@ -7,68 +7,58 @@ from app.status_codes import (
 )
 from app.models.users import User
 from app.extensions import db
+from app.auth import admin_required, owner_or_admin, current_user_id
+from app.pagination import keyset_paginate, PaginationError
+from app.conditional import is_not_modified, with_version, not_modified
+from app.fieldsets import fieldset, FieldsError
+from app.serializers import customer_serializer
 
 customer = Blueprint('customer', __name__, url_prefix='/api/v1/customer')# "customer" has to match blueprint registration
 
 @customer.route('/', methods=['GET'])
-@jwt_required()
+@admin_required('Only admin can view customers')
 def get_all_customers():
-    current_user = get_jwt_identity()
-    user = User.query.get(current_user)
-    if not user:
-        return jsonify({'error': 'User not found'}), HTTP_401_UNAUTHORIZED
-
-    if user.user_type != 'admin':
-        return jsonify({'error': 'Only admin can view customers'}), HTTP_403_FORBIDDEN
-
     try:
-        customers_list = User.query.filter_by(user_type='customer').all()
-        data = [
-            {
-                'id': customer.id,
-                'name': customer.get_full_name(),
-                'email': customer.email,
-                'phone': customer.phone,
-                'created_at': customer.created_at.isoformat() if customer.created_at else None
-            }
-            for customer in customers_list
-        ]
+        fields = fieldset(customer_serializer)
+        customers_list, next_cursor = keyset_paginate(
+            User.query.options(*fields.options()).filter_by(user_type='customer'), User
+        )
+        version = fields.version(customers_list, next_cursor)
+        if is_not_modified(version):
+            return not_modified(version)
 
-        return jsonify({
+        data = fields.serializer.many(customers_list)
+
+        return with_version(jsonify({
             'message': 'All customers retrieved successfully',
             'total': len(data),
-            'customers': data
-        }), HTTP_200_OK
+            'customers': data,
+            'next_cursor': next_cursor
+        }), version), HTTP_200_OK
+
+    except (PaginationError, FieldsError) as e:
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
 
     except Exception as e:
         return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
 
 
 @customer.route('/<int:id>', methods=['GET'])
-@jwt_required()
+@owner_or_admin('Not authorized to view this customer')
 def get_customer(id):
-    current_user = get_jwt_identity()
-    user = User.query.get(current_user)
-    if not user:
-        return jsonify({'error': 'User not found'}), HTTP_401_UNAUTHORIZED
+    try:
+        fields = fieldset(customer_serializer, extra=('user_type',))
+    except FieldsError as e:
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
 
-    customer = User.query.get(id)
+    customer = User.query.options(*fields.options()).get(id)
     if not customer or customer.user_type != 'customer':
         return jsonify({'error': 'Customer not found'}), HTTP_404_NOT_FOUND
 
-    if user.user_type != 'admin' and current_user != customer.id:
-        return jsonify({'error': 'Not authorized to view this customer'}), HTTP_403_FORBIDDEN
-
     try:
         return jsonify({
             'message': 'Customer details retrieved',
-            'customer': {
-                'id': customer.id,
-                'name': customer.get_full_name(),
-                'email': customer.email,
-                'phone': customer.phone,
-                'created_at': customer.created_at.isoformat() if customer.created_at else None
-            }
+            'customer': fields.serializer(customer)
         }), HTTP_200_OK
 
     except Exception as e:
@@ -78,8 +68,7 @@ def get_customer(id):
 @customer.route('/edit/<int:id>', methods=['PUT', 'PATCH'])
 @jwt_required()
 def update_customer(id):
-    current_user = get_jwt_identity()
-    if current_user != id:
+    if current_user_id() != id:
         return jsonify({'error': 'Not authorized to update this profile'}), HTTP_403_FORBIDDEN
 
     customer_user = User.query.get(id)
@@ -90,7 +79,7 @@ def update_customer(id):
         data = request.get_json()
         customer_user.first_name = data.get('first_name', customer_user.first_name)
         customer_user.last_name = data.get('last_name', customer_user.last_name)
-        customer_user.phone = data.get('phone', customer_user.phone)
+        customer_user.contact = data.get('phone', customer_user.contact)
         customer_user.email = data.get('email', customer_user.email)
 
         db.session.commit()
@@ -103,20 +92,12 @@ def update_customer(id):
 
 
 @customer.route('/delete/<int:id>', methods=['DELETE'])
-@jwt_required()
+@owner_or_admin('Not authorized to delete this account')
 def delete_customer(id):
-    current_user = get_jwt_identity()
-    user = User.query.get(current_user)
-    if not user:
-        return jsonify({'error': 'User not found'}), HTTP_401_UNAUTHORIZED
-
     customer_user = User.query.get(id)
     if not customer_user or customer_user.user_type != 'customer':
         return jsonify({'error': 'Customer not found'}), HTTP_404_NOT_FOUND
 
-    if user.user_type != 'admin' and current_user != id:
-        return jsonify({'error': 'Not authorized to delete this account'}), HTTP_403_FORBIDDEN
-
     try:
         db.session.delete(customer_user)
         db.session.commit()
@@ -0,0 +1,82 @@
+from flask import Blueprint, request, jsonify, redirect, send_file
+from flask_jwt_extended import jwt_required
+from werkzeug.exceptions import RequestEntityTooLarge
+from app.status_codes import (
+    HTTP_400_BAD_REQUEST, HTTP_500_INTERNAL_SERVER_ERROR, HTTP_201_CREATED, HTTP_200_OK,
+    HTTP_404_NOT_FOUND, HTTP_307_TEMPORARY_REDIRECT, HTTP_413_PAYLOAD_TOO_LARGE,
+    HTTP_415_UNSUPPORTED_MEDIA_TYPE
+)
+from app.images import images as image_store, URL_PREFIX, CONTENT_TYPES, ImageTooLarge, UnsupportedImage
+
+
+# Images Blueprint (uploads and the files they are served from; see app/images.py)
+images = Blueprint('images', __name__, url_prefix=URL_PREFIX)
+
+
+def send_image(path, mimetype, etag):
+    # Ranges, If-None-Match and If-Modified-Since are answered by send_file;
+    # a name never changes content, so clients and proxies may keep it for good.
+    response = send_file(path, mimetype=mimetype, conditional=True, etag=etag, max_age=image_store.cache_max_age)
+    response.cache_control.immutable = True
+    return response
+
+
+# Upload an image (multipart field `image`). Returns its URL and thumbnail URLs
+# to store in e.g. a user's `image`; the same bytes uploaded again return the
+# same URLs with 200 instead of 201.
+@images.route('/', methods=['POST'])
+@jwt_required()
+def upload_image():
+    try:
+        # Werkzeug stops reading past MAX_CONTENT_LENGTH, whether or not a Content-Length was sent.
+        upload = request.files.get('image')
+    except RequestEntityTooLarge:
+        return jsonify({'error': f'Images may be at most {image_store.max_bytes // 2 ** 20} MB'}), HTTP_413_PAYLOAD_TOO_LARGE
+
+    if upload is None:
+        return jsonify({'error': 'An image file is required (multipart field "image")'}), HTTP_400_BAD_REQUEST
+
+    try:
+        name, created = image_store.save(upload.stream)
+        return jsonify({'image': image_store.describe(name)}), HTTP_201_CREATED if created else HTTP_200_OK
+
+    except ImageTooLarge as e:
+        return jsonify({'error': str(e)}), HTTP_413_PAYLOAD_TOO_LARGE
+
+    except UnsupportedImage as e:
+        return jsonify({'error': str(e)}), HTTP_415_UNSUPPORTED_MEDIA_TYPE
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
+
+
+# Serve an original: /api/v1/images/<sha256>.<ext>
+@images.route('/<name>', methods=['GET'])
+def get_image(name):
+    path = image_store.original_path(name)
+    if path is None:
+        return jsonify({'error': 'Image not found'}), HTTP_404_NOT_FOUND
+
+    try:
+        return send_image(path, CONTENT_TYPES[name.split('.', 1)[1]], name.split('.', 1)[0])
+
+    except FileNotFoundError:
+        return jsonify({'error': 'Image not found'}), HTTP_404_NOT_FOUND
+
+
+# Serve a thumbnail: /api/v1/images/<sha256>/<size>.webp. Until it has been
+# made, it is queued (again) and the client is sent to the original.
+@images.route('/<digest>/<int:size>.webp', methods=['GET'])
+def get_thumbnail(digest, size):
+    name = image_store.find(digest) if size in image_store.sizes else None
+    if name is None:
+        return jsonify({'error': 'Image not found'}), HTTP_404_NOT_FOUND
+
+    try:
+        return send_image(image_store.thumbnail_path(name, size), 'image/webp', f'{digest}-{size}')
+
+    except FileNotFoundError:
+        image_store.make_thumbnails(name)
+        response = redirect(image_store.url(name), HTTP_307_TEMPORARY_REDIRECT)
+        response.cache_control.no_store = True
+        return response
@@ -1,5 +1,8 @@
+from datetime import date
+
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.orm import selectinload
+from flask_jwt_extended import jwt_required
 from app.status_codes import (
     HTTP_400_BAD_REQUEST, HTTP_409_CONFLICT, HTTP_500_INTERNAL_SERVER_ERROR,
     HTTP_201_CREATED, HTTP_401_UNAUTHORIZED, HTTP_200_OK, HTTP_404_NOT_FOUND,
@@ -7,26 +10,54 @@ from app.status_codes import (
 )
 from app.models.payments import Payment
 from app.models.booking import Booking
-from app.models.users import User
 from app.extensions import db
+from app.auth import admin_required, current_user_id, is_owner_or_admin
+from app.pagination import keyset_paginate, PaginationError
+from app.export import stream_export, EXPORT_FORMATS
+from app.conditional import is_not_modified, with_version, not_modified
+from app.fieldsets import fieldset, FieldsError
+from app.serializers import payment_serializer, payment_detail_serializer
+from app.revenue import GROUP_BY_FIELDS, revenue_report, rebuild_revenue
+from app.idempotency import idempotent
 
 # Payments Blueprint
 payments = Blueprint('payments', __name__, url_prefix='/api/v1/payments')
 
+
+def parse_amount(value):
+    """A positive whole amount (int, integral number or digit string), else None.
+
+    Payment.amount is an INT column and the revenue rollup adds the same int,
+    so fractional amounts are refused rather than rounded differently by each.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, float):
+        value = int(value) if value.is_integer() else None
+    elif isinstance(value, str):
+        value = int(value) if value.strip().isdigit() else None
+    return value if isinstance(value, int) and value > 0 else None
+
+
 # Create a payment
 @payments.route('/create', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_payment():
     data = request.get_json()
     booking_id = data.get('booking_id')
     amount = data.get('amount')
     payment_method = data.get('payment_method')
     status = data.get('status', 'pending')
-    user_id = get_jwt_identity()
+    user_id = current_user_id()
 
     if not booking_id or not amount or not payment_method:
         return jsonify({'error': 'All fields are required'}), HTTP_400_BAD_REQUEST
 
+    amount = parse_amount(amount)
+    if amount is None:
+        return jsonify({'error': 'amount must be a positive whole number'}), HTTP_400_BAD_REQUEST
+
     booking = Booking.query.get(booking_id)
     if not booking:
         return jsonify({'error': 'Booking not found'}), HTTP_404_NOT_FOUND
@@ -38,6 +69,7 @@ def create_payment():
         new_payment = Payment(
             user_id=user_id,
             booking_id=booking_id,
+            payment_date=data.get('payment_date', date.today().isoformat()),
             amount=amount,
             payment_method=payment_method,
             status=status
@@ -47,13 +79,7 @@ def create_payment():
 
         return jsonify({
             'message': 'Payment created successfully',
-            'payment': {
-                'id': new_payment.id,
-                'amount': new_payment.amount,
-                'payment_method': new_payment.payment_method,
-                'status': new_payment.status,
-                'booking_id': new_payment.booking_id
-            }
+            'payment': payment_detail_serializer(new_payment)
         }), HTTP_201_CREATED
 
     except Exception as e:
@@ -61,35 +87,67 @@ def create_payment():
         return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
 
 
-# Get all payments (admin only)
+# Get all payments (admin only, ?format=ndjson|csv streams the full listing)
 @payments.route('/', methods=['GET'])
-@jwt_required()
+@admin_required('Only admin can view all payments')
 def get_all_payments():
-    current_user = get_jwt_identity()
-    user = User.query.get(current_user)
-
-    if user.user_type != 'admin':
-        return jsonify({'error': 'Only admin can view all payments'}), HTTP_403_FORBIDDEN
+    export_format = request.args.get('format')
+    if export_format and export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f'format must be one of: {", ".join(EXPORT_FORMATS)}'}), HTTP_400_BAD_REQUEST
 
     try:
-        payments_list = Payment.query.all()
-        data = []
-
-        for pay in payments_list:
-            data.append({
-                'id': pay.id,
-                'user': pay.user.get_full_name(),
-                'booking_id': pay.booking_id,
-                'amount': pay.amount,
-                'payment_method': pay.payment_method,
-                'status': pay.status,
-                'timestamp': pay.timestamp
-            })
+        fields = fieldset(payment_serializer)
+        query = Payment.query.options(*fields.options(selectinload))
 
-        return jsonify({
+        if export_format:
+            return stream_export(query.order_by(Payment.id), fields.serializer, export_format,
+                                 list(fields.serializer.fields), 'payments')
+
+        payments_list, next_cursor = keyset_paginate(query, Payment)
+        version = fields.version(payments_list, next_cursor)
+        if is_not_modified(version):
+            return not_modified(version)
+
+        data = fields.serializer.many(payments_list)
+
+        return with_version(jsonify({
             'message': 'All payments retrieved successfully',
             'total': len(data),
-            'payments': data
+            'payments': data,
+            'next_cursor': next_cursor
+        }), version), HTTP_200_OK
+
+    except (PaginationError, FieldsError) as e:
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
+
+
+# Revenue per day / payment method / status (admin only)
+# GET /api/v1/payments/revenue?from=2026-01-01&to=2026-01-31&group_by=day,payment_method
+@payments.route('/revenue', methods=['GET'])
+@admin_required('Only admin can view revenue')
+def get_revenue():
+    try:
+        date_from = date.fromisoformat(request.args['from']) if request.args.get('from') else None
+        date_to = date.fromisoformat(request.args['to']) if request.args.get('to') else None
+    except ValueError:
+        return jsonify({'error': 'from and to must be dates (YYYY-MM-DD)'}), HTTP_400_BAD_REQUEST
+
+    group_by = request.args.get('group_by')
+    group_by = [field for field in group_by.split(',') if field] if group_by is not None else list(GROUP_BY_FIELDS)
+    unknown = [field for field in group_by if field not in GROUP_BY_FIELDS]
+    if unknown:
+        return jsonify({'error': f'group_by must be a subset of: {", ".join(GROUP_BY_FIELDS)}'}), HTTP_400_BAD_REQUEST
+
+    try:
+        rows, totals = revenue_report(date_from, date_to, group_by)
+        return jsonify({
+            'message': 'Revenue retrieved successfully',
+            'group_by': group_by,
+            'revenue': rows,
+            'totals': totals
         }), HTTP_200_OK
 
     except Exception as e:
@@ -100,26 +158,23 @@ def get_all_payments():
 @payments.route('/<int:id>', methods=['GET'])
 @jwt_required()
 def get_payment(id):
-    current_user = get_jwt_identity()
-    payment = Payment.query.get(id)
+    try:
+        fields = fieldset(payment_detail_serializer, extra=('user_id',))
+    except FieldsError as e:
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
+
+    payment = Payment.query.options(*fields.options()).get(id)
 
     if not payment:
         return jsonify({'error': 'Payment not found'}), HTTP_404_NOT_FOUND
 
-    if payment.user_id != current_user and User.query.get(current_user).user_type != 'admin':
+    if not is_owner_or_admin(payment.user_id):
         return jsonify({'error': 'Not authorized to view this payment'}), HTTP_403_FORBIDDEN
 
     try:
         return jsonify({
             'message': 'Payment details retrieved',
-            'payment': {
-                'id': payment.id,
-                'booking_id': payment.booking_id,
-                'amount': payment.amount,
-                'payment_method': payment.payment_method,
-                'status': payment.status,
-                'timestamp': payment.timestamp
-            }
+            'payment': fields.serializer(payment)
         }), HTTP_200_OK
 
     except Exception as e:
@@ -128,14 +183,8 @@ def get_payment(id):
 
 # Update payment status (admin only)
 @payments.route('/edit/<int:id>', methods=['PUT', 'PATCH'])
-@jwt_required()
+@admin_required('Only admin can update payment status')
 def update_payment(id):
-    current_user = get_jwt_identity()
-    user = User.query.get(current_user)
-
-    if user.user_type != 'admin':
-        return jsonify({'error': 'Only admin can update payment status'}), HTTP_403_FORBIDDEN
-
     payment = Payment.query.get(id)
     if not payment:
         return jsonify({'error': 'Payment not found'}), HTTP_404_NOT_FOUND
@@ -154,14 +203,8 @@ def update_payment(id):
 
 # Delete payment (admin only)
 @payments.route('/delete/<int:id>', methods=['DELETE'])
-@jwt_required()
+@admin_required('Only admin can delete payments')
 def delete_payment(id):
-    current_user = get_jwt_identity()
-    user = User.query.get(current_user)
-
-    if user.user_type != 'admin':
-        return jsonify({'error': 'Only admin can delete payments'}), HTTP_403_FORBIDDEN
-
     payment = Payment.query.get(id)
     if not payment:
         return jsonify({'error': 'Payment not found'}), HTTP_404_NOT_FOUND
@@ -174,3 +217,10 @@ def delete_payment(id):
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
+
+
+# Recompute the revenue rollup from payments: `flask payments rebuild-revenue`
+@payments.cli.command('rebuild-revenue')
+def rebuild_revenue_rollup():
+    rebuild_revenue()
+    print('Payment revenue rollup rebuilt')
@@ -0,0 +1,46 @@
+from flask import Blueprint, jsonify
+from app.status_codes import HTTP_200_OK, HTTP_500_INTERNAL_SERVER_ERROR
+from app.extensions import db
+from app.auth import admin_required
+from app.pool import pool_status
+from app.replicas import replica_health
+from app.revocation import revocations
+from app.idempotency import prune_idempotency_keys
+
+
+# System Blueprint (operational endpoints, admin only)
+system = Blueprint('system', __name__, url_prefix='/api/v1/system')
+
+# Database connection pool telemetry
+@system.route('/db-pool', methods=['GET'])
+@admin_required('Only admin can view pool telemetry')
+def get_db_pool():
+    try:
+        return jsonify({'pools': pool_status()}), HTTP_200_OK
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
+
+
+# Read replica health (checks any replica whose last check has expired)
+@system.route('/db-replicas', methods=['GET'])
+@admin_required('Only admin can view replica health')
+def get_db_replicas():
+    try:
+        return jsonify({'replicas': replica_health(db.engines)}), HTTP_200_OK
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
+
+
+# In-memory token revocation index size
+@system.route('/token-revocations', methods=['GET'])
+@admin_required('Only admin can view revocation stats')
+def get_token_revocations():
+    return jsonify({'revocations': revocations.stats()}), HTTP_200_OK
+
+
+# Delete expired Idempotency-Key rows: `flask system prune-idempotency-keys`
+@system.cli.command('prune-idempotency-keys')
+def prune_idempotency():
+    print(f'Removed {prune_idempotency_keys()} expired idempotency keys')
@@ -1,5 +1,8 @@
+from datetime import date
+
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.orm import joinedload, selectinload
+from flask_jwt_extended import jwt_required
 from app.status_codes import (
     HTTP_400_BAD_REQUEST, HTTP_409_CONFLICT, HTTP_500_INTERNAL_SERVER_ERROR,
     HTTP_201_CREATED, HTTP_401_UNAUTHORIZED, HTTP_200_OK, HTTP_404_NOT_FOUND,
@@ -9,28 +12,55 @@ from app.models.tour_assignment import TourAssignment
 from app.models.tour import Tour
 from app.models.users import User
 from app.extensions import db
+from app.auth import admin_required, is_owner_or_admin
+from app.pagination import keyset_paginate, PaginationError
+from app.conditional import is_not_modified, with_version, not_modified
+from app.fieldsets import fieldset, FieldsError
+from app.serializers import tour_assignment_serializer, guide_serializer
+from app.scheduling import lock_tour, lock_guide, guide_conflicts, free_guides_query, rebuild_assignment_dates
 
 # Tour Assignments Blueprint
 tour_assignments = Blueprint('tour_assignments', __name__, url_prefix='/api/v1/tour-assignments')
 
+
+def conflict_response(conflicts):
+    return jsonify({
+        'error': 'Guide is already assigned to another tour on these dates',
+        'conflicts': [{
+            'id': assignment.id,
+            'tour_id': assignment.tour_id,
+            'start_date': assignment.start_date,
+            'end_date': assignment.end_date
+        } for assignment in conflicts]
+    }), HTTP_409_CONFLICT
+
+
 # Create a tour assignment
 @tour_assignments.route('/create', methods=['POST'])
-@jwt_required()
+@admin_required('Only admin can assign tours')
 def create_tour_assignment():
     data = request.get_json()
     tour_id = data.get('tour_id')
     guide_id = data.get('guide_id')
     assignment_date = data.get('assignment_date')
-    current_user = get_jwt_identity()
-
-    user = User.query.get(current_user)
-    if user.user_type != 'admin':
-        return jsonify({'error': 'Only admin can assign tours'}), HTTP_403_FORBIDDEN
 
     if not tour_id or not guide_id or not assignment_date:
         return jsonify({'error': 'All fields are required'}), HTTP_400_BAD_REQUEST
 
     try:
+        tour = lock_tour(tour_id)
+        if not tour:
+            db.session.rollback()
+            return jsonify({'error': 'Tour not found'}), HTTP_404_NOT_FOUND
+        if lock_guide(guide_id) is None:
+            db.session.rollback()
+            return jsonify({'error': 'Guide not found'}), HTTP_404_NOT_FOUND
+
+        conflicts = guide_conflicts(guide_id, tour.start_date, tour.end_date)
+        if conflicts:
+            db.session.rollback()
+            return conflict_response(conflicts)
+
         new_assignment = TourAssignment(
             tour_id=tour_id,
             guide_id=guide_id,
@@ -56,38 +86,68 @@ def create_tour_assignment():
 
 # Get all tour assignments (admin only)
 @tour_assignments.route('/', methods=['GET'])
-@jwt_required()
+@admin_required('Only admin can view all tour assignments')
 def get_all_tour_assignments():
-    current_user = get_jwt_identity()
-    user = User.query.get(current_user)
+    try:
+        # Batch-load tours and guides so the page costs a fixed number of queries.
+        fields = fieldset(tour_assignment_serializer)
+        query = TourAssignment.query.options(*fields.options(selectinload))
+        assignments, next_cursor = keyset_paginate(query, TourAssignment)
+        version = fields.version(assignments, next_cursor)
+        if is_not_modified(version):
+            return not_modified(version)
+
+        data = fields.serializer.many(assignments)
+
+        return with_version(jsonify({
+            'message': 'All tour assignments retrieved successfully',
+            'total': len(data),
+            'assignments': data,
+            'next_cursor': next_cursor
+        }), version), HTTP_200_OK
+
+    except (PaginationError, FieldsError) as e:
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
+
 
-    if user.user_type != 'admin':
-        return jsonify({'error': 'Only admin can view all tour assignments'}), HTTP_403_FORBIDDEN
+# Guides with no assignment overlapping a tour's dates (or ?from=&to=)
+# GET /api/v1/tour-assignments/free-guides?tour_id=7
+@tour_assignments.route('/free-guides', methods=['GET'])
+@admin_required('Only admin can view guide availability')
+def get_free_guides():
+    tour_id = request.args.get('tour_id', type=int)
+    if tour_id:
+        tour = Tour.query.get(tour_id)
+        if not tour:
+            return jsonify({'error': 'Tour not found'}), HTTP_404_NOT_FOUND
+        start_date, end_date = tour.start_date, tour.end_date
+    else:
+        try:
+            start_date = date.fromisoformat(request.args['from'])
+            end_date = date.fromisoformat(request.args.get('to') or request.args['from'])
+        except (KeyError, ValueError):
+            return jsonify({'error': 'Pass tour_id, or from (and optionally to) as YYYY-MM-DD'}), HTTP_400_BAD_REQUEST
 
     try:
-        assignments = TourAssignment.query.all()
-        data = []
-
-        for ta in assignments:
-            data.append({
-                'id': ta.id,
-                'tour': {
-                    'id': ta.tour.id,
-                    'name': ta.tour.name
-                },
-                'guide': {
-                    'id': ta.guide.id,
-                    'name': ta.guide.get_full_name()
-                },
-                'assignment_date': ta.assignment_date
-            })
+        fields = fieldset(guide_serializer)
+        guides, next_cursor = keyset_paginate(free_guides_query(start_date, end_date).options(*fields.options()), User)
+        data = fields.serializer.many(guides)
 
         return jsonify({
-            'message': 'All tour assignments retrieved successfully',
-            'total': len(data),
-            'assignments': data
+            'message': 'Free guides retrieved successfully',
+            'start_date': start_date,
+            'end_date': end_date,
+            'total_guides': len(data),
+            'guides': data,
+            'next_cursor': next_cursor
         }), HTTP_200_OK
 
+    except (PaginationError, FieldsError) as e:
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
+
     except Exception as e:
         return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
 
@@ -96,51 +156,53 @@ def get_all_tour_assignments():
 @tour_assignments.route('/<int:id>', methods=['GET'])
 @jwt_required()
 def get_tour_assignment(id):
-    assignment = TourAssignment.query.get(id)
+    try:
+        fields = fieldset(tour_assignment_serializer, extra=('guide_id',))
+    except FieldsError as e:
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
+
+    assignment = TourAssignment.query.options(*fields.options(joinedload)).get(id)
     if not assignment:
         return jsonify({'error': 'Tour assignment not found'}), HTTP_404_NOT_FOUND
 
-    current_user = get_jwt_identity()
-    user = User.query.get(current_user)
-
-    if user.user_type != 'admin' and assignment.guide_id != current_user:
+    if not is_owner_or_admin(assignment.guide_id):
         return jsonify({'error': 'Not authorized to view this assignment'}), HTTP_403_FORBIDDEN
 
     return jsonify({
         'message': 'Tour assignment details retrieved',
-        'assignment': {
-            'id': assignment.id,
-            'tour': {
-                'id': assignment.tour.id,
-                'name': assignment.tour.name
-            },
-            'guide': {
-                'id': assignment.guide.id,
-                'name': assignment.guide.get_full_name()
-            },
-            'assignment_date': assignment.assignment_date
-        }
+        'assignment': fields.serializer(assignment)
     }), HTTP_200_OK
 
 
 # Update assignment (admin only)
 @tour_assignments.route('/edit/<int:id>', methods=['PUT', 'PATCH'])
-@jwt_required()
+@admin_required('Only admin can update assignments')
 def update_tour_assignment(id):
-    current_user = get_jwt_identity()
-    user = User.query.get(current_user)
-
-    if user.user_type != 'admin':
-        return jsonify({'error': 'Only admin can update assignments'}), HTTP_403_FORBIDDEN
-
     assignment = TourAssignment.query.get(id)
     if not assignment:
         return jsonify({'error': 'Tour assignment not found'}), HTTP_404_NOT_FOUND
 
     try:
         data = request.get_json()
-        assignment.tour_id = data.get('tour_id', assignment.tour_id)
-        assignment.guide_id = data.get('guide_id', assignment.guide_id)
+        tour_id = data.get('tour_id', assignment.tour_id)
+        guide_id = data.get('guide_id', assignment.guide_id)
+
+        if tour_id != assignment.tour_id or guide_id != assignment.guide_id:
+            tour = lock_tour(tour_id)
+            if not tour:
+                db.session.rollback()
+                return jsonify({'error': 'Tour not found'}), HTTP_404_NOT_FOUND
+            if lock_guide(guide_id) is None:
+                db.session.rollback()
+                return jsonify({'error': 'Guide not found'}), HTTP_404_NOT_FOUND
+
+            conflicts = guide_conflicts(guide_id, tour.start_date, tour.end_date, exclude_id=assignment.id)
+            if conflicts:
+                db.session.rollback()
+                return conflict_response(conflicts)
+
+        assignment.tour_id = tour_id
+        assignment.guide_id = guide_id
         assignment.assignment_date = data.get('assignment_date', assignment.assignment_date)
 
         db.session.commit()
@@ -153,14 +215,8 @@ def update_tour_assignment(id):
 
 # Delete assignment (admin only)
 @tour_assignments.route('/delete/<int:id>', methods=['DELETE'])
-@jwt_required()
+@admin_required('Only admin can delete assignments')
 def delete_tour_assignment(id):
-    current_user = get_jwt_identity()
-    user = User.query.get(current_user)
-
-    if user.user_type != 'admin':
-        return jsonify({'error': 'Only admin can delete assignments'}), HTTP_403_FORBIDDEN
-
     assignment = TourAssignment.query.get(id)
     if not assignment:
         return jsonify({'error': 'Tour assignment not found'}), HTTP_404_NOT_FOUND
@@ -173,3 +229,10 @@ def delete_tour_assignment(id):
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
+
+
+# Copy tour dates onto assignments: `flask tour_assignments rebuild-schedule`
+@tour_assignments.cli.command('rebuild-schedule')
+def rebuild_schedule():
+    rebuild_assignment_dates()
+    print('Guide schedules rebuilt')
@@ -1,13 +1,23 @@
+from datetime import date
+
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from app.status_codes import (
     HTTP_400_BAD_REQUEST, HTTP_409_CONFLICT, HTTP_500_INTERNAL_SERVER_ERROR,
     HTTP_201_CREATED, HTTP_401_UNAUTHORIZED, HTTP_200_OK, HTTP_404_NOT_FOUND,
     HTTP_403_FORBIDDEN
 )
 from app.models.tour import Tour
-from app.models.users import User
 from app.extensions import db
+from app.auth import admin_required, current_user_id, is_owner_or_admin
+from app.pagination import keyset_paginate, PaginationError
+from app.conditional import version_of, is_not_modified, with_version, not_modified
+from app.fieldsets import fieldset, FieldsError
+from app.serializers import tour_serializer
+from app.availability import available_tours_query, availability_args, rebuild_seat_counts, resize_tour
+from app.cache import tour_cache, tour_key, tour_page_key
+from app.replicas import use_primary
+from app.scheduling import lock_tour, lock_tour_guides, reschedule_conflicts
 
 
 # Tours Blueprint
@@ -18,32 +28,43 @@ tours = Blueprint('tours', __name__, url_prefix='/api/v1/tours')
 @jwt_required()
 def create_tour():
     data = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), HTTP_400_BAD_REQUEST
+
     name = data.get('name')
-    location = data.get('location')
+    destination = data.get('destination')
     price = data.get('price')
-    description = data.get('description')
-    image = data.get('image')
     start_date = data.get('start_date')
     end_date = data.get('end_date')
-    company_id = data.get('company_id')
-    user_id = get_jwt_identity()
+    max_group_size = data.get('max_group_size')
+    user_id = current_user_id()
 
-    if not name or not location or not price or not description or not start_date or not end_date or not company_id:
+    if not name or not destination or not price or not start_date or not end_date or not max_group_size:
         return jsonify({'error': 'All fields are required'}), HTTP_400_BAD_REQUEST
 
-    if Tour.query.filter_by(name=name, user_id=user_id).first():
-        return jsonify({'error': 'You already created a tour with this name'}), HTTP_409_CONFLICT
+    try:
+        start_date = date.fromisoformat(start_date)
+        end_date = date.fromisoformat(end_date)
+        max_group_size = int(max_group_size)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Dates must be YYYY-MM-DD and max_group_size an integer'}), HTTP_400_BAD_REQUEST
+
+    if end_date < start_date:
+        return jsonify({'error': 'end_date must not be before start_date'}), HTTP_400_BAD_REQUEST
+    if max_group_size < 1:
+        return jsonify({'error': 'max_group_size must be at least 1'}), HTTP_400_BAD_REQUEST
+
+    if Tour.query.filter_by(tour_name=name).first():
+        return jsonify({'error': 'A tour with this name already exists'}), HTTP_409_CONFLICT
 
     try:
         new_tour = Tour(
-            name=name,
-            location=location,
+            tour_name=name,
+            destination=destination,
             price=price,
-            description=description,
-            image=image,
             start_date=start_date,
             end_date=end_date,
-            company_id=company_id,
+            max_group_size=max_group_size,
             user_id=user_id
         )
         db.session.add(new_tour)
@@ -51,24 +72,7 @@ def create_tour():
 
         return jsonify({
             'message': f'Tour "{name}" created successfully',
-            'tour': {
-                'name': new_tour.name,
-                'location': new_tour.location,
-                'price': new_tour.price,
-                'description': new_tour.description,
-                'image': new_tour.image,
-                'start_date': new_tour.start_date,
-                'end_date': new_tour.end_date,
-                'company': {
-                    'id': new_tour.company.id,
-                    'name': new_tour.company.first_name,
-                    'origin': new_tour.company.origin
-                },
-                'creator': {
-                    'name': new_tour.user.get_full_name(),
-                    'email': new_tour.user.email
-                }
-            }
+            'tour': tour_serializer(new_tour)
         }), HTTP_201_CREATED
 
     except Exception as e:
@@ -81,25 +85,67 @@ def create_tour():
 @jwt_required()
 def get_all_tours():
     try:
-        tours_list = Tour.query.all()
-        data = []
-
-        for tour in tours_list:
-            data.append({
-                'id': tour.id,
-                'name': tour.name,
-                'location': tour.location,
-                'price': tour.price,
-                'description': tour.description,
-                'start_date': tour.start_date,
-                'end_date': tour.end_date
-            })
-
-        return jsonify({
+        def load_page():
+            # Cache fills read the primary so a lagging replica can't re-cache stale rows.
+            with use_primary():
+                tours_list, next_cursor = keyset_paginate(Tour.query, Tour)
+            return version_of(*tours_list, next_cursor=next_cursor), tour_serializer.many(tours_list), next_cursor
+
+        # Read-through: a hit skips the DB and the serializer entirely. Pages
+        # are cached whole, and ?fields= picks from the cached rows.
+        fields = fieldset(tour_serializer)
+        key = tour_page_key(*(request.args.get(arg) for arg in ('limit', 'after', 'sort')))
+        version, data, next_cursor = tour_cache.get_or_load(key, load_page)
+        version = fields.vary(version)
+        if is_not_modified(version):
+            return not_modified(version)
+
+        data = fields.project(data)
+        return with_version(jsonify({
             'message': 'All tours retrieved successfully',
             'total': len(data),
-            'tours': data
-        }), HTTP_200_OK
+            'tours': data,
+            'next_cursor': next_cursor
+        }), version), HTTP_200_OK
+
+    except (PaginationError, FieldsError) as e:
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
+
+
+# Tours with free seats in a date window
+# GET /api/v1/tours/availability?from=2025-01-01&to=2025-01-31&people=4
+@tours.route('/availability', methods=['GET'])
+@jwt_required()
+def get_tour_availability():
+    try:
+        date_from, date_to, people = availability_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
+
+    try:
+        fields = fieldset(tour_serializer, extra=('start_date',))
+        query = available_tours_query(date_from, date_to, people).options(*fields.options())
+        # Soonest first, walking ix_tour_start_end_date within the date window.
+        tours_list, next_cursor = keyset_paginate(query, Tour, sort_keys=('start_date', 'id', 'created_at'),
+                                                  default_sort='start_date')
+        version = fields.version(tours_list, next_cursor)
+        if is_not_modified(version):
+            return not_modified(version)
+
+        data = fields.serializer.many(tours_list)
+
+        return with_version(jsonify({
+            'message': 'Available tours retrieved successfully',
+            'total': len(data),
+            'tours': data,
+            'next_cursor': next_cursor
+        }), version), HTTP_200_OK
+
+    except (PaginationError, FieldsError) as e:
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
 
     except Exception as e:
         return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
@@ -110,51 +156,100 @@ def get_all_tours():
 @jwt_required()
 def get_tour(id):
     try:
-        tour = Tour.query.get(id)
+        def load_tour():
+            with use_primary():
+                tour = Tour.query.get(id)
+            return (version_of(tour), tour_serializer(tour)) if tour else None
+
+        fields = fieldset(tour_serializer)
+        cached = tour_cache.get_or_load(tour_key(id), load_tour)
 
-        if not tour:
+        if not cached:
             return jsonify({'error': 'Tour not found'}), HTTP_404_NOT_FOUND
 
-        return jsonify({
+        version, data = cached
+        version = fields.vary(version)
+        if is_not_modified(version):
+            return not_modified(version)
+
+        return with_version(jsonify({
             'message': 'Tour details retrieved',
-            'tour': {
-                'name': tour.name,
-                'location': tour.location,
-                'price': tour.price,
-                'description': tour.description,
-                'start_date': tour.start_date,
-                'end_date': tour.end_date
-            }
-        }), HTTP_200_OK
+            'tour': fields.project(data)
+        }), version), HTTP_200_OK
+
+    except FieldsError as e:
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
 
     except Exception as e:
         return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
 
 
+# Tour cache counters (admin only)
+@tours.route('/cache-stats', methods=['GET'])
+@admin_required('Only admin can view cache statistics')
+def get_tour_cache_stats():
+    return jsonify({'tour_cache': tour_cache.stats()}), HTTP_200_OK
+
+
 # Update tour
 @tours.route('/edit/<int:id>', methods=['PUT', 'PATCH'])
 @jwt_required()
 def update_tour(id):
-    current_user = get_jwt_identity()
-    user = User.query.get(current_user)
-
     tour = Tour.query.get(id)
     if not tour:
         return jsonify({'error': 'Tour not found'}), HTTP_404_NOT_FOUND
 
-    if user.user_type != 'admin' and tour.user_id != current_user:
+    if not is_owner_or_admin(tour.user_id):
         return jsonify({'error': 'Not authorized to update this tour'}), HTTP_403_FORBIDDEN
 
+    data = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), HTTP_400_BAD_REQUEST
+
     try:
-        data = request.get_json()
+        start_date = date.fromisoformat(data['start_date']) if 'start_date' in data else None
+        end_date = date.fromisoformat(data['end_date']) if 'end_date' in data else None
+        max_group_size = int(data['max_group_size']) if 'max_group_size' in data else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Dates must be YYYY-MM-DD and max_group_size an integer'}), HTTP_400_BAD_REQUEST
 
-        tour.name = data.get('name', tour.name)
-        tour.location = data.get('location', tour.location)
+    if max_group_size is not None and max_group_size < 1:
+        return jsonify({'error': 'max_group_size must be at least 1'}), HTTP_400_BAD_REQUEST
+
+    try:
+        rescheduled = start_date is not None or end_date is not None
+        if rescheduled:
+            tour = lock_tour(id)
+            if not tour:
+                db.session.rollback()
+                return jsonify({'error': 'Tour not found'}), HTTP_404_NOT_FOUND
+            lock_tour_guides(id)
+
+        tour.tour_name = data.get('name', tour.tour_name)
+        tour.destination = data.get('destination', tour.destination)
         tour.price = data.get('price', tour.price)
-        tour.description = data.get('description', tour.description)
-        tour.image = data.get('image', tour.image)
-        tour.start_date = data.get('start_date', tour.start_date)
-        tour.end_date = data.get('end_date', tour.end_date)
+        if max_group_size is not None:
+            if not resize_tour(tour.id, max_group_size):
+                db.session.rollback()
+                return jsonify({
+                    'error': f'max_group_size cannot be below the {tour.seats_booked} seats already booked'
+                }), HTTP_409_CONFLICT
+
+        if rescheduled:
+            # Checked against the locked row, since only one of the dates may be given.
+            tour.start_date = start_date or tour.start_date
+            tour.end_date = end_date or tour.end_date
+            if tour.end_date < tour.start_date:
+                db.session.rollback()
+                return jsonify({'error': 'end_date must not be before start_date'}), HTTP_400_BAD_REQUEST
+
+            conflicts = reschedule_conflicts(tour.id, tour.start_date, tour.end_date)
+            if conflicts:
+                db.session.rollback()
+                return jsonify({
+                    'error': 'The new dates clash with other tours of its guides',
+                    'conflicts': [{'guide_id': ta.guide_id, 'tour_id': ta.tour_id} for ta in conflicts]
+                }), HTTP_409_CONFLICT
 
         db.session.commit()
 
@@ -169,14 +264,11 @@ def update_tour(id):
 @tours.route('/delete/<int:id>', methods=['DELETE'])
 @jwt_required()
 def delete_tour(id):
-    current_user = get_jwt_identity()
-    user = User.query.get(current_user)
-
     tour = Tour.query.get(id)
     if not tour:
         return jsonify({'error': 'Tour not found'}), HTTP_404_NOT_FOUND
 
-    if user.user_type != 'admin' and tour.user_id != current_user:
+    if not is_owner_or_admin(tour.user_id):
         return jsonify({'error': 'Not authorized to delete this tour'}), HTTP_403_FORBIDDEN
 
     try:
@@ -187,3 +279,10 @@ def delete_tour(id):
     except Exception as e:
         return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
 
+
+# Recompute seat counts from bookings: `flask tours rebuild-seats`
+@tours.cli.command('rebuild-seats')
+def rebuild_seats():
+    rebuild_seat_counts()
+    tour_cache.clear()
+    print('Tour seat counts rebuilt')
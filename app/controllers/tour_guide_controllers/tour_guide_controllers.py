@@ -1,12 +1,17 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.status_codes import (
     HTTP_400_BAD_REQUEST, HTTP_409_CONFLICT, HTTP_500_INTERNAL_SERVER_ERROR,
     HTTP_201_CREATED, HTTP_401_UNAUTHORIZED, HTTP_200_OK, HTTP_404_NOT_FOUND,
-    HTTP_403_FORBIDDEN
+    HTTP_403_FORBIDDEN, HTTP_503_SERVICE_UNAVAILABLE
 )
 from app.models.users import User
 from app.extensions import db
+from app.passwords import hash_password, PasswordHasherBusy, InvalidPassword
+from app.auth import admin_required, owner_or_admin
+from app.pagination import keyset_paginate, PaginationError
+from app.conditional import is_not_modified, with_version, not_modified
+from app.fieldsets import fieldset, FieldsError
+from app.serializers import user_brief_serializer
 
 # Tour Guides Blueprint
 tour_guides = Blueprint('tour_guides', __name__, url_prefix='/api/v1/tour-guides')
@@ -14,21 +19,17 @@ tour_guides = Blueprint('tour_guides', __name__, url_prefix='/api/v1/tour-guides
 
 # Create a new tour guide (admin only)
 @tour_guides.route('/create', methods=['POST'])
-@jwt_required()
+@admin_required('Only admin can create tour guides')
 def create_tour_guide():
-    current_user = get_jwt_identity()
-    admin = User.query.get(current_user)
-
-    if admin.user_type != 'admin':
-        return jsonify({'error': 'Only admin can create tour guides'}), HTTP_403_FORBIDDEN
-
     data = request.get_json()
     first_name = data.get('first_name')
     last_name = data.get('last_name')
     email = data.get('email')
-    password = data.get('password')  # Assume hashed later in model or helper
+    contact = data.get('contact')
+    biography = data.get('biography', '')
+    password = data.get('password')
 
-    if not first_name or not last_name or not email or not password:
+    if not first_name or not last_name or not email or not contact or not password:
         return jsonify({'error': 'All fields are required'}), HTTP_400_BAD_REQUEST
 
     if User.query.filter_by(email=email).first():
@@ -39,7 +40,9 @@ def create_tour_guide():
             first_name=first_name,
             last_name=last_name,
             email=email,
-            password=password,
+            contact=contact,
+            password=hash_password(password),
+            biography=biography,
             user_type='guide'
         )
         db.session.add(new_guide)
@@ -47,13 +50,17 @@ def create_tour_guide():
 
         return jsonify({
             'message': 'Tour guide created successfully',
-            'guide': {
-                'id': new_guide.id,
-                'name': new_guide.get_full_name(),
-                'email': new_guide.email
-            }
+            'guide': user_brief_serializer(new_guide)
         }), HTTP_201_CREATED
 
+    except InvalidPassword as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
+
+    except PasswordHasherBusy as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), HTTP_503_SERVICE_UNAVAILABLE
+
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
@@ -61,30 +68,26 @@ def create_tour_guide():
 
 # Get all tour guides (admin only)
 @tour_guides.route('/', methods=['GET'])
-@jwt_required()
+@admin_required('Only admin can view all tour guides')
 def get_all_tour_guides():
-    current_user = get_jwt_identity()
-    user = User.query.get(current_user)
-
-    if user.user_type != 'admin':
-        return jsonify({'error': 'Only admin can view all tour guides'}), HTTP_403_FORBIDDEN
-
     try:
-        guides = User.query.filter_by(user_type='guide').all()
-        data = []
+        fields = fieldset(user_brief_serializer)
+        guides, next_cursor = keyset_paginate(User.query.options(*fields.options()).filter_by(user_type='guide'), User)
+        version = fields.version(guides, next_cursor)
+        if is_not_modified(version):
+            return not_modified(version)
 
-        for guide in guides:
-            data.append({
-                'id': guide.id,
-                'name': guide.get_full_name(),
-                'email': guide.email
-            })
+        data = fields.serializer.many(guides)
 
-        return jsonify({
+        return with_version(jsonify({
             'message': 'All tour guides retrieved successfully',
             'total': len(data),
-            'guides': data
-        }), HTTP_200_OK
+            'guides': data,
+            'next_cursor': next_cursor
+        }), version), HTTP_200_OK
+
+    except (PaginationError, FieldsError) as e:
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
 
     except Exception as e:
         return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
@@ -92,43 +95,32 @@ def get_all_tour_guides():
 
 # Get tour guide by ID (admin or self)
 @tour_guides.route('/<int:id>', methods=['GET'])
-@jwt_required()
+@owner_or_admin('Not authorized to view this guide')
 def get_tour_guide(id):
-    guide = User.query.get(id)
+    try:
+        fields = fieldset(user_brief_serializer, extra=('user_type',))
+    except FieldsError as e:
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
+
+    guide = User.query.options(*fields.options()).get(id)
 
     if not guide or guide.user_type != 'guide':
         return jsonify({'error': 'Tour guide not found'}), HTTP_404_NOT_FOUND
 
-    current_user = get_jwt_identity()
-    user = User.query.get(current_user)
-
-    if user.user_type != 'admin' and user.id != guide.id:
-        return jsonify({'error': 'Not authorized to view this guide'}), HTTP_403_FORBIDDEN
-
     return jsonify({
         'message': 'Tour guide details retrieved',
-        'guide': {
-            'id': guide.id,
-            'name': guide.get_full_name(),
-            'email': guide.email
-        }
+        'guide': fields.serializer(guide)
     }), HTTP_200_OK
 
 
 # Update tour guide (admin or self)
 @tour_guides.route('/edit/<int:id>', methods=['PUT', 'PATCH'])
-@jwt_required()
+@owner_or_admin('Not authorized to update this guide')
 def update_tour_guide(id):
     guide = User.query.get(id)
     if not guide or guide.user_type != 'guide':
         return jsonify({'error': 'Tour guide not found'}), HTTP_404_NOT_FOUND
 
-    current_user = get_jwt_identity()
-    user = User.query.get(current_user)
-
-    if user.user_type != 'admin' and user.id != guide.id:
-        return jsonify({'error': 'Not authorized to update this guide'}), HTTP_403_FORBIDDEN
-
     try:
         data = request.get_json()
         guide.first_name = data.get('first_name', guide.first_name)
@@ -145,14 +137,8 @@ def update_tour_guide(id):
 
 # Delete tour guide (admin only)
 @tour_guides.route('/delete/<int:id>', methods=['DELETE'])
-@jwt_required()
+@admin_required('Only admin can delete guides')
 def delete_tour_guide(id):
-    current_user = get_jwt_identity()
-    admin = User.query.get(current_user)
-
-    if admin.user_type != 'admin':
-        return jsonify({'error': 'Only admin can delete guides'}), HTTP_403_FORBIDDEN
-
     guide = User.query.get(id)
     if not guide or guide.user_type != 'guide':
         return jsonify({'error': 'Tour guide not found'}), HTTP_404_NOT_FOUND
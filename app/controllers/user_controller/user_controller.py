@@ -1,46 +1,127 @@
 from flask import Blueprint, request, jsonify
+from sqlalchemy.orm import undefer
 from app.status_codes import (
     HTTP_400_BAD_REQUEST, HTTP_409_CONFLICT, HTTP_500_INTERNAL_SERVER_ERROR,
     HTTP_201_CREATED, HTTP_401_UNAUTHORIZED, HTTP_200_OK, HTTP_404_NOT_FOUND,
-    HTTP_403_FORBIDDEN
+    HTTP_403_FORBIDDEN, HTTP_503_SERVICE_UNAVAILABLE
 )
 from app.models.users import User
 from flask_jwt_extended import (
-    jwt_required, get_jwt_identity
+    jwt_required, create_access_token, create_refresh_token, decode_token, get_jwt
 )
-from app.extensions import db, bcrypt
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
+from app.extensions import db
+from app.passwords import hash_password, verify_password, PasswordHasherBusy, InvalidPassword
+from app.revocation import revocations, prune_revoked_tokens
+from app.auth import admin_required, owner_or_admin, is_admin, current_user_id, load_current_user
+from app.pagination import keyset_paginate, get_page_args, PaginationError
+from app.search import search_user_ids, rebuild_user_index
+from app.conditional import is_not_modified, with_version, not_modified
+from app.fieldsets import fieldset, FieldsError
+from app.images import images
+from app.serializers import user_serializer, user_list_serializer, guide_serializer
 
 
 # Blueprint for user routes
 users = Blueprint('users', __name__, url_prefix='/api/v1/users')
 
 
+# Log in: returns a short-lived access token and a refresh token
+@users.route('/login', methods=['POST'])
+def login():
+    data = request.get_json() or {}
+    email = data.get('email')
+    password = data.get('password')
+
+    if not email or not password:
+        return jsonify({'error': 'Email and password are required'}), HTTP_400_BAD_REQUEST
+
+    try:
+        # The hash is checked and the biography returned, so load both with the row.
+        user = User.query.options(undefer(User.password), undefer(User.biography)).filter_by(email=email).first()
+
+        if not user or not verify_password(user, password):
+            return jsonify({'error': 'Invalid email or password'}), HTTP_401_UNAUTHORIZED
+
+        db.session.commit()  # persists a rehash if the cost factor changed
+
+        return jsonify({
+            'message': 'Logged in successfully',
+            'access_token': create_access_token(identity=user),
+            'refresh_token': create_refresh_token(identity=user),
+            'user': user_serializer(user)
+        }), HTTP_200_OK
+
+    except PasswordHasherBusy as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), HTTP_503_SERVICE_UNAVAILABLE
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
+
+
+# Exchange a refresh token for a new access token. The user is reloaded so a
+# deleted user gets no token and the user_type claim reflects the current role.
+@users.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    user = load_current_user()
+    if user is None:
+        return jsonify({'error': 'User no longer exists'}), HTTP_401_UNAUTHORIZED
+
+    return jsonify({'access_token': create_access_token(identity=user)}), HTTP_200_OK
+
+
+# Log out: revokes the presented token, and the refresh token if one is sent
+@users.route('/logout', methods=['POST'])
+@jwt_required(verify_type=False)
+def logout():
+    try:
+        tokens = [get_jwt()]
+        refresh_token = (request.get_json(silent=True) or {}).get('refresh_token')
+        if refresh_token:
+            tokens.append(decode_token(refresh_token))
+            if tokens[-1]['sub'] != tokens[0]['sub']:
+                return jsonify({'error': 'Refresh token belongs to another user'}), HTTP_403_FORBIDDEN
+
+        for token in tokens:
+            revocations.revoke(token, user_id=current_user_id())
+        db.session.commit()
+
+        return jsonify({'message': 'Logged out successfully'}), HTTP_200_OK
+
+    except (PyJWTError, JWTExtendedException) as e:
+        return jsonify({'error': f'Invalid refresh token: {e}'}), HTTP_400_BAD_REQUEST
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
+
+
 # Get all users (admin only)
 @users.get('/')
 @jwt_required()
 def get_all_users():
     try:
-        all_users = User.query.all()
-        users_data = []
-
-        for user in all_users:
-            users_data.append({
-                'id': user.id,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-                'username': user.get_full_name(),
-                'email': user.email,
-                'contact': user.contact,
-                'role': user.user_type,   # traveler, guide, agent, admin
-                'languages': user.languages,
-                'created_at': user.created_at
-            })
+        fields = fieldset(user_list_serializer)
+        all_users, next_cursor = keyset_paginate(User.query.options(*fields.options()), User)
+        version = fields.version(all_users, next_cursor)
+        if is_not_modified(version):
+            return not_modified(version)
 
-        return jsonify({
+        users_data = fields.serializer.many(all_users)
+
+        return with_version(jsonify({
             "message": "All users retrieved successfully",
             "total_users": len(all_users),
-            "users": users_data
-        }), HTTP_200_OK
+            "users": users_data,
+            "next_cursor": next_cursor
+        }), version), HTTP_200_OK
+
+    except (PaginationError, FieldsError) as e:
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
 
     except Exception as e:
         return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
@@ -51,28 +132,25 @@ def get_all_users():
 @jwt_required()
 def get_all_guides():
     try:
-        all_guides = User.query.filter_by(user_type='guide').all()
-        guides_data = []
-
-        for guide in all_guides:
-            guides_data.append({
-                'id': guide.id,
-                'first_name': guide.first_name,
-                'last_name': guide.last_name,
-                'username': guide.get_full_name(),
-                'email': guide.email,
-                'contact': guide.contact,
-                'bio': guide.biography,
-                'languages': guide.languages,
-                'experience_years': guide.experience_years,
-                'created_at': guide.created_at
-            })
+        fields = fieldset(guide_serializer)
+        all_guides, next_cursor = keyset_paginate(
+            User.query.options(*fields.options()).filter_by(user_type='guide'), User
+        )
+        version = fields.version(all_guides, next_cursor)
+        if is_not_modified(version):
+            return not_modified(version)
 
-        return jsonify({
+        guides_data = fields.serializer.many(all_guides)
+
+        return with_version(jsonify({
             "message": "All guides retrieved successfully",
             "total_guides": len(guides_data),
-            "guides": guides_data
-        }), HTTP_200_OK
+            "guides": guides_data,
+            "next_cursor": next_cursor
+        }), version), HTTP_200_OK
+
+    except (PaginationError, FieldsError) as e:
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
 
     except Exception as e:
         return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
@@ -83,28 +161,22 @@ def get_all_guides():
 @jwt_required()
 def get_user(id):
     try:
-        user = User.query.filter_by(id=id).first()
+        fields = fieldset(user_serializer)
+        user = User.query.options(*fields.options()).filter_by(id=id).first()
         if not user:
             return jsonify({"error": "User not found"}), HTTP_404_NOT_FOUND
 
-        user_data = {
-            'id': user.id,
-            'first_name': user.first_name,
-            'last_name': user.last_name,
-            'username': user.get_full_name(),
-            'email': user.email,
-            'contact': user.contact,
-            'role': user.user_type,
-            'bio': user.biography,
-            'languages': user.languages,
-            'experience_years': getattr(user, 'experience_years', None),
-            'created_at': user.created_at
-        }
+        version = fields.version([user])
+        if is_not_modified(version):
+            return not_modified(version)
 
-        return jsonify({
+        return with_version(jsonify({
             "message": "User details retrieved successfully",
-            "user": user_data
-        }), HTTP_200_OK
+            "user": fields.serializer(user)
+        }), version), HTTP_200_OK
+
+    except FieldsError as e:
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
 
     except Exception as e:
         return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
@@ -112,19 +184,14 @@ def get_user(id):
 
 # Update user details (self or admin)
 @users.route('/edit/<int:id>', methods=['PUT', 'PATCH'])
-@jwt_required()
+@owner_or_admin('Not authorized to update this user')
 def update_user(id):
     try:
-        current_user_id = get_jwt_identity()
-        logged_in_user = User.query.filter_by(id=current_user_id).first()
-        user = User.query.filter_by(id=id).first()
+        user = User.query.options(undefer(User.biography)).filter_by(id=id).first()
 
         if not user:
             return jsonify({"error": "User not found"}), HTTP_404_NOT_FOUND
 
-        if logged_in_user.user_type != 'admin' and user.id != current_user_id:
-            return jsonify({'error': 'Not authorized to update this user'}), HTTP_403_FORBIDDEN
-
         data = request.get_json()
 
         # Fields allowed to update
@@ -134,12 +201,19 @@ def update_user(id):
         user.contact = data.get('contact', user.contact)
         user.biography = data.get('biography', user.biography)
         user.languages = data.get('languages', user.languages)
-        user.user_type = data.get('user_type', user.user_type)
-        user.experience_years = data.get('experience_years', getattr(user, 'experience_years', None))
+        if is_admin():  # only admins may change roles
+            user.user_type = data.get('user_type', user.user_type)
+        user.experience_years = data.get('experience_years', user.experience_years)
+
+        if 'image' in data:
+            # Only images uploaded to /api/v1/images/, so listings can show their thumbnails.
+            if data['image'] and not images.is_url(data['image']):
+                db.session.rollback()
+                return jsonify({'error': 'image must be a URL returned by the image upload endpoint'}), HTTP_400_BAD_REQUEST
+            user.image = data['image'] or None
 
         if "password" in data:
-            hashed_password = bcrypt.generate_password_hash(data.get('password')).decode('utf-8')
-            user.password = hashed_password
+            user.password = hash_password(data.get('password'))
 
         # Email and contact uniqueness checks
         if user.email != data.get('email', user.email):
@@ -154,20 +228,17 @@ def update_user(id):
 
         return jsonify({
             'message': f"{user.get_full_name()}'s details updated successfully",
-            'user': {
-                'id': user.id,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-                'email': user.email,
-                'contact': user.contact,
-                'role': user.user_type,
-                'bio': user.biography,
-                'languages': user.languages,
-                'experience_years': user.experience_years,
-                'updated_at': user.updated_at
-            }
+            'user': user_serializer(user)
         }), HTTP_200_OK
 
+    except InvalidPassword as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
+
+    except PasswordHasherBusy as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), HTTP_503_SERVICE_UNAVAILABLE
+
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
@@ -175,19 +246,14 @@ def update_user(id):
 
 # Delete a user (admin only)
 @users.route('/delete/<int:id>', methods=['DELETE'])
-@jwt_required()
+@admin_required('Not authorized to delete user')
 def delete_user(id):
     try:
-        current_user_id = get_jwt_identity()
-        logged_in_user = User.query.filter_by(id=current_user_id).first()
         user = User.query.filter_by(id=id).first()
 
         if not user:
             return jsonify({"error": "User not found"}), HTTP_404_NOT_FOUND
 
-        if logged_in_user.user_type != 'admin':
-            return jsonify({'error': 'Not authorized to delete user'}), HTTP_403_FORBIDDEN
-
         # Here, you can delete related records if applicable (e.g., bookings, tours)
 
         db.session.delete(user)
@@ -207,40 +273,47 @@ def search_users():
     try:
         search_query = request.args.get('query', '')
         role_filter = request.args.get('role', None)  # Optional: traveler, guide, agent
-
-        query = User.query.filter(
-            (User.first_name.ilike(f'%{search_query}%')) |
-            (User.last_name.ilike(f'%{search_query}%'))
-        )
-        if role_filter:
-            query = query.filter_by(user_type=role_filter)
-
-        users_found = query.all()
-
-        if not users_found:
+        fields = fieldset(user_serializer)
+        users_query = User.query.options(*fields.options())
+
+        if search_query.strip():
+            # Prefix search over the name-token index (see app/search.py)
+            limit, after, _ = get_page_args()
+            ranked, next_cursor = search_user_ids(search_query, role_filter, limit, after)
+            by_id = {user.id: user for user in users_query.filter(User.id.in_([uid for uid, _ in ranked]))}
+            users_found = [by_id[uid] for uid, _ in ranked if uid in by_id]
+        else:
+            query = users_query.filter_by(user_type=role_filter) if role_filter else users_query
+            users_found, next_cursor = keyset_paginate(query, User)
+
+        # A search page can come back empty with a cursor to keep scanning from.
+        if not users_found and not next_cursor:
             return jsonify({'message': 'No users found'}), HTTP_404_NOT_FOUND
 
-        results = []
-        for user in users_found:
-            results.append({
-                'id': user.id,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-                'username': user.get_full_name(),
-                'email': user.email,
-                'contact': user.contact,
-                'role': user.user_type,
-                'languages': user.languages,
-                'bio': user.biography,
-                'experience_years': getattr(user, 'experience_years', None),
-                'created_at': user.created_at
-            })
+        results = fields.serializer.many(users_found)
 
         return jsonify({
             'message': f'Users matching "{search_query}" retrieved successfully',
             'total_results': len(results),
-            'results': results
+            'results': results,
+            'next_cursor': next_cursor
         }), HTTP_200_OK
 
+    except (PaginationError, FieldsError) as e:
+        return jsonify({'error': str(e)}), HTTP_400_BAD_REQUEST
+
     except Exception as e:
         return jsonify({'error': str(e)}), HTTP_500_INTERNAL_SERVER_ERROR
+
+
+# Rebuild the search index from the users table: `flask users reindex-search`
+@users.cli.command('reindex-search')
+def reindex_search():
+    rebuild_user_index()
+    print('User search index rebuilt')
+
+
+# Delete revocation rows for tokens that have expired: `flask users prune-revoked-tokens`
+@users.cli.command('prune-revoked-tokens')
+def prune_revoked():
+    print(f'Removed {prune_revoked_tokens()} expired revoked tokens')
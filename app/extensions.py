@@ -1,13 +1,20 @@
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
+from app.replicas import RoutingSession
 
 
-migrate = Migrate()
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 bcrypt = Bcrypt()
 jwt = JWTManager()
 
 
+def init_migrate(app):
+    """Set up Flask-Migrate and its `flask db` commands.
 
+    Flask-Migrate imports Alembic, which is a large share of start-up time
+    and only needed by `flask db`, so it is imported here rather than at
+    module level.
+    """
+    from flask_migrate import Migrate
+    return Migrate(app, db)
@@ -0,0 +1,113 @@
+import hashlib
+
+from flask import request
+from sqlalchemy.orm import load_only, selectinload, undefer
+
+from app.conditional import version_of
+
+# Sparse fieldsets (?fields=id,first_name,email).
+#
+# fieldset() reads ?fields= for an endpoint's serializer and returns a
+# Fieldset holding the narrowed serializer and the loader options that fetch
+# only what its fields read (ModelSerializer.needs()): load_only() on the
+# queried model, and for each relationship a field goes through an eager load
+# limited to that field's columns. Relationships no field uses are not loaded,
+# and wide columns such as users.biography and users.password are never
+# selected unless a field shows them. Without ?fields= the endpoint's whole
+# serializer is used, so its unused columns are skipped just the same.
+#
+# Every loaded row also gets the columns in ALWAYS, which version_of() and
+# the default sort keys read, and the foreign keys its loaded relationships
+# join on. Anything else a handler reads itself (an owner id, a type it
+# checks, another sort key) must be passed as `extra`, or it is lazy-loaded
+# one row at a time.
+
+ALWAYS = ('id', 'created_at', 'updated_at')
+
+
+class FieldsError(ValueError):
+    """Raised when ?fields= names a field the endpoint does not have."""
+
+
+def requested_fields(serializer):
+    """The keys named by ?fields=, in the serializer's order; None without it."""
+    raw = request.args.get('fields')
+    if raw is None:
+        return None
+    keys = {key.strip() for key in raw.split(',') if key.strip()}
+    unknown = keys - serializer.fields.keys()
+    if unknown or not keys:
+        raise FieldsError(f'fields must be a comma-separated subset of: {", ".join(serializer.fields)}')
+    return [key for key in serializer.fields if key in keys]
+
+
+def fieldset(serializer, extra=()):
+    return Fieldset(serializer, requested_fields(serializer), extra)
+
+
+def _columns(mapper, names, relations):
+    names = set(names) | set(ALWAYS)
+    for relation in relations:
+        names.update(column.key for column in mapper.relationships[relation].local_columns)
+    return [getattr(mapper.class_, name) for name in sorted(names) if name in mapper.columns]
+
+
+def _relation_options(mapper, needs, loader):
+    options = []
+    for name, related in needs.relations.items():
+        relationship = mapper.relationships[name]
+        option = loader(getattr(mapper.class_, name))
+        if related.columns is None:
+            option = option.undefer('*')  # every column, deferred ones included
+        else:
+            option = option.load_only(*_columns(relationship.mapper, related.columns, related.relations))
+        children = _relation_options(relationship.mapper, related, loader)
+        options.append(option.options(*children) if children else option)
+    return options
+
+
+class Fieldset:
+    def __init__(self, serializer, keys=None, extra=()):
+        self.keys = keys
+        self.serializer = serializer.only(*keys) if keys else serializer
+        self.needs = self.serializer.needs()
+        if self.needs.columns is not None:
+            self.needs.columns.update(extra)
+
+    def options(self, loader=selectinload):
+        """Loader options for a query on the serializer's model.
+
+        `loader` eager-loads the relationships: selectinload for pages,
+        joinedload for a single row.
+        """
+        mapper = self.serializer.model.__mapper__
+        options = _relation_options(mapper, self.needs, loader)
+        if self.needs.columns is None:
+            options.append(undefer('*'))
+        else:
+            options.append(load_only(*_columns(mapper, self.needs.columns, self.needs.relations)))
+        return options
+
+    def related(self, objs):
+        """The related rows the fields read, for version_of()."""
+        return [getattr(obj, name) for obj in objs for name in self.needs.relations]
+
+    def version(self, objs, next_cursor=None):
+        """version_of() the rows, their related rows and the page's next_cursor, per fieldset."""
+        return self.vary(version_of(*objs, *self.related(objs), next_cursor=next_cursor))
+
+    def vary(self, version):
+        """Give each fieldset its own ETag for the same rows."""
+        if self.keys is None:
+            return version
+        etag, last_modified = version
+        etag = hashlib.sha1(f'{etag};fields={",".join(self.keys)}'.encode('utf-8')).hexdigest()
+        return etag, last_modified
+
+    def project(self, data):
+        """Narrow already-serialized dicts (e.g. from a cache) to the fieldset."""
+        if self.keys is None:
+            return data
+        if isinstance(data, dict):
+            return {key: data[key] for key in self.keys}
+        return [{key: row[key] for key in self.keys} for row in data]
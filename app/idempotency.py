@@ -0,0 +1,207 @@
+import hashlib
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, jsonify, make_response, request
+from sqlalchemy import delete, event, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.auth import current_user_id
+from app.extensions import db
+from app.models.idempotency_key import IdempotencyKey
+from app.status_codes import HTTP_400_BAD_REQUEST, HTTP_409_CONFLICT, HTTP_422_UNPROCESSABLE_ENTITY
+
+# Idempotency keys for create endpoints.
+#
+# A client that sends `Idempotency-Key: <key>` gets the handler run at most
+# once per key: the first request claims the key by inserting an
+# idempotency_key row (the (user_id, key) primary key arbitrates races
+# between workers), runs the handler and stores its response; a repeat gets
+# that response back with `Idempotent-Replayed: true`. A retry that arrives
+# while the first request is still running gets 409 with Retry-After
+# straight away rather than holding a request thread while it waits.
+#
+# The handler's own commit also marks the claim `committed`, in the same
+# transaction as its writes, and only while the claim is still this
+# request's. So once a handler has committed, its key is never released or
+# taken over, even if storing the response then fails; and a request whose
+# claim was taken over cannot commit at all. 5xx responses and exceptions
+# before that commit release the key so the client can retry. A claim older
+# than IDEMPOTENCY_LOCK_TIMEOUT that never committed (the worker died) may
+# be taken over. Keys expire after IDEMPOTENCY_KEY_TTL seconds; reusing a
+# key with a different body is a 422. Times are local, as in the models.
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+RETRY_AFTER = 1  # seconds a retry of an in-flight request is told to wait
+
+_CLAIM = 'idempotency_claim'  # session.info entry: (user_id, key, claimed_at) while the handler runs
+
+
+class ClaimLost(Exception):
+    """The handler tried to commit after another request took its key over."""
+
+
+def _now():
+    # Whole seconds: MySQL DATETIME drops fractions, and claims are matched on created_at.
+    return datetime.now().replace(microsecond=0)
+
+
+def _fingerprint():
+    digest = hashlib.sha256(f'{request.method} {request.path}\n'.encode())
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def _where(user_id, key):
+    return (IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+
+
+def _load(user_id, key):
+    db.session.rollback()  # start a fresh transaction so other workers' commits are visible
+    return db.session.execute(
+        select(IdempotencyKey).where(*_where(user_id, key)).execution_options(populate_existing=True)
+    ).scalar_one_or_none()
+
+
+def _claim(user_id, key, request_hash):
+    """Claim the key for this request: (claimed_at, None), or (None, the row holding it)."""
+    ttl = timedelta(seconds=current_app.config['IDEMPOTENCY_KEY_TTL'])
+    lock_timeout = timedelta(seconds=current_app.config['IDEMPOTENCY_LOCK_TIMEOUT'])
+
+    while True:
+        record = _load(user_id, key)
+        now = _now()
+        if record is None or record.expires_at <= now:
+            if record is not None:
+                db.session.execute(delete(IdempotencyKey).where(*_where(user_id, key),
+                                                               IdempotencyKey.expires_at <= now))
+            claim = IdempotencyKey(user_id, key, request_hash, expires_at=now + ttl)
+            claim.created_at = now
+            db.session.add(claim)
+            try:
+                db.session.commit()
+                return now, None
+            except IntegrityError:
+                continue  # another request claimed it first; look again
+
+        if record.status_code is not None or record.committed or record.request_hash != request_hash:
+            return None, record
+
+        if record.created_at <= now - lock_timeout:
+            taken = db.session.execute(
+                update(IdempotencyKey)
+                .where(*_where(user_id, key), IdempotencyKey.status_code.is_(None),
+                       IdempotencyKey.committed.is_(False), IdempotencyKey.created_at == record.created_at)
+                .values(created_at=now, expires_at=now + ttl)
+            )
+            db.session.commit()
+            if taken.rowcount == 1:
+                return now, None
+            continue
+
+        return None, record
+
+
+@event.listens_for(Session, 'before_commit')
+def _mark_committed(session):
+    claim = session.info.pop(_CLAIM, None)
+    if claim is None:
+        return
+    user_id, key, claimed_at = claim
+    marked = session.execute(
+        update(IdempotencyKey)
+        .where(*_where(user_id, key), IdempotencyKey.created_at == claimed_at)
+        .values(committed=True)
+    )
+    if marked.rowcount != 1:
+        raise ClaimLost(f'{HEADER} {key!r} was taken over by another request')
+
+
+def _in_flight():
+    response = jsonify({'error': f'A request with this {HEADER} is still being processed'})
+    response.headers['Retry-After'] = str(RETRY_AFTER)
+    return response, HTTP_409_CONFLICT
+
+
+def _replay(record, request_hash):
+    if record.request_hash != request_hash:
+        return jsonify({'error': f'{HEADER} was already used for a different request'}), HTTP_422_UNPROCESSABLE_ENTITY
+    if record.status_code is None:
+        if record.committed:
+            return jsonify({
+                'error': f'A request with this {HEADER} already succeeded, but its response was not stored'
+            }), HTTP_409_CONFLICT
+        return _in_flight()
+
+    response = current_app.response_class(record.response_body, status=record.status_code,
+                                          content_type=record.content_type)
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _claimed(user_id, key, claimed_at):
+    return (*_where(user_id, key), IdempotencyKey.created_at == claimed_at)
+
+
+def _store(user_id, key, claimed_at, response):
+    db.session.execute(
+        update(IdempotencyKey).where(*_claimed(user_id, key, claimed_at)).values(
+            status_code=response.status_code,
+            response_body=response.get_data(as_text=True),
+            content_type=response.content_type
+        )
+    )
+    db.session.commit()
+
+
+def _release(user_id, key, claimed_at):
+    db.session.execute(delete(IdempotencyKey).where(*_claimed(user_id, key, claimed_at),
+                                                    IdempotencyKey.committed.is_(False)))
+    db.session.commit()
+
+
+def idempotent(fn):
+    """Honour an Idempotency-Key header on a create endpoint. Goes under @jwt_required()."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return fn(*args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'{HEADER} must be 1 to {MAX_KEY_LENGTH} characters'}), HTTP_400_BAD_REQUEST
+
+        user_id = current_user_id()
+        request_hash = _fingerprint()
+        claimed_at, record = _claim(user_id, key, request_hash)
+        if record is not None:
+            return _replay(record, request_hash)
+
+        db.session.info[_CLAIM] = (user_id, key, claimed_at)
+        try:
+            response = make_response(fn(*args, **kwargs))
+        except Exception:
+            db.session.info.pop(_CLAIM, None)
+            record = _load(user_id, key)
+            if record is not None and record.created_at == claimed_at and not record.committed:
+                _release(user_id, key, claimed_at)
+            raise
+        db.session.info.pop(_CLAIM, None)
+
+        record = _load(user_id, key)
+        if record is None or record.created_at != claimed_at:
+            return _in_flight()  # taken over, so this request's commit was refused
+        if record.committed or response.status_code < 500:
+            _store(user_id, key, claimed_at, response)
+        else:
+            _release(user_id, key, claimed_at)
+        return response
+    return wrapper
+
+
+def prune_idempotency_keys():
+    """Delete expired keys; returns how many."""
+    result = db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= _now()))
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,270 @@
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+
+# Uploaded images: content-addressed storage and background thumbnails.
+#
+# Werkzeug spools an upload to its own temporary file as it parses the
+# request (bodies over MAX_CONTENT_LENGTH are refused while being read). It
+# is then copied in chunks to a temporary file under IMAGE_STORAGE_DIR while
+# it is hashed, and moved to originals/<ab>/<sha256>.<ext>, named by its
+# SHA-256. Uploading the same bytes again finds the file already there, so
+# identical images are stored once, and because a name never changes
+# content, responses can be cached for good (IMAGE_CACHE_MAX_AGE, immutable).
+# Only JPEG, PNG, GIF and WebP are accepted, recognised by their leading
+# bytes; anything else (SVG included) is refused.
+#
+# Thumbnails, WebP files bounded by each of IMAGE_THUMBNAIL_SIZES pixels, are
+# made by a small process pool at a lower OS priority (IMAGE_WORKERS,
+# IMAGE_NICE), so decoding multi-megabyte photos never runs on a request
+# thread. Uploads don't wait for them: a thumbnail asked for before it exists
+# is queued again and the original is served meanwhile. At most
+# IMAGE_THUMBNAIL_QUEUE images are queued per worker; beyond that new jobs
+# are dropped and made when their thumbnail is first asked for. An image
+# Pillow cannot decode keeps being served as its original.
+# IMAGE_WORKERS = 0 makes thumbnails inline (CLI, tests), and an upload
+# Pillow cannot decode is then refused. Pillow is only imported where
+# thumbnails are made.
+
+URL_PREFIX = '/api/v1/images'
+CHUNK_SIZE = 64 * 1024
+
+# Leading bytes of each accepted format: (prefix, offset) pairs, extension, content type
+_FORMATS = (
+    (((b'\xff\xd8\xff', 0),), 'jpg', 'image/jpeg'),
+    (((b'\x89PNG\r\n\x1a\n', 0),), 'png', 'image/png'),
+    (((b'GIF87a', 0),), 'gif', 'image/gif'),
+    (((b'GIF89a', 0),), 'gif', 'image/gif'),
+    (((b'RIFF', 0), (b'WEBP', 8)), 'webp', 'image/webp'),
+)
+CONTENT_TYPES = {ext: content_type for _, ext, content_type in _FORMATS}
+_name = re.compile(r'^([0-9a-f]{64})\.(%s)$' % '|'.join(CONTENT_TYPES))
+_url = re.compile(r'^%s/([0-9a-f]{64}\.(?:%s))$' % (re.escape(URL_PREFIX), '|'.join(CONTENT_TYPES)))
+
+log = logging.getLogger(__name__)
+
+
+class ImageError(ValueError):
+    pass
+
+
+class ImageTooLarge(ImageError):
+    pass
+
+
+class UnsupportedImage(ImageError):
+    pass
+
+
+def _sniff(head):
+    for signature, ext, _ in _FORMATS:
+        if all(head[offset:offset + len(prefix)] == prefix for prefix, offset in signature):
+            return ext
+    return None
+
+
+def _lower_priority(nice):
+    if nice and hasattr(os, 'nice'):
+        os.nice(nice)
+
+
+def _make_thumbnails(source, targets):
+    """Write a WebP thumbnail of `source` for each (size, path) in `targets`."""
+    from PIL import Image, ImageOps
+
+    largest = max(size for size, _ in targets)
+    with Image.open(source) as image:
+        image.draft('RGB', (largest, largest))  # JPEG: decode at a reduced scale
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+        for size, path in sorted(targets, reverse=True):
+            image.thumbnail((size, size), Image.LANCZOS)  # each size shrinks the previous one
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            partial = f'{path}.{os.getpid()}.tmp'
+            image.save(partial, 'WEBP', quality=80, method=4)
+            os.replace(partial, path)
+
+
+class ImageStore:
+    def __init__(self, root='uploads/images', max_bytes=10 * 2 ** 20, sizes=(128, 512),
+                 workers=1, queue=16, nice=10, cache_max_age=365 * 24 * 60 * 60):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.sizes = tuple(sorted(sizes))
+        self.workers = workers
+        self.queue = queue
+        self.nice = nice
+        self.cache_max_age = cache_max_age
+        self._pending = set()
+        self._failed = set()
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.root = os.path.abspath(os.path.join(app.root_path, '..', app.config.get('IMAGE_STORAGE_DIR', self.root)))
+        self.max_bytes = app.config.get('IMAGE_MAX_BYTES', self.max_bytes)
+        self.sizes = tuple(sorted(app.config.get('IMAGE_THUMBNAIL_SIZES', self.sizes)))
+        self.workers = app.config.get('IMAGE_WORKERS', self.workers)
+        self.queue = app.config.get('IMAGE_THUMBNAIL_QUEUE', self.queue)
+        self.nice = app.config.get('IMAGE_NICE', self.nice)
+        self.cache_max_age = app.config.get('IMAGE_CACHE_MAX_AGE', self.cache_max_age)
+
+    # Paths and URLs
+
+    def original_path(self, name):
+        """Path of the original stored as `name` (<sha256>.<ext>); None for a malformed name."""
+        if not _name.match(name):
+            return None
+        return os.path.join(self.root, 'originals', name[:2], name)
+
+    def thumbnail_path(self, name, size):
+        digest = name.split('.', 1)[0]
+        return os.path.join(self.root, 'thumbnails', str(size), digest[:2], f'{digest}.webp')
+
+    @staticmethod
+    def url(name):
+        return f'{URL_PREFIX}/{name}'
+
+    def thumbnail_urls(self, name):
+        digest = name.split('.', 1)[0]
+        return {str(size): f'{URL_PREFIX}/{digest}/{size}.webp' for size in self.sizes}
+
+    def is_url(self, image_url):
+        """Whether `image_url` is the URL of an original stored here."""
+        match = _url.match(image_url or '')
+        return bool(match) and os.path.exists(self.original_path(match.group(1)))
+
+    def thumbnail_url(self, image_url, size=None):
+        """Thumbnail URL for an image URL this store served, else None.
+
+        `size` defaults to the smallest thumbnail, the one listings show.
+        """
+        match = _url.match(image_url or '')
+        if not match or not self.sizes:
+            return None
+        return f'{URL_PREFIX}/{match.group(1).split(".", 1)[0]}/{size or self.sizes[0]}.webp'
+
+    def describe(self, name):
+        digest, ext = name.split('.', 1)
+        return {'id': digest, 'content_type': CONTENT_TYPES[ext], 'url': self.url(name),
+                'thumbnails': self.thumbnail_urls(name)}
+
+    def find(self, digest):
+        """Name of the stored original with this digest, if any."""
+        for ext in CONTENT_TYPES:
+            name = f'{digest}.{ext}'
+            path = self.original_path(name)
+            if path and os.path.exists(path):
+                return name
+        return None
+
+    # Storing
+
+    def save(self, stream):
+        """Store the image read from `stream`; returns (name, created).
+
+        `created` is False when the same bytes were already stored. Raises
+        ImageTooLarge past IMAGE_MAX_BYTES and UnsupportedImage for a format
+        other than JPEG, PNG, GIF or WebP, or (thumbnailing inline) for a
+        file that only starts like one.
+        """
+        incoming = os.path.join(self.root, 'incoming')
+        os.makedirs(incoming, exist_ok=True)
+        fd, partial = tempfile.mkstemp(dir=incoming)
+        try:
+            sha, size, head = hashlib.sha256(), 0, b''
+            with os.fdopen(fd, 'wb') as out:
+                for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise ImageTooLarge(f'Images may be at most {self.max_bytes // 2 ** 20} MB')
+                    if len(head) < 16:
+                        head = (head + chunk)[:16]
+                    sha.update(chunk)
+                    out.write(chunk)
+            ext = _sniff(head)
+            if ext is None:
+                raise UnsupportedImage('Images must be JPEG, PNG, GIF or WebP')
+
+            name = f'{sha.hexdigest()}.{ext}'
+            path = self.original_path(name)
+            created = not os.path.exists(path)
+            if created:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.chmod(partial, 0o644)
+                os.replace(partial, path)  # atomic: readers see the whole file or none
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+
+        if not self.make_thumbnails(name) and not self.workers:
+            if created:
+                os.remove(path)
+            raise UnsupportedImage('The image could not be decoded')
+        return name, created
+
+    # Thumbnails
+
+    def _pool(self):
+        # Created lazily, and again after a fork, so each server worker owns its pool.
+        if self._executor is None or self._pid != os.getpid():
+            from concurrent.futures import ProcessPoolExecutor
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_lower_priority, initargs=(self.nice,)
+            )
+            self._pid = os.getpid()
+            self._pending = set()
+        return self._executor
+
+    def make_thumbnails(self, name):
+        """Queue the missing thumbnails of `name`; False if none could be queued."""
+        targets = [(size, self.thumbnail_path(name, size)) for size in self.sizes]
+        targets = [(size, path) for size, path in targets if not os.path.exists(path)]
+        if not targets:
+            return True
+        source = self.original_path(name)
+        if not self.workers:
+            if name in self._failed:
+                return False
+            try:
+                _make_thumbnails(source, targets)
+            except Exception as e:  # Pillow cannot read it
+                self._failed.add(name)
+                log.warning('Could not make thumbnails of %s: %s', name, e)
+                return False
+            return True
+        with self._lock:
+            pool = self._pool()
+            if name in self._pending:
+                return True
+            if name in self._failed:
+                return False
+            if len(self._pending) >= max(self.workers, 1) * self.queue:
+                return False
+            self._pending.add(name)
+            future = pool.submit(_make_thumbnails, source, targets)
+        future.add_done_callback(lambda done: self._finished(name, done))
+        return True
+
+    def _finished(self, name, future):
+        failed = not future.cancelled() and future.exception() is not None
+        with self._lock:
+            self._pending.discard(name)
+            if failed:
+                self._failed.add(name)  # not retried by this worker; the original is served
+        if failed:
+            log.warning('Could not make thumbnails of %s: %s', name, future.exception())
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()  # outside the lock: pending jobs' callbacks take it
+
+
+images = ImageStore()
@@ -0,0 +1,27 @@
+from datetime import date
+from decimal import Decimal
+
+from flask.json.provider import DefaultJSONProvider
+
+from app.profiling import timed
+
+# The app's JSON provider. It lives apart from app.serializers so create_app()
+# can install it without importing the models and compiling the serializers.
+
+
+def json_default(value):
+    if isinstance(value, date):  # covers datetime too
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that emits ISO dates and skips key sorting."""
+    default = staticmethod(json_default)
+    sort_keys = False
+
+    @timed('serialize')
+    def dumps(self, obj, **kwargs):
+        return super().dumps(obj, **kwargs)
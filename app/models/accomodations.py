@@ -4,14 +4,16 @@ from datetime import datetime
 class Accomodation(db.Model):
     __tablename__="accomodation"
     id = db.Column(db.Integer,primary_key=True)
+    user_id = db.Column(db.Integer,db.ForeignKey('users.id'))  # creator
     full_names = db.Column(db.String(150),nullable=False)
     address = db.Column(db.String(100),nullable=False,default='UGX')
-    type = db.Column(db.String,nullable=False)
-    created_at = db.Column(db.DateTime,default=datetime.now())
-    updated_at = db.Column(db.DateTime,onupdate=datetime.now())
+    type = db.Column(db.String(50),nullable=False)
+    created_at = db.Column(db.DateTime,default=datetime.now)
+    updated_at = db.Column(db.DateTime,onupdate=datetime.now)
 
-    def __init__(self,full_names,address,type):
+    def __init__(self,full_names,address,type,user_id=None):
         super(Accomodation, self).__init__()
+        self.user_id = user_id
         self.full_names = full_names
         self.address = address
         self.type = type
@@ -4,15 +4,31 @@ from datetime import datetime
 class Booking(db.Model):
     __tablename__="customer"
     id = db.Column(db.Integer,primary_key=True)
+    user_id = db.Column(db.Integer,db.ForeignKey('users.id'))
+    accommodation_id = db.Column(db.Integer,db.ForeignKey('accomodation.id'))
+    tour_id = db.Column(db.Integer,db.ForeignKey('tour.id'))
     booking_date = db.Column(db.Integer,nullable=False)
     number_of_people= db.Column(db.Integer,nullable=False)
     total_price = db.Column(db.Integer,nullable=False,default='UGX')
-    status = db.Column(db.String,nullable=False)
-    created_at = db.Column(db.DateTime,default=datetime.now())
-    updated_at = db.Column(db.DateTime,onupdate=datetime.now())
+    status = db.Column(db.String(50),nullable=False)
+    created_at = db.Column(db.DateTime,default=datetime.now)
+    updated_at = db.Column(db.DateTime,onupdate=datetime.now)
 
-    def __init__(self,booking_date,number_of_people,total_price,status):
+    user = db.relationship('User')
+    accommodation = db.relationship('Accomodation')
+    tour = db.relationship('Tour')
+
+    __table_args__ = (
+        db.Index('ix_customer_user_id_id', 'user_id', 'id'),  # a user's bookings, keyset-paged
+        db.Index('ix_customer_tour_id_status', 'tour_id', 'status', 'number_of_people'),  # seat totals
+        db.Index('ix_customer_accommodation_id', 'accommodation_id'),
+    )
+
+    def __init__(self,booking_date,number_of_people,total_price,status,user_id=None,accommodation_id=None,tour_id=None):
         super(Booking, self).__init__()
+        self.user_id = user_id
+        self.accommodation_id = accommodation_id
+        self.tour_id = tour_id
         self.booking_date = booking_date
         self.number_of_people = number_of_people
         self.total_price = total_price
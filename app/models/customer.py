@@ -9,7 +9,7 @@ class Customer(db.Model):
     phone_number = db.Column(db.String(20), nullable=False)  # Phone numbers should be strings (to allow +, - etc)
     address = db.Column(db.String(100), nullable=False, default='UGX')
     passport_number = db.Column(db.String(50), nullable=False)
-    biography = db.Column(db.Text, nullable=False)
+    biography = db.deferred(db.Column(db.Text, nullable=False))  # wide; loaded on first access
     image = db.Column(db.String(255), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)  # Use utcnow (no parentheses)
     updated_at = db.Column(db.DateTime, onupdate=datetime.utcnow)  # Same here
@@ -0,0 +1,31 @@
+from app.extensions import db
+from datetime import datetime
+
+class IdempotencyKey(db.Model):
+    """A client's Idempotency-Key and the response it got, kept by app.idempotency.
+
+    The (user_id, key) primary key is what stops two retries from both
+    running the handler. `status_code` stays NULL while the first request
+    is still in flight; `committed` is set by the handler's own commit.
+    """
+    __tablename__ = "idempotency_key"
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    key = db.Column(db.String(255), primary_key=True)
+    request_hash = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer)
+    response_body = db.Column(db.Text)
+    content_type = db.Column(db.String(100))
+    committed = db.Column(db.Boolean, default=False, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __init__(self, user_id, key, request_hash, expires_at):
+        super(IdempotencyKey, self).__init__()
+        self.user_id = user_id
+        self.key = key
+        self.request_hash = request_hash
+        self.expires_at = expires_at
+
+    def __repr__(self):
+        return f'IdempotencyKey({self.user_id}, {self.key!r})'
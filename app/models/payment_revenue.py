@@ -0,0 +1,17 @@
+from app.extensions import db
+
+class PaymentRevenue(db.Model):
+    """Payments rolled up per (day, payment_method, status), kept in sync by app.revenue.
+
+    `day` is the date the payment was recorded (Payment.created_at). The
+    primary key starts with `day`, so a date range is an index range scan.
+    """
+    __tablename__ = "payment_revenue"
+    day = db.Column(db.Date, primary_key=True)
+    payment_method = db.Column(db.String(250), primary_key=True)
+    status = db.Column(db.String(50), primary_key=True)
+    payment_count = db.Column(db.Integer, nullable=False, default=0)
+    amount_total = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'PaymentRevenue({self.day}, {self.payment_method!r}, {self.status!r})'
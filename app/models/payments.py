@@ -4,14 +4,28 @@ from datetime import datetime
 class Payment(db.Model):
     __tablename__="payment"
     id = db.Column(db.Integer,primary_key=True)
+    user_id = db.Column(db.Integer,db.ForeignKey('users.id'))
+    booking_id = db.Column(db.Integer,db.ForeignKey('customer.id'))  # bookings live in the "customer" table
     payment_date = db.Column(db.String(150),nullable=False)
     amount = db.Column(db.Integer,nullable=False)
     payment_method= db.Column(db.String(250),nullable=False)
-    created_at = db.Column(db.DateTime,default=datetime.now())
-    updated_at = db.Column(db.DateTime,onupdate=datetime.now())
+    status = db.Column(db.String(50),nullable=False,default='pending')
+    created_at = db.Column(db.DateTime,default=datetime.now)
+    updated_at = db.Column(db.DateTime,onupdate=datetime.now)
 
-    def __init__(self,payment_date,amount,payment_method):
+    user = db.relationship('User')
+    booking = db.relationship('Booking')
+
+    __table_args__ = (
+        db.Index('ix_payment_user_id_id', 'user_id', 'id'),  # a user's payments, keyset-paged
+        db.Index('ix_payment_booking_id_status', 'booking_id', 'status'),
+    )
+
+    def __init__(self,payment_date,amount,payment_method,user_id=None,booking_id=None,status='pending'):
         super(Payment, self).__init__()
+        self.user_id = user_id
+        self.booking_id = booking_id
+        self.status = status
         self.payment_date = payment_date
         self.amount = amount
         self.payment_method = payment_method
@@ -0,0 +1,26 @@
+from app.extensions import db
+from datetime import datetime
+
+class RevokedToken(db.Model):
+    """A JWT revoked before its expiry (logout), by its `jti` claim.
+
+    The table is the durable copy of app.revocation's in-memory set; rows past
+    `expires_at` can be deleted since the token would be rejected anyway.
+    """
+    __tablename__ = "revoked_token"
+
+    jti = db.Column(db.String(36), primary_key=True)
+    token_type = db.Column(db.String(10), nullable=False)
+    user_id = db.Column(db.Integer)  # not a foreign key: a revocation outlives its user
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    def __init__(self, jti, token_type, expires_at, user_id=None):
+        super(RevokedToken, self).__init__()
+        self.jti = jti
+        self.token_type = token_type
+        self.expires_at = expires_at
+        self.user_id = user_id
+
+    def __repr__(self):
+        return f'RevokedToken({self.jti!r}, {self.token_type})'
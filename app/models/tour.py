@@ -4,24 +4,37 @@ from datetime import datetime
 class Tour(db.Model):
     __tablename__ = 'tour'
     id = db.Column(db.Integer,primary_key=True)
+    user_id = db.Column(db.Integer,db.ForeignKey('users.id'))  # creator
     tour_name = db.Column(db.String(100),unique=True)
     destination = db.Column(db.String(150),nullable=False)
     start_date = db.Column(db.Date(),nullable=False)
     end_date= db.Column(db.Date(),nullable=False)
     price = db.Column(db.String(100),nullable=False,default='UGX')
     max_group_size = db.Column(db.Integer,nullable=False)
-    created_at = db.Column(db.DateTime,default=datetime.now())
-    updated_at = db.Column(db.DateTime,onupdate=datetime.now())
+    seats_booked = db.Column(db.Integer,nullable=False,default=0,server_default='0')  # kept up to date by app.availability
+    created_at = db.Column(db.DateTime,default=datetime.now)
+    updated_at = db.Column(db.DateTime,onupdate=datetime.now)
 
-    def __init__(self,tour_name,destination,start_date,end_date,price,max_group_size):
+    __table_args__ = (
+        db.Index('ix_tour_start_end_date', 'start_date', 'end_date'),
+        db.Index('ix_tour_created_at_id', 'created_at', 'id'),  # ?sort=created_at pages
+    )
+
+    def __init__(self,tour_name,destination,start_date,end_date,price,max_group_size,user_id=None):
         super(Tour, self).__init__()
+        self.user_id = user_id
         self.tour_name = tour_name
         self.destination = destination
         self.start_date = start_date
         self.end_date = end_date
         self.price = price
-        self.price = price
+        self.max_group_size = max_group_size
+        self.seats_booked = 0
 
+    @property
+    def seats_left(self):
+        return self.max_group_size - (self.seats_booked or 0)
+    seats_left.fget.columns = ('max_group_size', 'seats_booked')  # read by ?fields= (app/fieldsets.py)
 
     def __repr__(self):
         return f'{self.name} {self.destination}'
@@ -5,12 +5,28 @@ class TourAssignment(db.Model):
     __tablename__ = "tour_assignment"
     
     id = db.Column(db.Integer, primary_key=True)
+    tour_id = db.Column(db.Integer, db.ForeignKey('tour.id'))
+    guide_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     assignment_date = db.Column(db.String(150), nullable=False)
+    # The tour's dates, copied here by app.scheduling so a guide's schedule is one index range
+    start_date = db.Column(db.Date)
+    end_date = db.Column(db.Date)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, onupdate=datetime.utcnow)
 
-    def __init__(self, assignment_date):
+    tour = db.relationship('Tour')
+    guide = db.relationship('User')  # guides are users with user_type='guide'
+
+    __table_args__ = (
+        db.Index('ix_tour_assignment_guide_id_tour_id', 'guide_id', 'tour_id'),
+        db.Index('ix_tour_assignment_tour_id', 'tour_id'),
+        db.Index('ix_tour_assignment_guide_schedule', 'guide_id', 'start_date', 'end_date'),  # overlap checks
+    )
+
+    def __init__(self, assignment_date, tour_id=None, guide_id=None):
         super(TourAssignment, self).__init__()
+        self.tour_id = tour_id
+        self.guide_id = guide_id
         self.assignment_date = assignment_date
         
     def __repr__(self):
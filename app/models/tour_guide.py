@@ -6,10 +6,10 @@ class Tour_guide(db.Model):
     id = db.Column(db.Integer,primary_key=True)
     full_names = db.Column(db.String(150),nullable=False)
     email = db.Column(db.String(255),nullable=False)
-    biography = db.Column(db.Text, nullable=False)
+    biography = db.deferred(db.Column(db.Text, nullable=False))  # wide; loaded on first access
     image = db.Column(db.String(250), nullable=True)
-    created_at = db.Column(db.DateTime,default=datetime.now())
-    updated_at = db.Column(db.DateTime,onupdate=datetime.now())
+    created_at = db.Column(db.DateTime,default=datetime.now)
+    updated_at = db.Column(db.DateTime,onupdate=datetime.now)
 
     def __init__(self,full_names,email,phone_number,language,biography,image):
         super(Tour_guide, self).__init__()
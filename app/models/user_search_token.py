@@ -0,0 +1,21 @@
+from app.extensions import db
+
+class UserSearchToken(db.Model):
+    """One row per (name token, user), kept in sync by app.search.
+
+    The primary key doubles as the index for prefix scans on `token`; the
+    second index serves searches filtered by role, and the third checks a
+    user's other tokens (and finds them to reindex or delete).
+    """
+    __tablename__ = "user_search_token"
+    token = db.Column(db.String(50), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    user_type = db.Column(db.String(20))
+
+    __table_args__ = (
+        db.Index('ix_user_search_token_type_token', 'user_type', 'token', 'user_id'),
+        db.Index('ix_user_search_token_user_token', 'user_id', 'token'),
+    )
+
+    def __repr__(self):
+        return f'UserSearchToken({self.token!r}, {self.user_id})'
@@ -1,5 +1,6 @@
 from app.extensions import db
 from datetime import datetime
+from app.images import images
 class User(db.Model):
     __tablename__="users"
     id = db.Column(db.Integer,primary_key=True)
@@ -8,11 +9,22 @@ class User(db.Model):
     email = db.Column(db.String(100),nullable=False,unique=True)
     contact = db.Column(db.String(50),nullable=False,unique=True)
     image = db.Column(db.String(255),nullable=True)
-    password = db.Column(db.Text(),nullable=False)
-    biography = db.Column(db.Text, nullable=False)
+    # Wide columns are deferred: they load on first access, or with the query
+    # when it asks for them (undefer(), load_only(), app/fieldsets.py).
+    password = db.deferred(db.Column(db.Text(),nullable=False))
+    biography = db.deferred(db.Column(db.Text, nullable=False))
     user_type = db.Column(db.String(20),default='users')
-    created_at = db.Column(db.DateTime,default=datetime.now())
-    updated_at = db.Column(db.DateTime,onupdate=datetime.now())
+    languages = db.Column(db.String(255),nullable=True)
+    experience_years = db.Column(db.Integer,nullable=True)
+    created_at = db.Column(db.DateTime,default=datetime.now)
+    updated_at = db.Column(db.DateTime,onupdate=datetime.now)
+
+    # Guide/customer listings filter on user_type and keyset-page by id or created_at.
+    __table_args__ = (
+        db.Index('ix_users_created_at_id', 'created_at', 'id'),
+        db.Index('ix_users_user_type_id', 'user_type', 'id'),
+        db.Index('ix_users_user_type_created_at', 'user_type', 'created_at', 'id'),
+    )
 
     def __init__(self,first_name,last_name,email,contact,password,biography,user_type,image=None):
         super(User, self).__init__()
@@ -28,3 +40,9 @@ class User(db.Model):
 
     def get_full_name(self):
         return f'{self.last_name} {self.first_name}'
+    get_full_name.columns = ('first_name', 'last_name')  # read by ?fields= (app/fieldsets.py)
+
+    def get_thumbnail(self):
+        # None unless image is an upload's URL (app/images.py)
+        return images.thumbnail_url(self.image)
+    get_thumbnail.columns = ('image',)
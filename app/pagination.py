@@ -0,0 +1,127 @@
+import base64
+import json
+from datetime import date, datetime
+
+from flask import request
+from sqlalchemy import and_, or_
+
+# Keyset (cursor) pagination shared by every list endpoint.
+# Instead of OFFSET we remember the sort key of the last row we sent and ask
+# for rows strictly after it, so page 1000 costs the same as page 1.
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+SORT_KEYS = ('id', 'created_at')
+
+
+class PaginationError(ValueError):
+    """Raised when ?limit=, ?after= or ?sort= cannot be used."""
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        raise PaginationError('Invalid cursor')
+    if not isinstance(values, list):
+        raise PaginationError('Invalid cursor')
+    return values
+
+
+def get_page_args(sort_keys=SORT_KEYS, default_sort='id'):
+    """Read ?limit=, ?after= and ?sort= from the current request."""
+    try:
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise PaginationError('limit must be an integer')
+    if limit < 1:
+        raise PaginationError('limit must be at least 1')
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    sort = request.args.get('sort', default_sort)
+    if sort not in sort_keys:
+        raise PaginationError(f'sort must be one of: {", ".join(sort_keys)}')
+
+    after = request.args.get('after')
+    return limit, (decode_cursor(after) if after else None), sort
+
+
+def _after_clause(model, sort, values):
+    if sort == 'id':
+        if len(values) != 1 or not isinstance(values[0], int):
+            raise PaginationError('Invalid cursor')
+        return model.id > values[0]
+
+    # Other sort keys (created_at, start_date) are not unique, so id breaks ties.
+    if len(values) != 2 or not isinstance(values[1], int):
+        raise PaginationError('Invalid cursor')
+    column = getattr(model, sort)
+    value, last_id = values
+    if value is None:
+        # NULLs sort first; continue inside the NULL group, then the rest.
+        return or_(
+            and_(column.is_(None), model.id > last_id),
+            column.isnot(None)
+        )
+    try:
+        value = _parse_value[column.type.python_type](value)
+    except (KeyError, TypeError, ValueError):
+        raise PaginationError('Invalid cursor')
+    return or_(
+        column > value,
+        and_(column == value, model.id > last_id)
+    )
+
+
+_parse_value = {datetime: datetime.fromisoformat, date: date.fromisoformat}
+
+
+def _cursor_for(row, sort):
+    if sort == 'id':
+        return encode_cursor([row.id])
+    value = getattr(row, sort)
+    return encode_cursor([value.isoformat() if value else None, row.id])
+
+
+def keyset_query(query, model, sort_keys=SORT_KEYS, default_sort='id'):
+    """Filter, order and limit `query` (a Query or a select()) for the request's page.
+
+    Returns (query, limit, sort); pass the rows it yields to keyset_page().
+    """
+    limit, after, sort = get_page_args(sort_keys, default_sort)
+
+    if after is not None:
+        query = query.filter(_after_clause(model, sort, after))
+
+    if sort == 'id':
+        query = query.order_by(model.id)
+    else:
+        query = query.order_by(getattr(model, sort), model.id)
+
+    # Fetch one extra row to learn whether another page exists.
+    return query.limit(limit + 1), limit, sort
+
+
+def keyset_page(rows, limit, sort):
+    """Trim keyset_query()'s rows to the page; returns (rows, next_cursor)."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, _cursor_for(rows[-1], sort)
+
+
+def keyset_paginate(query, model, sort_keys=SORT_KEYS, default_sort='id'):
+    """Apply the request's page args to `query`.
+
+    `sort_keys` are the ?sort= values the endpoint allows; each should lead
+    an index on the queried table so pages stay cheap.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    query, limit, sort = keyset_query(query, model, sort_keys, default_sort)
+    return keyset_page(query.all(), limit, sort)
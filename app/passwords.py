@@ -0,0 +1,134 @@
+import os
+import re
+import threading
+
+# Password hashing service.
+#
+# bcrypt is deliberately slow (~250 ms at cost 12), so hashes run in a small
+# process pool instead of on the request thread. The pool's processes run at
+# a lower OS priority (PASSWORD_HASH_NICE), so a burst of logins waits for
+# CPU rather than starving every other request in the worker. At most
+# PASSWORD_HASH_WORKERS * PASSWORD_HASH_QUEUE hashes may be in flight; beyond
+# that callers wait up to PASSWORD_HASH_TIMEOUT seconds and then get
+# PasswordHasherBusy.
+#
+# The cost factor is PASSWORD_HASH_ROUNDS. verify_password() rehashes a
+# stored hash whose cost differs, so changing the setting migrates users as
+# they log in. PASSWORD_HASH_WORKERS = 0 hashes inline (CLI, tests).
+# bcrypt only reads the first 72 bytes (and bcrypt 5 refuses more), so a
+# longer password is refused with InvalidPassword before reaching the pool.
+# bcrypt and the process pool machinery are imported on first use, which
+# keeps them out of worker boot and CLI start-up.
+
+_cost = re.compile(r'^\$2[abxy]?\$(\d\d)\$')
+MAX_PASSWORD_BYTES = 72
+
+
+class PasswordHasherBusy(RuntimeError):
+    pass
+
+
+class InvalidPassword(ValueError):
+    pass
+
+
+def _is_hashable(password):
+    return isinstance(password, str) and 0 < len(password.encode('utf-8')) <= MAX_PASSWORD_BYTES
+
+
+def _lower_priority(nice):
+    if nice and hasattr(os, 'nice'):
+        os.nice(nice)
+
+
+def _hash(password, rounds):
+    import bcrypt as _bcrypt
+    return _bcrypt.hashpw(password.encode('utf-8'), _bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _check(password, hashed):
+    import bcrypt as _bcrypt
+    try:
+        return _bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    except ValueError:  # not a bcrypt hash (e.g. legacy plain-text rows)
+        return False
+
+
+class PasswordHasher:
+    def __init__(self, rounds=12, workers=2, queue=4, timeout=10, nice=10):
+        self.rounds = rounds
+        self.workers = workers
+        self.nice = nice
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max(workers, 1) * queue)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.rounds = app.config.get('PASSWORD_HASH_ROUNDS', self.rounds)
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', self.workers)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', self.timeout)
+        self.nice = app.config.get('PASSWORD_HASH_NICE', self.nice)
+        queue = app.config.get('PASSWORD_HASH_QUEUE', 4)
+        self._slots = threading.BoundedSemaphore(max(self.workers, 1) * queue)
+
+    def _pool(self):
+        # Created lazily, and again after a fork, so each server worker owns its pool.
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                from concurrent.futures import ProcessPoolExecutor
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, initializer=_lower_priority, initargs=(self.nice,)
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PasswordHasherBusy('Password hashing is busy, try again shortly')
+        try:
+            return self._pool().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        if not _is_hashable(password):
+            raise InvalidPassword(f'password must be a non-empty string of at most {MAX_PASSWORD_BYTES} bytes')
+        return self._run(_hash, password, self.rounds)
+
+    def check(self, hashed, password):
+        if not hashed or not _is_hashable(password):
+            return False  # nothing that could not be hashed matches
+        return self._run(_check, password, hashed)
+
+    def needs_rehash(self, hashed):
+        match = _cost.match(hashed or '')
+        return match is None or int(match.group(1)) != self.rounds
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+hasher = PasswordHasher()
+
+
+def hash_password(password):
+    return hasher.hash(password)
+
+
+def verify_password(user, password):
+    """Check `password` against user.password, upgrading the hash if its cost is stale.
+
+    A rehash only changes user.password; the caller commits it.
+    """
+    if not hasher.check(user.password, password):
+        return False
+    if hasher.needs_rehash(user.password):
+        user.password = hasher.hash(password)
+    return True
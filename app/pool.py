@@ -0,0 +1,120 @@
+import bisect
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+from app.extensions import db
+
+# Connection pool tuning and telemetry.
+#
+# pool_options() turns the DB_POOL_* settings in Config into engine options.
+# Queue-pooled engines use TimedQueuePool, which times every checkout (the
+# wait for a free slot plus any new connection or pre-ping) into a
+# histogram, so the pool can be sized from how long requests actually wait.
+
+# Upper bounds of the checkout wait histogram, in milliseconds.
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def _uses_static_pool(url):
+    # Flask-SQLAlchemy puts in-memory SQLite on a single shared connection.
+    url = make_url(url)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def pool_options(config):
+    """Engine options for SQLALCHEMY_ENGINE_OPTIONS from the DB_POOL_* keys."""
+    options = {'pool_pre_ping': config['DB_POOL_PRE_PING']}
+    if _uses_static_pool(config['SQLALCHEMY_DATABASE_URI']):
+        return options
+    options.update(
+        poolclass=TimedQueuePool,
+        pool_size=config['DB_POOL_SIZE'],
+        max_overflow=config['DB_MAX_OVERFLOW'],
+        pool_timeout=config['DB_POOL_TIMEOUT'],
+        pool_recycle=config['DB_POOL_RECYCLE'],
+    )
+    return options
+
+
+class WaitStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def observe(self, wait_ms, timed_out=False):
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.total_ms += wait_ms
+            self.max_ms = max(self.max_ms, wait_ms)
+            self.buckets[bisect.bisect_left(WAIT_BUCKETS_MS, wait_ms)] += 1
+
+    def snapshot(self):
+        with self._lock:
+            labels = [f'le_{bound}ms' for bound in WAIT_BUCKETS_MS] + ['gt_%dms' % WAIT_BUCKETS_MS[-1]]
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'avg_ms': round(self.total_ms / self.checkouts, 3) if self.checkouts else None,
+                'max_ms': round(self.max_ms, 3),
+                'histogram': dict(zip(labels, self.buckets)),
+            }
+
+
+class TimedQueuePool(QueuePool):
+    stats = None
+
+    def connect(self):
+        if self.stats is None:
+            return super().connect()
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.stats.observe((time.perf_counter() - start) * 1000, timed_out)
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep counting into the same stats.
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+def init_pool_telemetry(app):
+    with app.app_context():
+        for engine in db.engines.values():
+            if isinstance(engine.pool, TimedQueuePool) and engine.pool.stats is None:
+                engine.pool.stats = WaitStats()
+
+
+def pool_status():
+    """Live counters and wait histogram for each engine, keyed by bind."""
+    status = {}
+    for bind, engine in db.engines.items():
+        pool = engine.pool
+        entry = {'pool_class': type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            entry.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                idle=pool.checkedin(),
+                overflow=max(pool.overflow(), 0),
+                max_overflow=pool._max_overflow,
+                timeout=pool.timeout(),
+            )
+        if getattr(pool, 'stats', None) is not None:
+            entry['wait'] = pool.stats.snapshot()
+        status[bind or 'default'] = entry
+    return status
@@ -0,0 +1,119 @@
+import time
+from functools import wraps
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+
+from app.extensions import db
+
+# Per-request profiling.
+#
+# With SQL_PROFILING on, every response carries a Server-Timing header:
+#
+#   Server-Timing: db;dur=12.40;desc="7 queries", serialize;dur=1.85, total;dur=19.02
+#
+# and any statement slower than SLOW_QUERY_MS is logged with the endpoint that
+# ran it. Only the number of bound parameters is logged, never their values,
+# which include password hashes and email addresses. With it off, init_profiling() registers no
+# hooks at all and timed() costs one global lookup per call.
+
+_enabled = False
+
+
+def _new_profile():
+    g._profile = {'queries': 0, 'db': 0.0, 'serialize': 0.0, 'start': time.perf_counter()}
+    return g._profile
+
+
+def _profile():
+    return g.get('_profile') or _new_profile()
+
+
+def timed(bucket):
+    """Add the wrapped function's run time to the request's `bucket` total."""
+    def wrapper(fn):
+        @wraps(fn)
+        def timed_fn(*args, **kwargs):
+            if not _enabled or not has_request_context():
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _profile()[bucket] += time.perf_counter() - start
+        return timed_fn
+    return wrapper
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_query_start', []).append((context, time.perf_counter()))
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['_query_start'].pop()[1]
+    in_request = has_request_context()
+    if in_request:
+        profile = _profile()
+        profile['queries'] += 1
+        profile['db'] += elapsed
+
+    if has_app_context() and elapsed * 1000 >= current_app.config['SLOW_QUERY_MS']:
+        current_app.logger.warning(
+            'Slow query (%.1f ms) in %s: %s; %s',
+            elapsed * 1000, request.endpoint if in_request else '<no request>',
+            ' '.join(statement.split()), _count_parameters(parameters, executemany)
+        )
+
+
+def _count_parameters(parameters, executemany):
+    if executemany:
+        return f'{len(parameters)} parameter sets'
+    return f'{len(parameters or ())} parameters'
+
+
+def _handle_error(exception_context):
+    # The statement failed, so after_cursor_execute won't pop its start time.
+    # Only pop one pushed for this statement: errors raised before the cursor
+    # ran (connecting, compiling) never pushed one.
+    if exception_context.connection is None:
+        return
+    starts = exception_context.connection.info.get('_query_start')
+    if starts and starts[-1][0] is exception_context.execution_context:
+        starts.pop()
+
+
+def server_timing(profile):
+    total = (time.perf_counter() - profile['start']) * 1000
+    return (
+        f'db;dur={profile["db"] * 1000:.2f};desc="{profile["queries"]} queries", '
+        f'serialize;dur={profile["serialize"] * 1000:.2f}, '
+        f'total;dur={total:.2f}'
+    )
+
+
+def instrument_engine(engine):
+    """Count and time `engine`'s statements (a no-op unless SQL_PROFILING is on)."""
+    if _enabled and not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(engine, 'handle_error', _handle_error)
+
+
+def init_profiling(app):
+    global _enabled
+    if not app.config.get('SQL_PROFILING'):
+        return
+    _enabled = True
+
+    with app.app_context():
+        for engine in db.engines.values():
+            instrument_engine(engine)
+
+    @app.before_request
+    def _start_profile():
+        _new_profile()
+
+    @app.after_request
+    def _add_server_timing(response):
+        response.headers['Server-Timing'] = server_timing(_profile())
+        return response
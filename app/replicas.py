@@ -0,0 +1,119 @@
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+
+# Read-replica routing.
+#
+# Replicas are extra Flask-SQLAlchemy binds named replica_0, replica_1, ...
+# built from SQLALCHEMY_REPLICA_URIS. RoutingSession sends plain SELECTs to a
+# healthy replica while the current request is marked read-only; everything
+# else (flushes, Core INSERT/UPDATE/DELETE, CLI and background work) stays on
+# the primary. A request is read-only when it is a GET/HEAD, the client has
+# not written within DB_READ_PRIMARY_WINDOW seconds (tracked with a cookie,
+# or forced with an X-Read-Primary header), and nothing in the request has
+# been flushed yet. Unhealthy replicas are skipped until a later health check
+# passes; with none left, reads fall back to the primary.
+
+REPLICA_BIND_PREFIX = 'replica_'
+READ_PRIMARY_COOKIE = 'read_primary'
+READ_PRIMARY_HEADER = 'X-Read-Primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_health = {}
+_health_lock = threading.Lock()
+_round_robin = itertools.count()
+
+
+def replica_binds(config):
+    """SQLALCHEMY_BINDS entries for the configured replicas."""
+    binds = dict(config.get('SQLALCHEMY_BINDS') or {})
+    for index, uri in enumerate(config.get('SQLALCHEMY_REPLICA_URIS') or ()):
+        binds[f'{REPLICA_BIND_PREFIX}{index}'] = uri
+    return binds
+
+
+def _replica_engines(engines):
+    return [(key, engine) for key, engine in engines.items()
+            if key and key.startswith(REPLICA_BIND_PREFIX)]
+
+
+def _is_healthy(key, engine):
+    now = time.monotonic()
+    with _health_lock:
+        healthy, checked_at = _health.get(key, (None, 0))
+    if healthy is not None and now - checked_at < current_app.config['DB_REPLICA_HEALTH_INTERVAL']:
+        return healthy
+    try:
+        with engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+        healthy = True
+    except Exception:
+        current_app.logger.warning('Read replica %s failed its health check', key)
+        healthy = False
+    with _health_lock:
+        _health[key] = (healthy, now)
+    return healthy
+
+
+def replica_health(engines):
+    return {key: _is_healthy(key, engine) for key, engine in _replica_engines(engines)}
+
+
+def _reads_from_replica():
+    return has_request_context() and g.get('db_read_replica', False)
+
+
+@contextmanager
+def use_primary():
+    """Read from the primary inside this block, e.g. before caching a result."""
+    previous = g.get('db_read_replica', False)
+    g.db_read_replica = False
+    try:
+        yield
+    finally:
+        g.db_read_replica = previous
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        primary = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if (bind is not None or self._flushing or self.info.get('wrote')
+                or not getattr(clause, 'is_select', False) or not _reads_from_replica()):
+            return primary
+        engines = self._db.engines
+        if primary is not engines.get(None):
+            return primary
+        replicas = _replica_engines(engines)
+        for offset in range(len(replicas)):
+            key, engine = replicas[(next(_round_robin) + offset) % len(replicas)]
+            if _is_healthy(key, engine):
+                return engine
+        return primary
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _pin_to_primary(session, flush_context):
+    # Read your own writes for the rest of this session.
+    session.info['wrote'] = True
+
+
+def init_replica_routing(app):
+    @app.before_request
+    def _route_reads():
+        g.db_read_replica = (
+            request.method in SAFE_METHODS
+            and READ_PRIMARY_COOKIE not in request.cookies
+            and not request.headers.get(READ_PRIMARY_HEADER)
+        )
+
+    @app.after_request
+    def _stick_writer_to_primary(response):
+        window = app.config['DB_READ_PRIMARY_WINDOW']
+        if request.method not in SAFE_METHODS and response.status_code < 400 and window:
+            response.set_cookie(READ_PRIMARY_COOKIE, '1', max_age=window, httponly=True)
+        return response
@@ -0,0 +1,140 @@
+from importlib import import_module
+
+from sqlalchemy import delete, event, func, inspect, insert, select, update
+
+from app.extensions import db
+from app.models.payments import Payment
+from app.models.payment_revenue import PaymentRevenue
+
+# Daily revenue rollups.
+#
+# payment_revenue holds one row per (day, payment_method, status) with the
+# number of payments and their total amount. Payment writes adjust the
+# matching rows in the same flush (an upsert that adds to the counters), so a
+# revenue report reads a few rows per day instead of aggregating payments.
+# Payments without created_at (rows older than that column) are left out of
+# the rollup; rebuild_revenue() skips them the same way.
+
+GROUP_BY_FIELDS = ('day', 'payment_method', 'status')
+
+_table = PaymentRevenue.__table__
+_dialect_modules = {'sqlite': 'sqlite', 'postgresql': 'postgresql', 'mysql': 'mysql', 'mariadb': 'mysql'}
+
+
+def _key(created_at, payment_method, status):
+    if created_at is None:
+        return None
+    return created_at.date(), payment_method, status
+
+
+def _previous(state, name):
+    history = state.attrs[name].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(state.object, name)
+
+
+def _upsert(dialect):
+    # The dialect modules are imported on first use; each costs start-up time.
+    return import_module(f'sqlalchemy.dialects.{_dialect_modules[dialect]}').insert(_table)
+
+
+def _bump(connection, key, count, amount):
+    """Add `count` payments worth `amount` to the rollup row for `key`."""
+    if key is None or (not count and not amount):
+        return
+    day, payment_method, status = key
+    values = {'day': day, 'payment_method': payment_method, 'status': status,
+              'payment_count': count, 'amount_total': amount}
+    dialect = connection.dialect.name
+
+    if dialect in ('sqlite', 'postgresql'):
+        stmt = _upsert(dialect).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[_table.c.day, _table.c.payment_method, _table.c.status],
+            set_={'payment_count': _table.c.payment_count + stmt.excluded.payment_count,
+                  'amount_total': _table.c.amount_total + stmt.excluded.amount_total}
+        )
+    elif dialect in ('mysql', 'mariadb'):
+        stmt = _upsert(dialect).values(**values)
+        stmt = stmt.on_duplicate_key_update(
+            payment_count=_table.c.payment_count + stmt.inserted.payment_count,
+            amount_total=_table.c.amount_total + stmt.inserted.amount_total
+        )
+    else:
+        updated = connection.execute(
+            update(_table)
+            .where(_table.c.day == day, _table.c.payment_method == payment_method, _table.c.status == status)
+            .values(payment_count=_table.c.payment_count + count, amount_total=_table.c.amount_total + amount)
+        )
+        if updated.rowcount:
+            return
+        stmt = insert(_table).values(**values)
+    connection.execute(stmt)
+
+
+def revenue_report(date_from=None, date_to=None, group_by=GROUP_BY_FIELDS):
+    """Rows of payment_count/amount_total per `group_by` fields, plus the overall totals."""
+    columns = [_table.c[field] for field in group_by]
+    query = select(*columns,
+                   func.sum(_table.c.payment_count).label('payment_count'),
+                   func.sum(_table.c.amount_total).label('amount_total'))
+    if date_from:
+        query = query.where(_table.c.day >= date_from)
+    if date_to:
+        query = query.where(_table.c.day <= date_to)
+    query = query.group_by(*columns).having(func.sum(_table.c.payment_count) > 0).order_by(*columns)
+
+    rows = [dict(row._mapping) for row in db.session.execute(query)]
+    totals = {
+        'payment_count': sum(row['payment_count'] for row in rows),
+        'amount_total': sum(row['amount_total'] for row in rows),
+    }
+    return rows, totals
+
+
+def rebuild_revenue():
+    """Recompute payment_revenue from the payments table (backfill)."""
+    day = func.date(Payment.created_at)
+    totals = (
+        select(day, Payment.payment_method, Payment.status, func.count(), func.coalesce(func.sum(Payment.amount), 0))
+        .where(Payment.created_at.isnot(None))
+        .group_by(day, Payment.payment_method, Payment.status)
+    )
+    db.session.execute(delete(_table))
+    db.session.execute(insert(_table).from_select(
+        ['day', 'payment_method', 'status', 'payment_count', 'amount_total'], totals
+    ))
+    db.session.commit()
+
+
+# Load the old value when these are reassigned on an expired Payment, so
+# _move_revenue can take it off the row it was counted in.
+for _attr in (Payment.amount, Payment.payment_method, Payment.status, Payment.created_at):
+    event.listen(_attr, 'set', lambda *args: None, active_history=True)
+
+
+@event.listens_for(Payment, 'after_insert')
+def _add_revenue(mapper, connection, target):
+    _bump(connection, _key(target.created_at, target.payment_method, target.status), 1, int(target.amount))
+
+
+@event.listens_for(Payment, 'after_update')
+def _move_revenue(mapper, connection, target):
+    state = inspect(target)
+    if not any(state.attrs[name].history.has_changes()
+               for name in ('amount', 'payment_method', 'status', 'created_at')):
+        return
+    old_key = _key(_previous(state, 'created_at'), _previous(state, 'payment_method'), _previous(state, 'status'))
+    old_amount = int(_previous(state, 'amount'))
+    new_key = _key(target.created_at, target.payment_method, target.status)
+    if old_key == new_key:
+        _bump(connection, new_key, 0, int(target.amount) - old_amount)
+    else:
+        _bump(connection, old_key, -1, -old_amount)
+        _bump(connection, new_key, 1, int(target.amount))
+
+
+@event.listens_for(Payment, 'before_delete')
+def _remove_revenue(mapper, connection, target):
+    _bump(connection, _key(target.created_at, target.payment_method, target.status), -1, -int(target.amount))
@@ -0,0 +1,131 @@
+import heapq
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, select
+
+from app.extensions import db
+from app.models.revoked_token import RevokedToken
+from app.replicas import use_primary
+
+# Token revocation index.
+#
+# Revoked JWT ids live in an in-process dict, so the blocklist check on every
+# protected request is a dict lookup. Entries go away when the token would
+# have expired anyway (a heap ordered by `exp` makes pruning cheap), and the
+# dict never grows past JWT_REVOCATION_MAX_ENTRIES: if it has to drop a live
+# entry, tokens expiring before that entry's expiry are checked against the
+# table until then, so a full index is slower but never wrong.
+#
+# revoked_token is the durable copy. Each worker loads it on first use and
+# then picks up other workers' revocations every JWT_REVOCATION_SYNC_INTERVAL
+# seconds, which bounds how long a logged-out token works on another worker.
+# Those two cases are the only ones where a check reads the database;
+# may_query() tells async callers when to make it off the event loop.
+
+SYNC_OVERLAP = timedelta(seconds=2)  # re-read rows near the watermark; clocks and commits race
+
+
+def _utc(exp):
+    return datetime.fromtimestamp(exp, timezone.utc).replace(tzinfo=None)
+
+
+class RevocationIndex:
+    def __init__(self, max_entries=100000, sync_interval=5):
+        self.max_entries = max_entries
+        self.sync_interval = sync_interval
+        self._revoked = {}
+        self._expiry = []
+        self._evicted_until = 0
+        self._watermark = None
+        self._synced_at = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('JWT_REVOCATION_MAX_ENTRIES', self.max_entries)
+        self.sync_interval = app.config.get('JWT_REVOCATION_SYNC_INTERVAL', self.sync_interval)
+
+    def _add(self, jti, exp, now):
+        if exp <= now:
+            return
+        self._revoked[jti] = exp
+        heapq.heappush(self._expiry, (exp, jti))
+
+    def _prune(self, now):
+        while self._expiry and (self._expiry[0][0] <= now or len(self._revoked) > self.max_entries):
+            exp, jti = heapq.heappop(self._expiry)
+            if self._revoked.get(jti) == exp:
+                del self._revoked[jti]
+                if exp > now:
+                    self._evicted_until = max(self._evicted_until, exp)
+
+    def _sync_due(self, now):
+        return self._synced_at is None or now - self._synced_at >= self.sync_interval
+
+    def may_query(self):
+        """Whether the next is_revoked() may read the database: a sync is due or the index is full."""
+        return self._sync_due(time.monotonic()) or self._evicted_until > time.time()
+
+    def _sync(self):
+        started = time.monotonic()
+        if not self._sync_due(started):
+            return
+        query = select(RevokedToken.jti, RevokedToken.expires_at, RevokedToken.revoked_at).where(
+            RevokedToken.expires_at > datetime.utcnow()
+        )
+        if self._watermark is not None:
+            query = query.where(RevokedToken.revoked_at >= self._watermark - SYNC_OVERLAP)
+        with use_primary():
+            rows = db.session.execute(query).all()
+        now = time.time()
+        with self._lock:
+            for jti, expires_at, revoked_at in rows:
+                self._add(jti, expires_at.replace(tzinfo=timezone.utc).timestamp(), now)
+                if self._watermark is None or revoked_at > self._watermark:
+                    self._watermark = revoked_at
+            if self._watermark is None:
+                self._watermark = datetime.utcnow()
+            self._prune(now)
+            self._synced_at = started
+
+    def is_revoked(self, jwt_payload):
+        self._sync()
+        jti = jwt_payload['jti']
+        if jti in self._revoked:
+            return True
+        if jwt_payload['exp'] <= self._evicted_until:
+            with use_primary():
+                return db.session.get(RevokedToken, jti) is not None
+        return False
+
+    def revoke(self, jwt_payload, user_id=None):
+        """Revoke a decoded token. Adds the row to the session; the caller commits."""
+        db.session.merge(RevokedToken(
+            jti=jwt_payload['jti'],
+            token_type=jwt_payload['type'],
+            expires_at=_utc(jwt_payload['exp']),
+            user_id=user_id
+        ))
+        now = time.time()
+        with self._lock:
+            self._add(jwt_payload['jti'], jwt_payload['exp'], now)
+            self._prune(now)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._revoked),
+                'max_entries': self.max_entries,
+                'overflowing_until': _utc(self._evicted_until).isoformat() if self._evicted_until > time.time() else None,
+            }
+
+
+revocations = RevocationIndex()
+
+
+def prune_revoked_tokens():
+    """Delete rows for tokens that have expired anyway; returns how many."""
+    result = db.session.execute(delete(RevokedToken).where(RevokedToken.expires_at <= datetime.utcnow()))
+    db.session.commit()
+    return result.rowcount
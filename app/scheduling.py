@@ -0,0 +1,107 @@
+from sqlalchemy import event, exists, inspect, select, update
+
+from app.extensions import db
+from app.models.tour import Tour
+from app.models.tour_assignment import TourAssignment
+from app.models.users import User
+
+# Guide scheduling.
+#
+# An assignment keeps its guide busy from the tour's start_date to its
+# end_date (inclusive). Those dates are copied onto tour_assignment, and kept
+# there when an assignment moves to another tour or a tour is rescheduled, so
+# each guide's schedule is a range in the (guide_id, start_date, end_date)
+# index. "Does this overlap?" is then one index probe per guide, and "which
+# guides are free?" is an anti-join that probes each candidate guide's range
+# rather than looking at every assignment.
+#
+# Writers lock the tour's row, then the guides' rows (lock_tour, lock_guide,
+# lock_tour_guides), and read conflicts with locking reads: under MySQL's
+# REPEATABLE READ a plain SELECT answers from the snapshot of the
+# transaction's first read, which can predate the assignment committed by
+# whoever held the guide's lock before. Taking tours before guides, and
+# guides in id order, keeps concurrent writers from deadlocking.
+
+_assignment_table = TourAssignment.__table__
+_tour_table = Tour.__table__
+
+
+def _overlapping(start_date, end_date):
+    return (TourAssignment.start_date <= end_date, TourAssignment.end_date >= start_date)
+
+
+def lock_tour(tour_id):
+    """Lock the tour's row until commit and return the tour with its current dates."""
+    return db.session.execute(
+        select(Tour).where(Tour.id == tour_id).with_for_update().execution_options(populate_existing=True)
+    ).scalar_one_or_none()
+
+
+def lock_tour_guides(tour_id):
+    """Lock the rows of the guides assigned to the tour until commit."""
+    # MySQL doesn't lock (or read current rows of) a subquery without its own FOR UPDATE
+    guides = select(TourAssignment.guide_id).where(TourAssignment.tour_id == tour_id).with_for_update()
+    db.session.execute(select(User.id).where(User.id.in_(guides)).order_by(User.id).with_for_update())
+
+
+def lock_guide(guide_id):
+    """Lock the guide's row until commit so concurrent assignments are checked one at a time."""
+    return db.session.execute(
+        select(User.id).where(User.id == guide_id, User.user_type == 'guide').with_for_update()
+    ).scalar_one_or_none()
+
+
+def guide_conflicts(guide_id, start_date, end_date, exclude_id=None):
+    """The guide's assignments that overlap [start_date, end_date]."""
+    query = TourAssignment.query.filter(TourAssignment.guide_id == guide_id, *_overlapping(start_date, end_date))
+    if exclude_id is not None:
+        query = query.filter(TourAssignment.id != exclude_id)
+    return query.order_by(TourAssignment.start_date).with_for_update().all()
+
+
+def reschedule_conflicts(tour_id, start_date, end_date):
+    """Assignments on other tours that would clash if `tour_id` moved to these dates."""
+    guides = select(TourAssignment.guide_id).where(TourAssignment.tour_id == tour_id).with_for_update().scalar_subquery()
+    return TourAssignment.query.filter(
+        TourAssignment.guide_id.in_(guides),
+        TourAssignment.tour_id != tour_id,
+        *_overlapping(start_date, end_date)
+    ).order_by(TourAssignment.guide_id, TourAssignment.start_date).with_for_update().all()
+
+
+def free_guides_query(start_date, end_date):
+    """Guides with no assignment overlapping [start_date, end_date]."""
+    busy = exists().where(TourAssignment.guide_id == User.id, *_overlapping(start_date, end_date))
+    return User.query.filter(User.user_type == 'guide', ~busy)
+
+
+def rebuild_assignment_dates():
+    """Copy every tour's dates onto its assignments (backfill)."""
+    for column in ('start_date', 'end_date'):
+        tour_date = select(_tour_table.c[column]).where(_tour_table.c.id == _assignment_table.c.tour_id)
+        db.session.execute(update(_assignment_table).values({column: tour_date.scalar_subquery()}))
+    db.session.commit()
+
+
+@event.listens_for(TourAssignment, 'before_insert')
+@event.listens_for(TourAssignment, 'before_update')
+def _copy_tour_dates(mapper, connection, target):
+    if target.start_date is not None and not inspect(target).attrs.tour_id.history.has_changes():
+        return
+    dates = connection.execute(
+        select(_tour_table.c.start_date, _tour_table.c.end_date)
+        .where(_tour_table.c.id == target.tour_id).with_for_update()  # the dates the conflict check saw
+    ).first()
+    target.start_date, target.end_date = dates if dates else (None, None)
+
+
+@event.listens_for(Tour, 'after_update')
+def _move_assignments(mapper, connection, target):
+    state = inspect(target)
+    if not (state.attrs.start_date.history.has_changes() or state.attrs.end_date.history.has_changes()):
+        return
+    connection.execute(
+        update(_assignment_table)
+        .where(_assignment_table.c.tour_id == target.id)
+        .values(start_date=target.start_date, end_date=target.end_date)
+    )
@@ -0,0 +1,178 @@
+import re
+
+from sqlalchemy import and_, case, delete, event, func, inspect, insert, literal, or_, select
+
+from app.extensions import db
+from app.models.users import User
+from app.models.user_search_token import UserSearchToken
+from app.pagination import PaginationError, encode_cursor
+
+# Indexed user search.
+#
+# Every user's first and last name are split into lower-cased tokens stored in
+# user_search_token. A search term matches a token by prefix, answered as an
+# index range scan (token >= 'jo' AND token < 'jp') that works on MySQL and
+# SQLite alike, so we never scan the users table.
+#
+# A search walks the range of its rarest term in (token, user_id) order and
+# keeps the users whose other tokens match the other terms, probed through
+# the (user_id, token) index. The walk stops once the page is full or after
+# a fixed number of rows (SCAN_LIMIT, split among the terms), so a one-letter
+# prefix over a million users costs the same as a full name. The exact token sorts first in its prefix range, so
+# exact matches come first; each row's score (exact 2, prefix 1 per term) is
+# returned with it. Pages continue from a (term, token, user_id) cursor.
+
+TOKEN_MAX_LENGTH = 50
+MAX_TERMS = 5
+SCAN_LIMIT = 2000  # index rows one page may walk, split among its terms
+EXACT_MATCH_SCORE = 2
+PREFIX_MATCH_SCORE = 1
+
+_token_table = UserSearchToken.__table__
+_split = re.compile(r'[^\w]+', re.UNICODE).split
+
+
+def tokenize(*values):
+    tokens = set()
+    for value in values:
+        for token in _split((value or '').lower()):
+            if token:
+                tokens.add(token[:TOKEN_MAX_LENGTH])
+    return tokens
+
+
+def _prefix_upper_bound(term):
+    # Smallest string greater than every string starting with `term`.
+    return term[:-1] + chr(ord(term[-1]) + 1)
+
+
+def _user_token_rows(user_id, first_name, last_name, user_type):
+    return [
+        {'token': token, 'user_id': user_id, 'user_type': user_type}
+        for token in tokenize(first_name, last_name)
+    ]
+
+
+def _term_range(table, term, role):
+    condition = and_(table.c.token >= term, table.c.token < _prefix_upper_bound(term))
+    return and_(table.c.user_type == role, condition) if role else condition
+
+
+def _rarest_term(terms, role):
+    # Capped counts: enough to tell a rare term from a common one without
+    # walking the whole range of a one-letter prefix.
+    t = _token_table
+    counts = [
+        select(func.count()).select_from(
+            select(literal(1)).where(_term_range(t, term, role)).limit(SCAN_LIMIT).subquery()
+        ).scalar_subquery()
+        for term in terms
+    ]
+    counts = db.session.execute(select(*counts)).one()
+    return min(zip(counts, terms), key=lambda pair: (pair[0], -len(pair[1])))[1]
+
+
+def search_user_ids(query, role=None, limit=50, after=None):
+    """Ids of users whose names match every term in `query`, with their scores.
+
+    Returns ([(user_id, score), ...], next_cursor). A page may be short (even
+    empty) with a next_cursor when few of the scanned users match every term.
+    """
+    terms = sorted(tokenize(query))[:MAX_TERMS]
+    if not terms:
+        return [], None
+
+    if after is not None:
+        if (len(after) != 3 or not all(isinstance(value, str) for value in after[:2])
+                or not isinstance(after[2], int) or after[0] not in terms):
+            raise PaginationError('Invalid cursor')
+        driver = after[0]
+    else:
+        driver = terms[0] if len(terms) == 1 else _rarest_term(terms, role)
+    others = [term for term in terms if term != driver]
+
+    # Walk the driver's range in index order, stopping after `scan` rows: each
+    # other term costs an index probe per row walked.
+    scan = max(limit + 1, SCAN_LIMIT // len(terms))
+    d = _token_table.alias('d')
+    order = (d.c.token, d.c.user_id)
+    # One lower and one upper bound on token each, so the index seek uses both.
+    low, high = d.c.token >= driver, d.c.token < _prefix_upper_bound(driver)
+    walk = [d.c.user_type == role] if role else []
+    if after is not None:
+        _, last_token, last_id = after
+        low = d.c.token >= max(driver, last_token)
+        walk.append(or_(d.c.token > last_token, and_(d.c.token == last_token, d.c.user_id > last_id)))
+    bound = db.session.execute(
+        select(*order).where(low, high, *walk).order_by(*order).offset(scan - 1).limit(1)
+    ).first()
+    if bound:
+        high = d.c.token <= bound.token
+        walk.append(or_(d.c.token < bound.token, and_(d.c.token == bound.token, d.c.user_id <= bound.user_id)))
+    walk += [low, high]
+
+    def has_token(condition):
+        o = _token_table.alias()
+        return select(o.c.user_id).where(o.c.user_id == d.c.user_id, condition(o)).exists()
+
+    score = case((d.c.token == driver, EXACT_MATCH_SCORE), else_=PREFIX_MATCH_SCORE)
+    for term in others:
+        score = score + case((has_token(lambda o, term=term: o.c.token == term), EXACT_MATCH_SCORE),
+                             else_=PREFIX_MATCH_SCORE)
+    stmt = (
+        select(*order, score.label('score'))
+        .where(*walk)
+        .where(*(has_token(lambda o, term=term: _term_range(o, term, None)) for term in others))
+        # A user is listed once, at their first token in the driver's range.
+        .where(~has_token(lambda o: and_(o.c.token >= driver, o.c.token < d.c.token)))
+        .order_by(*order)
+        .limit(limit + 1)
+    )
+
+    rows = db.session.execute(stmt).all()
+    # Short page: carry on after the last row scanned, if the walk was cut off.
+    last = rows[limit - 1] if len(rows) > limit else bound
+    ranked = [(row.user_id, int(row.score)) for row in rows[:limit]]
+    return ranked, encode_cursor([driver, last.token, last.user_id]) if last else None
+
+
+def rebuild_user_index():
+    """Recreate every token row from the users table (backfill)."""
+    db.session.execute(delete(_token_table))
+    rows = []
+    for user in db.session.execute(
+        select(User.id, User.first_name, User.last_name, User.user_type)
+    ).yield_per(1000):
+        rows.extend(_user_token_rows(*user))
+        if len(rows) >= 5000:
+            db.session.execute(insert(_token_table), rows)
+            rows = []
+    if rows:
+        db.session.execute(insert(_token_table), rows)
+    db.session.commit()
+
+
+# Keep the index in step with User writes, inside the same flush/transaction.
+
+@event.listens_for(User, 'after_insert')
+def _index_new_user(mapper, connection, target):
+    rows = _user_token_rows(target.id, target.first_name, target.last_name, target.user_type)
+    if rows:
+        connection.execute(insert(_token_table), rows)
+
+
+@event.listens_for(User, 'after_update')
+def _reindex_user(mapper, connection, target):
+    state = inspect(target)
+    if not any(state.attrs[name].history.has_changes()
+               for name in ('first_name', 'last_name', 'user_type')):
+        return
+    connection.execute(delete(_token_table).where(_token_table.c.user_id == target.id))
+    rows = _user_token_rows(target.id, target.first_name, target.last_name, target.user_type)
+    if rows:
+        connection.execute(insert(_token_table), rows)
+
+
+@event.listens_for(User, 'before_delete')
+def _unindex_user(mapper, connection, target):
+    connection.execute(delete(_token_table).where(_token_table.c.user_id == target.id))
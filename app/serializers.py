@@ -0,0 +1,278 @@
+from sqlalchemy import Date, DateTime, Numeric, Float
+
+from app.models.users import User
+from app.models.tour import Tour
+from app.models.booking import Booking
+from app.models.payments import Payment
+from app.models.accomodations import Accomodation
+from app.models.tour_assignment import TourAssignment
+from app.profiling import timed
+from app.json_provider import JSONProvider, json_default  # noqa: F401 (re-exported)
+
+# Declarative model serializers.
+#
+# Each serializer is declared once as {output key: source} and compiled at
+# import time into a single function that builds the dict in one expression,
+# so serializing a row costs one call instead of a loop of getattr/isinstance
+# checks. Date/datetime columns are converted to ISO strings and Numeric
+# columns to strings while the dict is built, so the JSON encoder never has
+# to fall back to its slow `default` hook for them.
+#
+# A source is one of:
+#   'column'             - attribute on the model
+#   'relation.column'    - attribute reached through relationships (None-safe)
+#   'method()'           - zero-argument method, optionally behind relations
+#   Nested('relation', serializer)
+#   any callable taking the object
+#
+# needs() works out which columns and relationships a serializer reads, for
+# loading only those (see app/fieldsets.py). A method or property source
+# counts as the columns listed in its function's `columns` attribute; one
+# without it, or a callable, counts as every column of its model.
+
+
+class Nested:
+    def __init__(self, path, serializer):
+        self.path = path
+        self.serializer = serializer
+
+
+def _column_converter(model, path):
+    """Return the conversion to apply to the column at `path`, if any."""
+    mapper = model.__mapper__
+    *relations, attr = path.split('.')
+    for name in relations:
+        mapper = mapper.relationships[name].mapper
+    column = mapper.columns.get(attr)
+    if column is None:
+        return None
+    if isinstance(column.type, (Date, DateTime)):
+        return 'iso'
+    if isinstance(column.type, Numeric) and not isinstance(column.type, Float):
+        return 'str'
+    return None
+
+
+class Needs:
+    """Columns (None: all of them) and relationships read from one model."""
+
+    def __init__(self):
+        self.columns = set()
+        self.relations = {}
+
+    def add_column(self, name):
+        if self.columns is not None:
+            self.columns.add(name)
+
+    def add_all_columns(self):
+        self.columns = None
+
+    def relation(self, name):
+        return self.relations.setdefault(name, Needs())
+
+    def merge(self, other):
+        if other.columns is None:
+            self.columns = None
+        else:
+            for name in other.columns:
+                self.add_column(name)
+        for name, needs in other.relations.items():
+            self.relation(name).merge(needs)
+        return self
+
+
+def _source_needs(model, source):
+    needs = Needs()
+    if isinstance(source, Nested):
+        target, mapper = needs, model.__mapper__
+        for name in source.path.split('.'):
+            target, mapper = target.relation(name), mapper.relationships[name].mapper
+        target.merge(source.serializer.needs())
+    elif callable(source):
+        needs.add_all_columns()
+    else:
+        target, mapper = needs, model.__mapper__
+        *relations, attr = source.split('.')
+        for name in relations:
+            target, mapper = target.relation(name), mapper.relationships[name].mapper
+        if attr in mapper.columns:
+            target.add_column(attr)
+        else:
+            columns = _declared_columns(mapper.class_, attr.removesuffix('()'))
+            if columns is None:
+                target.add_all_columns()
+            else:
+                for name in columns:
+                    target.add_column(name)
+    return needs
+
+
+def _declared_columns(cls, name):
+    attr = getattr(cls, name)
+    return getattr(attr.fget if isinstance(attr, property) else attr, 'columns', None)
+
+
+class ModelSerializer:
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = dict(fields)
+        self._serialize = self._compile()
+
+    def _compile(self):
+        namespace = {}
+        entries = []
+        temp = 0
+
+        def walk(path):
+            # 'a.b.c' -> None-safe chain using walrus temporaries
+            nonlocal temp
+            call = '()' if path.endswith('()') else ''
+            parts = path[:len(path) - len(call)].split('.')
+            if not all(part.isidentifier() for part in parts):
+                raise ValueError(f'Invalid field source {path!r}')
+            parts[-1] += call
+            expr = f'obj.{parts[0]}'
+            for part in parts[1:]:
+                var = f'_v{temp}'
+                temp += 1
+                expr = f'({var}.{part} if ({var} := {expr}) is not None else None)'
+            return expr
+
+        for index, (key, source) in enumerate(self.fields.items()):
+            if isinstance(source, Nested):
+                name = f'_nested{index}'
+                namespace[name] = source.serializer._serialize
+                var = f'_v{temp}'
+                temp += 1
+                expr = f'({name}({var}) if ({var} := {walk(source.path)}) is not None else None)'
+            elif callable(source):
+                name = f'_fn{index}'
+                namespace[name] = source
+                expr = f'{name}(obj)'
+            else:
+                expr = walk(source)
+                converter = None if source.endswith('()') else _column_converter(self.model, source)
+                if converter:
+                    var = f'_v{temp}'
+                    temp += 1
+                    call = f'{var}.isoformat()' if converter == 'iso' else f'str({var})'
+                    expr = f'({call} if ({var} := {expr}) is not None else None)'
+            entries.append(f'{key!r}: {expr}')
+
+        code = 'def serialize(obj):\n    return {' + ', '.join(entries) + '}\n'
+        exec(compile(code, f'<serializer {self.model.__name__}>', 'exec'), namespace)
+        return namespace['serialize']
+
+    @timed('serialize')
+    def __call__(self, obj):
+        return self._serialize(obj)
+
+    @timed('serialize')
+    def many(self, objs):
+        serialize = self._serialize
+        return [serialize(obj) for obj in objs]
+
+    def needs(self, keys=None):
+        """Needs of the fields in `keys` (default: all of them)."""
+        needs = Needs()
+        for key in self.fields if keys is None else keys:
+            needs.merge(_source_needs(self.model, self.fields[key]))
+        return needs
+
+    def only(self, *keys):
+        """New serializer restricted to `keys`, in the order given."""
+        return ModelSerializer(self.model, {key: self.fields[key] for key in keys})
+
+    def extend(self, **fields):
+        return ModelSerializer(self.model, {**self.fields, **fields})
+
+
+user_serializer = ModelSerializer(User, {
+    'id': 'id',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'username': 'get_full_name()',
+    'email': 'email',
+    'contact': 'contact',
+    'role': 'user_type',
+    'bio': 'biography',
+    'image': 'image',
+    'thumbnail': 'get_thumbnail()',
+    'languages': 'languages',
+    'experience_years': 'experience_years',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+})
+user_list_serializer = user_serializer.only(
+    'id', 'first_name', 'last_name', 'username', 'email', 'contact', 'role',
+    'thumbnail', 'languages', 'created_at'
+)
+guide_serializer = user_serializer.only(
+    'id', 'first_name', 'last_name', 'username', 'email', 'contact', 'bio',
+    'thumbnail', 'languages', 'experience_years', 'created_at'
+)
+user_brief_serializer = ModelSerializer(User, {
+    'id': 'id',
+    'name': 'get_full_name()',
+    'email': 'email',
+})
+customer_serializer = user_brief_serializer.extend(
+    phone='contact',
+    created_at='created_at',
+)
+
+tour_serializer = ModelSerializer(Tour, {
+    'id': 'id',
+    'name': 'tour_name',
+    'destination': 'destination',
+    'price': 'price',
+    'start_date': 'start_date',
+    'end_date': 'end_date',
+    'max_group_size': 'max_group_size',
+    'seats_left': 'seats_left',
+    'created_at': 'created_at',
+})
+tour_brief_serializer = tour_serializer.only('id', 'name')
+
+accommodation_serializer = ModelSerializer(Accomodation, {
+    'id': 'id',
+    'name': 'full_names',
+    'address': 'address',
+    'type': 'type',
+    'created_at': 'created_at',
+})
+accommodation_brief_serializer = accommodation_serializer.only('id', 'name', 'address')
+
+booking_serializer = ModelSerializer(Booking, {
+    'id': 'id',
+    'user': 'user.get_full_name()',
+    'accommodation': 'accommodation.full_names',
+    'booking_date': 'booking_date',
+    'number_of_people': 'number_of_people',
+    'total_price': 'total_price',
+    'status': 'status',
+    'created_at': 'created_at',
+})
+booking_detail_serializer = booking_serializer.extend(
+    accommodation=Nested('accommodation', accommodation_brief_serializer),
+)
+
+payment_serializer = ModelSerializer(Payment, {
+    'id': 'id',
+    'user': 'user.get_full_name()',
+    'booking_id': 'booking_id',
+    'amount': 'amount',
+    'payment_method': 'payment_method',
+    'status': 'status',
+    'timestamp': 'created_at',
+})
+payment_detail_serializer = payment_serializer.only(
+    'id', 'booking_id', 'amount', 'payment_method', 'status', 'timestamp'
+)
+
+tour_assignment_serializer = ModelSerializer(TourAssignment, {
+    'id': 'id',
+    'tour': Nested('tour', tour_brief_serializer),
+    'guide': Nested('guide', user_brief_serializer.only('id', 'name')),
+    'assignment_date': 'assignment_date',
+})
@@ -2,9 +2,15 @@
 HTTP_200_OK = 200 #Data has been returned successfully
 HTTP_201_CREATED = 201 #data has been created
 HTTP_202_ACCEPTED = 202 #data has been accepted
+HTTP_307_TEMPORARY_REDIRECT = 307 #served from another URL for now
 HTTP_400_BAD_REQUEST = 400  
 HTTP_401_UNAUTHORIZED = 401
 HTTP_404_NOT_FOUND = 404
 HTTP_500_INTERNAL_SERVER_ERROR = 500
 HTTP_409_CONFLICT = 409
-HTTP_403_FORBIDDEN = 403
\ No newline at end of file
+HTTP_403_FORBIDDEN = 403
+HTTP_304_NOT_MODIFIED = 304 #client's cached copy is still current
+HTTP_503_SERVICE_UNAVAILABLE = 503 #temporarily overloaded, retry later
+HTTP_422_UNPROCESSABLE_ENTITY = 422 #request is well-formed but can't be applied (e.g. reused idempotency key)
+HTTP_413_PAYLOAD_TOO_LARGE = 413 #upload is over the size limit
+HTTP_415_UNSUPPORTED_MEDIA_TYPE = 415 #upload is not an accepted format
@@ -0,0 +1,5 @@
+from app import create_app
+from app.asgi import AsyncApp
+
+# Serve with: uvicorn asgi:application
+application = AsyncApp(create_app())
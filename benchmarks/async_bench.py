@@ -0,0 +1,282 @@
+"""Throughput of the read routes served sync (WSGI) and async (ASGI).
+
+Seeds (or reuses) the endpoint benchmark's SQLite file, then starts the app
+twice in a subprocess: once as WSGI on a fixed pool of worker threads (like
+gunicorn's gthread worker), once as ASGI under uvicorn (app/asgi.py). Each
+is driven by CLIENTS concurrent clients, one request per connection, over
+the tour, accommodation and booking list and detail routes, and the report
+gives requests per second, latency percentiles and status codes per mode.
+
+A local SQLite file answers in microseconds, which hides the round trip an
+async server saves; --db-latency-ms makes every statement wait that long on
+the thread running it, as a networked database would. aiosqlite runs each
+connection on its own thread, so the async server is bounded by --pool
+connections rather than by --threads request threads. Async only wins once
+requests spend longer waiting on the database than on the CPU: each async
+request costs a little more CPU, so when the CPU rather than the database
+is the bottleneck, sync comes out ahead.
+
+Run from the repo root:
+
+    python -m benchmarks.async_bench
+    python -m benchmarks.async_bench --clients 500 --db-latency-ms 5 --threads 16 --min-speedup 1
+
+Exits 1 if either server answers with an error, or if --min-speedup is
+given and async throughput is below that multiple of sync.
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from statistics import quantiles
+
+import config
+from benchmarks.endpoints_bench import configure, needs_seeding, parse_rows, seed
+
+MODES = ('sync', 'async')
+PATHS_PER_ROUTE = 50
+
+
+def request_paths(rows):
+    rng = random.Random(11)
+    paths = []
+    for _ in range(PATHS_PER_ROUTE):
+        paths += [
+            f'/api/v1/tours/?after={_cursor(rng.randrange(rows))}',
+            f'/api/v1/tours/{rng.randrange(1, rows + 1)}',
+            '/api/v1/tours/availability?from=2026-03-01&to=2026-06-30&people=2',
+            f'/api/v1/accommodations/?after={_cursor(rng.randrange(rows))}',
+            f'/api/v1/accommodations/{rng.randrange(1, rows + 1)}',
+            f'/api/v1/bookings/?after={_cursor(rng.randrange(rows))}',
+            f'/api/v1/bookings/{rng.randrange(1, rows + 1)}',
+        ]
+    rng.shuffle(paths)
+    return paths
+
+
+def _cursor(last_id):
+    from app.pagination import encode_cursor
+    return encode_cursor([last_id])
+
+
+# Servers (run in a subprocess with --serve)
+
+def add_db_latency(engine, seconds):
+    """Sleep `seconds` on the executing thread before every statement."""
+    from sqlalchemy import event
+
+    def wait(statement):
+        time.sleep(seconds)
+
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        if hasattr(dbapi_connection, 'run_async'):
+            # aiosqlite: install the callback from its connection thread.
+            dbapi_connection.run_async(lambda connection: connection.set_trace_callback(wait))
+        else:
+            dbapi_connection.set_trace_callback(wait)
+
+
+def serve_sync(app, port, threads):
+    from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args):
+            pass
+
+    class PooledWSGIServer(BaseWSGIServer):
+        multithread = True
+        request_queue_size = 4096
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.pool = ThreadPoolExecutor(threads)
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self._handle, request, client_address)
+
+        def _handle(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    PooledWSGIServer('127.0.0.1', port, app, handler=QuietHandler).serve_forever()
+
+
+def serve(args):
+    configure(args.db)
+    config.Config.SQL_PROFILING = False
+    config.Config.DB_POOL_SIZE = args.pool
+    config.Config.DB_MAX_OVERFLOW = 0
+    config.Config.DB_POOL_TIMEOUT = 60
+
+    from app import create_app
+    from app.extensions import db
+
+    app = create_app(lazy=False)
+    latency = args.db_latency_ms / 1000
+    if args.serve == 'sync':
+        if latency:
+            with app.app_context():
+                add_db_latency(db.engine, latency)
+        serve_sync(app, args.port, args.threads)
+    else:
+        import uvicorn
+
+        from app.asgi import AsyncApp
+
+        application = AsyncApp(app)
+        if latency:
+            add_db_latency(application.engine.sync_engine, latency)
+        uvicorn.run(application, host='127.0.0.1', port=args.port, log_level='warning',
+                    access_log=False, backlog=4096)
+
+
+# Load
+
+async def fetch(port, path, headers):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n{headers}Connection: close\r\n\r\n'.encode())
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    return int(response.split(b' ', 2)[1])
+
+
+async def drive(port, paths, headers, clients, warmup, duration):
+    results = []
+    start = time.monotonic()
+    measure_from = start + warmup
+    deadline = measure_from + duration
+
+    async def client(offset):
+        i = offset
+        while time.monotonic() < deadline:
+            path = paths[i % len(paths)]
+            i += clients
+            began = time.perf_counter()
+            try:
+                status = await fetch(port, path, headers)
+            except (OSError, ValueError, IndexError):
+                status = 'error'
+            if time.monotonic() >= measure_from:
+                results.append((time.perf_counter() - began, status))
+
+    await asyncio.gather(*(client(offset) for offset in range(clients)))
+    return results
+
+
+def wait_for_port(port, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'server exited with code {process.returncode}')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server did not listen on port {port} within {timeout}s')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def run_mode(mode, args, paths, headers):
+    port = free_port()
+    command = [sys.executable, '-m', 'benchmarks.async_bench', '--serve', mode, '--db', args.db,
+               '--port', str(port), '--threads', str(args.threads), '--pool', str(args.pool),
+               '--db-latency-ms', str(args.db_latency_ms)]
+    process = subprocess.Popen(command, cwd=os.getcwd())
+    try:
+        wait_for_port(port, process)
+        results = asyncio.run(drive(port, paths, headers, args.clients, args.warmup, args.duration))
+    finally:
+        process.terminate()
+        process.wait()
+
+    latencies = [elapsed * 1000 for elapsed, _ in results]
+    cuts = quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        'requests': len(results),
+        'rps': len(results) / args.duration,
+        'p50_ms': cuts[49],
+        'p95_ms': cuts[94],
+        'p99_ms': cuts[98],
+        'status_codes': Counter(str(status) for _, status in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=parse_rows, default=parse_rows('10k'), help='rows per table (10k, 100k, 1m)')
+    parser.add_argument('--db', help='SQLite file to seed/reuse (default: the endpoint benchmark\'s)')
+    parser.add_argument('--clients', type=int, default=500, help='concurrent clients')
+    parser.add_argument('--duration', type=float, default=15, help='seconds measured per mode')
+    parser.add_argument('--warmup', type=float, default=3, help='seconds run before measuring')
+    parser.add_argument('--threads', type=int, default=8, help='request threads of the sync server')
+    parser.add_argument('--pool', type=int, default=100, help='database connections per server')
+    parser.add_argument('--db-latency-ms', type=float, default=20, help='simulated round trip per statement')
+    parser.add_argument('--min-speedup', type=float, help='exit 1 unless async rps >= this x sync rps')
+    parser.add_argument('--serve', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    args.db = os.path.abspath(args.db or os.path.join(tempfile.gettempdir(), f'bench_{args.rows}.db'))
+    if args.serve:
+        return serve(args)
+
+    configure(args.db)
+    from flask_jwt_extended import create_access_token
+
+    from app import create_app
+
+    app = create_app(lazy=False)
+    with app.app_context():
+        if needs_seeding(args.db):
+            print(f'Seeding {args.db} with {args.rows} rows per table', flush=True)
+            seed(args.rows)
+        token = create_access_token(identity='1', additional_claims={'user_type': 'admin'})
+        paths = request_paths(args.rows)
+    headers = f'Authorization: Bearer {token}\r\n'
+
+    print(f'{args.clients} clients, {args.duration:.0f}s per mode, {args.db_latency_ms:g}ms per statement, '
+          f'{args.threads} sync threads, {args.pool} connections')
+    print(f'{"mode":<8}{"req/s":>9}{"p50":>10}{"p95":>10}{"p99":>10}  status')
+    reports = {}
+    for mode in MODES:
+        reports[mode] = report = run_mode(mode, args, paths, headers)
+        codes = ' '.join(f'{code}x{count}' for code, count in sorted(report['status_codes'].items()))
+        print(f'{mode:<8}{report["rps"]:>9.1f}{report["p50_ms"]:>8.1f}ms{report["p95_ms"]:>8.1f}ms'
+              f'{report["p99_ms"]:>8.1f}ms  {codes}', flush=True)
+
+    speedup = reports['async']['rps'] / reports['sync']['rps'] if reports['sync']['rps'] else float('inf')
+    print(f'\nasync/sync throughput: {speedup:.2f}x')
+
+    failed = [mode for mode, report in reports.items()
+              if any(code == 'error' or code.startswith('5') for code in report['status_codes'])]
+    for mode in failed:
+        print(f'FAILED {mode}: errors or 5xx responses')
+    if args.min_speedup is not None and speedup < args.min_speedup:
+        print(f'FAILED async/sync throughput {speedup:.2f}x is below {args.min_speedup:g}x')
+        failed.append('speedup')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
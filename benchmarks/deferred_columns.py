@@ -0,0 +1,163 @@
+"""Memory and latency of loading users with and without the wide columns.
+
+User.password and User.biography are deferred (app/models/users.py). This
+seeds a users table with realistic hashes and biographies, then times the
+queries handlers run with the columns deferred and, for comparison, with
+them undeferred as they used to be:
+
+  lookup  User.query.get(id), the current-user lookup in app/auth.py
+  page    a keyset page of users, as the list endpoints load it
+  all     every user at once, with tracemalloc's peak and retained memory
+
+Exits 1 if loading every user with the columns deferred does not use less
+memory than loading them undeferred.
+
+Run from the repo root:
+
+    python -m benchmarks.deferred_columns
+    python -m benchmarks.deferred_columns --users 1m --bio-bytes 4000
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime, timedelta
+from statistics import median, quantiles
+
+import config
+from benchmarks.endpoints_bench import SEED_BATCH, configure, mark_seeded, needs_seeding, parse_rows
+
+MODES = ('undeferred', 'deferred')
+PAGE_SIZE = 50
+WORDS = ('guide', 'safari', 'mountain', 'lake', 'travel', 'experience', 'wildlife', 'culture',
+         'language', 'history', 'hiking', 'birding', 'photography', 'Kampala', 'Rwenzori', 'Nile')
+
+
+def seed(users, bio_bytes):
+    from sqlalchemy import insert
+
+    from app.extensions import db
+    from app.models.users import User
+
+    rng = random.Random(42)
+    now = datetime(2026, 1, 1)
+
+    def biography():
+        words = []
+        while sum(len(word) + 1 for word in words) < bio_bytes:
+            words.append(rng.choice(WORDS))
+        return ' '.join(words)[:bio_bytes]
+
+    def user(i):
+        return {'id': i, 'first_name': f'First{i}', 'last_name': f'Last{i % 997}', 'email': f'user{i}@bench.test',
+                'contact': f'+2567{i:08d}', 'password': '$2b$12$' + ''.join(rng.choices(WORDS[0], k=53)),
+                'biography': biography(), 'user_type': 'guide' if i % 5 == 0 else 'customer',
+                'created_at': now + timedelta(seconds=i)}
+
+    db.create_all(bind_key=None)
+    for start in range(1, users + 1, SEED_BATCH):
+        db.session.execute(insert(User.__table__), [user(i) for i in range(start, min(start + SEED_BATCH, users + 1))])
+    db.session.commit()
+    mark_seeded()
+
+
+def users_query(mode):
+    from sqlalchemy.orm import undefer
+
+    from app.models.users import User
+
+    if mode == 'undeferred':
+        return User.query.options(undefer(User.password), undefer(User.biography))
+    return User.query
+
+
+def timed_runs(run, runs):
+    from app.extensions import db
+
+    samples = []
+    for _ in range(runs):
+        db.session.expunge_all()  # every run loads its rows afresh
+        start = time.perf_counter()
+        run()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def measure(mode, users, runs):
+    from app.extensions import db
+    from app.models.users import User
+
+    rng = random.Random(7)
+    query = users_query(mode)
+    warnings.filterwarnings('ignore', 'The Query.get', module=__name__)  # app/auth.py still uses it
+    lookups = timed_runs(lambda: query.get(rng.randrange(1, users + 1)), runs * 20)
+    pages = timed_runs(
+        lambda: query.filter(User.id > rng.randrange(users)).order_by(User.id).limit(PAGE_SIZE).all(), runs * 5
+    )
+    everyone = timed_runs(lambda: query.all(), runs)
+
+    db.session.expunge_all()
+    gc.collect()
+    tracemalloc.start()
+    loaded = query.all()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del loaded
+    db.session.expunge_all()
+
+    return {
+        'lookup_p50_ms': median(lookups),
+        'lookup_p95_ms': quantiles(lookups, n=20)[18],
+        'page_p50_ms': median(pages),
+        'all_ms': median(everyone),
+        'all_peak_mb': peak / 2 ** 20,
+        'all_retained_mb': retained / 2 ** 20,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--users', type=parse_rows, default=parse_rows('100k'), help='users to seed (100k, 1m)')
+    parser.add_argument('--bio-bytes', type=int, default=1500, help='biography length per user')
+    parser.add_argument('--runs', type=int, default=5, help='full loads per mode (lookups run 20x, pages 5x)')
+    parser.add_argument('--db', help='SQLite file to seed/reuse (default: temp dir, per size)')
+    args = parser.parse_args()
+
+    db_path = os.path.abspath(args.db or os.path.join(
+        tempfile.gettempdir(), f'bench_deferred_{args.users}_{args.bio_bytes}.db'))
+    configure(db_path)
+    config.Config.SQL_PROFILING = False
+
+    from app import create_app
+
+    app = create_app(lazy=False)
+    with app.app_context():
+        if needs_seeding(db_path):
+            print(f'Seeding {db_path} with {args.users} users', flush=True)
+            seed(args.users, args.bio_bytes)
+        results = {mode: measure(mode, args.users, args.runs) for mode in MODES}
+
+    print(f'{args.users} users, {args.bio_bytes}-byte biographies')
+    print(f'{"mode":<12}{"lookup p50":>12}{"lookup p95":>12}{"page p50":>10}{"all":>10}{"all peak":>11}{"retained":>11}')
+    for mode, stats in results.items():
+        print(f'{mode:<12}{stats["lookup_p50_ms"]:>10.3f}ms{stats["lookup_p95_ms"]:>10.3f}ms'
+              f'{stats["page_p50_ms"]:>8.2f}ms{stats["all_ms"]:>8.0f}ms'
+              f'{stats["all_peak_mb"]:>8.1f} MB{stats["all_retained_mb"]:>8.1f} MB')
+
+    before, after = results['undeferred'], results['deferred']
+    print(f'\ndeferred vs undeferred: lookup {after["lookup_p50_ms"] / before["lookup_p50_ms"]:.2f}x, '
+          f'page {after["page_p50_ms"] / before["page_p50_ms"]:.2f}x, all {after["all_ms"] / before["all_ms"]:.2f}x, '
+          f'peak memory {after["all_peak_mb"] / before["all_peak_mb"]:.2f}x')
+    if after['all_peak_mb'] >= before['all_peak_mb']:
+        print('FAILED deferred columns no longer save memory')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,468 @@
+"""Latency of every blueprint route against a seeded SQLite database.
+
+Seeds (or reuses) a SQLite file with ROWS rows in every table, builds the
+app through create_app with SQL profiling on, then drives each route
+through the test client from several threads. GET routes are discovered
+from the URL map; write routes use the payloads in WRITES. Routes with
+neither are listed under "skipped" in the report.
+
+The JSON report has p50/p95/p99/mean latency, queries per request (from
+the Server-Timing header), status codes per route, and process RSS.
+Compare two reports to catch regressions between versions:
+
+    python -m benchmarks.endpoints_bench --rows 10k --out before.json
+    python -m benchmarks.endpoints_bench --rows 10k --out after.json --compare before.json
+
+--rows accepts 10k, 100k, 1m or a number. Seeding 1m rows per table takes
+a few minutes; the file is reused on later runs unless --reseed is given
+or the models' tables have changed since it was seeded (a hash of their
+DDL is kept in its PRAGMA user_version).
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import platform
+import random
+import re
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from statistics import mean, quantiles
+
+import config
+
+SEED_BATCH = 10000
+PASSWORD = 'bench-password'
+BOOKING_OWNER_EVERY = 10  # every 10th booking belongs to the benchmark's admin user (id 1)
+
+
+def parse_rows(value):
+    match = re.fullmatch(r'(\d+)([km]?)', value.lower())
+    if not match:
+        raise argparse.ArgumentTypeError('rows must look like 10k, 100k, 1m or 5000')
+    return int(match.group(1)) * {'': 1, 'k': 1000, 'm': 1000000}[match.group(2)]
+
+
+def configure(db_path):
+    config.Config.SQLALCHEMY_DATABASE_URI = f'sqlite:///{db_path}'
+    config.Config.JWT_SECRET_KEY = 'endpoint-benchmark-secret-key-0123456789'
+    config.Config.SQL_PROFILING = True
+    config.Config.SLOW_QUERY_MS = float('inf')
+    config.Config.PASSWORD_HASH_ROUNDS = 4
+    config.Config.PASSWORD_HASH_WORKERS = 0
+
+
+# Seeding
+
+def _batches(rows, make):
+    batch = []
+    for i in range(1, rows + 1):
+        batch.append(make(i))
+        if len(batch) == SEED_BATCH:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def schema_version():
+    """Hash of the models' SQLite DDL, as the 32-bit integer PRAGMA user_version holds."""
+    from sqlalchemy.dialects import sqlite
+    from sqlalchemy.schema import CreateIndex, CreateTable
+
+    from app.extensions import db
+
+    dialect = sqlite.dialect()
+    tables = db.metadata.sorted_tables
+    ddl = [str(CreateTable(table).compile(dialect=dialect)) for table in tables]
+    ddl += sorted(str(CreateIndex(index).compile(dialect=dialect)) for table in tables for index in table.indexes)
+    return int(hashlib.sha256('\n'.join(ddl).encode()).hexdigest()[:7], 16)
+
+
+def needs_seeding(db_path):
+    """True if db_path is missing or was seeded for other tables, which removes it. Needs an app context."""
+    if not os.path.exists(db_path):
+        return True
+    with closing(sqlite3.connect(db_path)) as connection:
+        if connection.execute('PRAGMA user_version').fetchone()[0] == schema_version():
+            return False
+
+    from app.extensions import db
+
+    print(f'{db_path} was seeded for an older schema; reseeding', flush=True)
+    db.engine.dispose()
+    os.remove(db_path)
+    return True
+
+
+def mark_seeded():
+    from sqlalchemy import text
+
+    from app.extensions import db
+
+    db.session.execute(text(f'PRAGMA user_version = {schema_version()}'))
+    db.session.commit()
+
+
+def seed(rows):
+    from sqlalchemy import insert
+
+    from app.availability import rebuild_seat_counts
+    from app.extensions import db
+    from app.models.accomodations import Accomodation
+    from app.models.booking import Booking
+    from app.models.payments import Payment
+    from app.models.tour import Tour
+    from app.models.tour_assignment import TourAssignment
+    from app.models.users import User
+    from app.passwords import hash_password
+    from app.revenue import rebuild_revenue
+    from app.scheduling import rebuild_assignment_dates
+    from app.search import rebuild_user_index
+
+    rng = random.Random(42)
+    password = hash_password(PASSWORD)
+    now = datetime(2026, 1, 1)
+    first_day = date(2026, 1, 1)
+
+    def user(i):
+        user_type = 'admin' if i == 1 else ('guide' if i % 5 == 0 else 'customer')
+        return {'id': i, 'first_name': f'First{i}', 'last_name': f'Last{i % 997}', 'email': f'user{i}@bench.test',
+                'contact': f'+2567{i:08d}', 'password': password, 'biography': 'Seeded for benchmarks',
+                'user_type': user_type, 'created_at': now + timedelta(seconds=i)}
+
+    def tour(i):
+        start = first_day + timedelta(days=rng.randrange(365))
+        return {'id': i, 'tour_name': f'Tour {i}', 'destination': f'Destination {i % 50}', 'start_date': start,
+                'end_date': start + timedelta(days=rng.randrange(1, 10)), 'price': str(rng.randrange(50, 2000)),
+                'max_group_size': 10000, 'user_id': 1, 'created_at': now + timedelta(seconds=i)}
+
+    def accommodation(i):
+        return {'id': i, 'full_names': f'Lodge {i}', 'address': f'{i} Bench Road', 'type': 'hotel',
+                'user_id': rng.randrange(1, rows + 1), 'created_at': now + timedelta(seconds=i)}
+
+    def booking(i):
+        owner = 1 if i % BOOKING_OWNER_EVERY == 0 else rng.randrange(2, rows + 1)
+        return {'id': i, 'user_id': owner, 'tour_id': rng.randrange(1, rows + 1),
+                'accommodation_id': rng.randrange(1, rows + 1), 'booking_date': 20260101,
+                'number_of_people': rng.randrange(1, 5), 'total_price': rng.randrange(100, 5000),
+                'status': rng.choice(('pending', 'confirmed', 'cancelled')), 'created_at': now + timedelta(seconds=i)}
+
+    def payment(i):
+        return {'id': i, 'user_id': rng.randrange(1, rows + 1), 'booking_id': i, 'payment_date': '2026-01-01',
+                'amount': rng.randrange(100, 5000), 'payment_method': 'card', 'status': 'paid',
+                'created_at': now + timedelta(seconds=i)}
+
+    def assignment(i):
+        return {'id': i, 'tour_id': i, 'guide_id': 5 * rng.randrange(1, rows // 5 + 1),
+                'assignment_date': '2026-01-01', 'created_at': now + timedelta(seconds=i)}
+
+    db.create_all(bind_key=None)
+    for model, make in ((User, user), (Tour, tour), (Accomodation, accommodation), (Booking, booking),
+                        (Payment, payment), (TourAssignment, assignment)):
+        started = time.perf_counter()
+        for batch in _batches(rows, make):
+            db.session.execute(insert(model.__table__), batch)
+        db.session.commit()
+        print(f'  seeded {rows} {model.__tablename__} rows in {time.perf_counter() - started:.1f}s', flush=True)
+
+    # Core inserts skip the mapper events; run the backfills they would have done.
+    rebuild_user_index()
+    rebuild_seat_counts()
+    rebuild_revenue()
+    rebuild_assignment_dates()
+    mark_seeded()
+
+
+# Routes
+
+def route_key(method, rule):
+    return f'{method} {rule}'
+
+
+GET_QUERY_STRINGS = {
+    '/api/v1/users/search': 'query=first1&role=customer',
+    '/api/v1/tours/availability': 'from=2026-03-01&to=2026-06-30&people=2',
+    '/api/v1/payments/revenue': 'from=2026-01-01&to=2026-03-31',
+    '/api/v1/tour-assignments/free-guides': 'from=2026-03-01&to=2026-03-10',
+}
+
+# Rule -> callable(i, rows, tokens) returning (path, json body) or, for routes
+# that need a particular caller, (path, json body, headers).
+WRITES = {
+    'POST /api/v1/users/login': lambda i, rows, t: (
+        '/api/v1/users/login', {'email': f'user{random.randrange(2, rows + 1)}@bench.test', 'password': PASSWORD}),
+    'POST /api/v1/users/refresh': lambda i, rows, t: ('/api/v1/users/refresh', None),
+    'POST /api/v1/users/logout': lambda i, rows, t: ('/api/v1/users/logout', None),
+    'PUT /api/v1/users/edit/<int:id>': lambda i, rows, t: (
+        f'/api/v1/users/edit/{random.randrange(2, rows + 1)}', {'biography': f'Edited {i}'}),
+    'PUT /api/v1/customer/edit/<int:id>': lambda i, rows, t: (
+        lambda uid: (f'/api/v1/customer/edit/{uid}', {'last_name': f'Edited{i}'}, t['as_user'](uid, 'customer'))
+    )(random.choice([uid for uid in range(2, min(rows, 100) + 1) if uid % 5])),
+    'POST /api/v1/tour-guides/create': lambda i, rows, t: ('/api/v1/tour-guides/create', {
+        'first_name': 'Bench', 'last_name': f'Guide{i}', 'email': f'{uuid.uuid4().hex}@bench.test',
+        'contact': uuid.uuid4().hex[:20], 'password': PASSWORD}),
+    'PUT /api/v1/tour-guides/edit/<int:id>': lambda i, rows, t: (
+        f'/api/v1/tour-guides/edit/{5 * random.randrange(1, rows // 5 + 1)}', {'biography': f'Edited {i}'}),
+    'POST /api/v1/tours/create': lambda i, rows, t: ('/api/v1/tours/create', {
+        'name': f'Bench tour {uuid.uuid4().hex}', 'destination': 'Jinja', 'price': 300,
+        'start_date': '2026-07-01', 'end_date': '2026-07-05', 'max_group_size': 20}),
+    'PUT /api/v1/tours/edit/<int:id>': lambda i, rows, t: (
+        f'/api/v1/tours/edit/{random.randrange(1, rows + 1)}', {'destination': f'Edited {i}'}),
+    'POST /api/v1/accommodations/create': lambda i, rows, t: ('/api/v1/accommodations/create', {
+        'name': f'Bench lodge {uuid.uuid4().hex}', 'address': 'Kampala', 'type': 'hotel'}),
+    'PUT /api/v1/accommodations/edit/<int:id>': lambda i, rows, t: (
+        f'/api/v1/accommodations/edit/{random.randrange(1, rows + 1)}', {'address': f'Edited {i}'}),
+    'POST /api/v1/bookings/create': lambda i, rows, t: ('/api/v1/bookings/create', {
+        'tour_id': random.randrange(1, rows + 1), 'booking_date': 20260301, 'number_of_people': 1,
+        'total_price': 300}),
+    'POST /api/v1/bookings/bulk': lambda i, rows, t: ('/api/v1/bookings/bulk', {'bookings': [
+        {'tour_id': random.randrange(1, rows + 1), 'booking_date': 20260301, 'number_of_people': 1,
+         'total_price': 300} for _ in range(20)]}),
+    'PUT /api/v1/bookings/edit/<int:id>': lambda i, rows, t: (
+        f'/api/v1/bookings/edit/{random.randrange(1, rows + 1)}', {'status': 'confirmed', 'number_of_people': 2}),
+    'POST /api/v1/payments/create': lambda i, rows, t: ('/api/v1/payments/create', {
+        'booking_id': BOOKING_OWNER_EVERY * random.randrange(1, rows // BOOKING_OWNER_EVERY + 1),
+        'amount': 300, 'payment_method': 'card'}),
+    'PUT /api/v1/payments/edit/<int:id>': lambda i, rows, t: (
+        f'/api/v1/payments/edit/{random.randrange(1, rows + 1)}', {'status': 'paid'}),
+    'POST /api/v1/tour-assignments/create': lambda i, rows, t: ('/api/v1/tour-assignments/create', {
+        'tour_id': random.randrange(1, rows + 1), 'guide_id': 5 * random.randrange(1, rows // 5 + 1),
+        'assignment_date': '2026-07-01'}),
+    'PUT /api/v1/tour-assignments/edit/<int:id>': lambda i, rows, t: (
+        f'/api/v1/tour-assignments/edit/{random.randrange(1, rows + 1)}', {'assignment_date': '2026-08-01'}),
+}
+
+# Deletes walk down from the top of the seeded id range, one row per request.
+DELETE_PREFIXES = ('/api/v1/users/delete', '/api/v1/customer/delete', '/api/v1/tour-guides/delete',
+                   '/api/v1/tours/delete', '/api/v1/accommodations/delete', '/api/v1/bookings/delete',
+                   '/api/v1/payments/delete', '/api/v1/tour-assignments/delete')
+
+
+def plan_routes(app, rows):
+    """[(key, make_request)] for every route we can drive, plus skipped keys."""
+    planned, skipped = [], []
+    delete_ids = itertools.count(rows, -1)
+    delete_lock = threading.Lock()
+
+    def next_delete_id():
+        with delete_lock:
+            return next(delete_ids)
+
+    for rule in sorted(app.url_map.iter_rules(), key=lambda r: r.rule):
+        if rule.endpoint == 'static':
+            continue
+        for method in sorted(rule.methods - {'HEAD', 'OPTIONS', 'PATCH'}):
+            key = route_key(method, rule.rule)
+            if method == 'GET':
+                def make(i, rows, tokens, rule=rule):
+                    path = rule.rule.replace('<int:id>', str(random.randrange(1, rows + 1)))
+                    query = GET_QUERY_STRINGS.get(rule.rule)
+                    return (f'{path}?{query}' if query else path), None
+            elif key in WRITES:
+                make = WRITES[key]
+            elif method == 'DELETE' and rule.rule.rsplit('/', 1)[0] in DELETE_PREFIXES:
+                def make(i, rows, tokens, rule=rule):
+                    # Bookings/payments/tours near the top also anchor other rows; deleting
+                    # them is fine for SQLite, which does not enforce foreign keys here.
+                    return rule.rule.replace('<int:id>', str(next_delete_id())), None
+            else:
+                skipped.append(key)
+                continue
+            planned.append((key, method, make))
+    return planned, skipped
+
+
+# Running
+
+_queries = re.compile(r'desc="(\d+) queries"')
+_db_ms = re.compile(r'\bdb;dur=([\d.]+)')
+
+
+def rss_mb():
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def run_route(app, key, method, make, rows, requests, concurrency, tokens):
+    counter = itertools.count()
+    samples = []
+    lock = threading.Lock()
+
+    def worker():
+        client = app.test_client()
+        local = []
+        while (i := next(counter)) < requests:
+            path, body, *headers = make(i, rows, tokens)
+            if headers:
+                headers = headers[0]
+            elif key.endswith('/refresh'):
+                headers = tokens['refresh']
+            elif key.endswith('/logout'):
+                headers = tokens['as_user'](1, 'admin')
+            else:
+                headers = tokens['admin']
+            started = time.perf_counter()
+            response = client.open(path, method=method, json=body, headers=headers)
+            elapsed = (time.perf_counter() - started) * 1000
+            timing = response.headers.get('Server-Timing', '')
+            queries = _queries.search(timing)
+            db_ms = _db_ms.search(timing)
+            local.append((elapsed, response.status_code,
+                          int(queries.group(1)) if queries else None, float(db_ms.group(1)) if db_ms else None))
+            response.close()
+        with lock:
+            samples.extend(local)
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+
+    latencies = sorted(sample[0] for sample in samples)
+    cuts = quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+    queries = [sample[2] for sample in samples if sample[2] is not None]
+    db_times = [sample[3] for sample in samples if sample[3] is not None]
+    return {
+        'requests': len(samples),
+        'p50_ms': round(cuts[49], 3),
+        'p95_ms': round(cuts[94], 3),
+        'p99_ms': round(cuts[98], 3),
+        'mean_ms': round(mean(latencies), 3),
+        'queries_per_request': round(mean(queries), 2) if queries else None,
+        'max_queries': max(queries) if queries else None,
+        'db_ms_mean': round(mean(db_times), 3) if db_times else None,
+        'status_codes': dict(sorted(Counter(str(sample[1]) for sample in samples).items())),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline_path, threshold):
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)['routes']
+    regressions = []
+    for key, stats in report['routes'].items():
+        before = baseline.get(key)
+        if not before:
+            continue
+        for metric in ('p95_ms', 'queries_per_request'):
+            old, new = before.get(metric), stats.get(metric)
+            if old and new and new > old * (1 + threshold) and new - old > 1:  # ignore sub-millisecond jitter
+                regressions.append(f'{key}: {metric} {old} -> {new}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=parse_rows, default=parse_rows('10k'), help='rows per table (10k, 100k, 1m)')
+    parser.add_argument('--requests', type=int, default=200, help='requests per route')
+    parser.add_argument('--concurrency', type=int, default=8, help='client threads per route')
+    parser.add_argument('--db', help='SQLite file to seed/reuse (default: temp dir, per row count)')
+    parser.add_argument('--reseed', action='store_true', help='rebuild the database even if it exists')
+    parser.add_argument('--only', help='regex; only run routes whose "METHOD /rule" matches')
+    parser.add_argument('--out', default=None, help='report path (default: bench_report_<rows>.json)')
+    parser.add_argument('--compare', help='baseline report; exit 1 if p95 or queries/request regress')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed relative regression (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    db_path = os.path.abspath(args.db or os.path.join(tempfile.gettempdir(), f'bench_{args.rows}.db'))
+    if args.reseed and os.path.exists(db_path):
+        os.remove(db_path)
+    configure(db_path)
+
+    from flask_jwt_extended import create_access_token, create_refresh_token
+
+    from app import create_app
+
+    app = create_app(lazy=False)
+    random.seed(7)
+    with app.app_context():
+        if needs_seeding(db_path):
+            print(f'Seeding {db_path} with {args.rows} rows per table', flush=True)
+            seed(args.rows)
+
+        admin_claims = {'user_type': 'admin'}
+        tokens = {
+            'admin': {'Authorization': 'Bearer ' + create_access_token(identity='1', additional_claims=admin_claims)},
+            'refresh': {'Authorization': 'Bearer ' + create_refresh_token(identity='1', additional_claims=admin_claims)},
+        }
+
+    def as_user(user_id, user_type):
+        with app.app_context():
+            token = create_access_token(identity=str(user_id), additional_claims={'user_type': user_type})
+        return {'Authorization': 'Bearer ' + token}
+    tokens['as_user'] = as_user
+
+    planned, skipped = plan_routes(app, args.rows)
+    if args.only:
+        planned = [route for route in planned if re.search(args.only, route[0])]
+    # Reads first, then creates/edits, and deletes last so they don't starve the others of rows.
+    order = {'GET': 0, 'POST': 1, 'PUT': 1, 'DELETE': 2}
+    planned.sort(key=lambda route: order.get(route[1], 1))
+
+    report = {
+        'meta': {
+            'rows_per_table': args.rows,
+            'requests_per_route': args.requests,
+            'concurrency': args.concurrency,
+            'database': db_path,
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+        },
+        'rss_mb': {'before': rss_mb()},
+        'routes': {},
+        'skipped': skipped,
+    }
+    print(f'{"route":<52}{"p50":>9}{"p95":>9}{"p99":>9}{"q/req":>7}  status')
+    for key, method, make in planned:
+        stats = run_route(app, key, method, make, args.rows, args.requests, args.concurrency, tokens)
+        report['routes'][key] = stats
+        codes = ' '.join(f'{code}x{count}' for code, count in stats['status_codes'].items())
+        print(f'{key:<52}{stats["p50_ms"]:>9.2f}{stats["p95_ms"]:>9.2f}{stats["p99_ms"]:>9.2f}'
+              f'{stats["queries_per_request"] or 0:>7.1f}  {codes}', flush=True)
+    report['rss_mb'].update(after=rss_mb(), peak=peak_rss_mb())
+
+    out = args.out or f'bench_report_{args.rows}.json'
+    with open(out, 'w') as report_file:
+        json.dump(report, report_file, indent=2)
+    print(f'\nReport written to {out}; skipped: {", ".join(skipped) or "none"}')
+
+    if args.compare:
+        regressions = compare(report, args.compare, args.threshold)
+        for line in regressions:
+            print('REGRESSION', line)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""Request throughput while bcrypt hashes run in the same worker process.
+
+Client threads hammer a cheap endpoint while hashing threads keep hashing
+passwords, first inline on their own threads (the old update_user
+behaviour) and then through the process pool in app.passwords. The
+baseline row has no hashing at all.
+
+Run from the repo root:
+
+    python -m benchmarks.password_hashing_bench [seconds] [rounds]
+"""
+import sys
+import threading
+import time
+from statistics import quantiles
+
+import config
+
+config.Config.SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+from app import create_app  # noqa: E402
+from app.passwords import hasher  # noqa: E402
+
+CLIENT_THREADS = 4
+HASH_THREADS = 2
+
+
+def run(app, seconds, workers, hashing):
+    hasher.workers = workers
+    stop = threading.Event()
+    latencies = []
+    hashes = [0]
+    lock = threading.Lock()
+
+    def client():
+        http = app.test_client()
+        local = []
+        while not stop.is_set():
+            start = time.perf_counter()
+            http.get('/')
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    def hash_loop():
+        while not stop.is_set():
+            hasher.hash('correct horse battery staple')
+            with lock:
+                hashes[0] += 1
+
+    threads = [threading.Thread(target=client) for _ in range(CLIENT_THREADS)]
+    if hashing:
+        threads += [threading.Thread(target=hash_loop) for _ in range(HASH_THREADS)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    p99 = quantiles(latencies, n=100)[98] * 1000
+    return len(latencies) / seconds, p99, hashes[0] / seconds
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    app = create_app(lazy=False)
+    hasher.rounds = int(sys.argv[2]) if len(sys.argv) > 2 else app.config['PASSWORD_HASH_ROUNDS']
+    pool_workers = app.config['PASSWORD_HASH_WORKERS'] or 2
+    hasher.hash('warm up the pool')
+
+    print(f'{seconds:.0f}s per run, bcrypt cost {hasher.rounds}, '
+          f'{CLIENT_THREADS} client threads, {HASH_THREADS} hashing threads')
+    print(f'{"mode":<24}{"req/s":>10}{"p99 ms":>10}{"hashes/s":>10}')
+    for label, workers, hashing in (
+        ('no hashing', 0, False),
+        ('inline hashing', 0, True),
+        (f'process pool ({pool_workers})', pool_workers, True),
+    ):
+        rps, p99, hps = run(app, seconds, workers, hashing)
+        print(f'{label:<24}{rps:>10.0f}{p99:>10.2f}{hps:>10.1f}')
+    hasher.shutdown()
+
+
+if __name__ == '__main__':
+    main()
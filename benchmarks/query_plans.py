@@ -0,0 +1,144 @@
+"""Fail if any hot query plans a full table scan.
+
+Calls each list/detail endpoint through the test client, captures every
+SELECT it runs, and asks SQLite for the plan (EXPLAIN QUERY PLAN) with the
+same parameters. A plan step "SCAN <table>" that is not walking an index
+is a full table scan; the script lists every plan and exits 1 if it finds
+one. Direct access paths that no endpoint exercises yet (ownership
+lookups, seat totals) are checked the same way.
+
+Run from the repo root after changing models or queries:
+
+    python -m benchmarks.query_plans
+"""
+import re
+import sys
+from datetime import date, datetime
+
+import config
+
+config.Config.SQLALCHEMY_DATABASE_URI = 'sqlite://'
+config.Config.JWT_SECRET_KEY = 'query-plans-secret-key-for-local-runs'
+
+from flask_jwt_extended import create_access_token  # noqa: E402
+from sqlalchemy import event, func, select, text  # noqa: E402
+
+from app import create_app  # noqa: E402
+from app.availability import INACTIVE_BOOKING_STATUSES  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models.booking import Booking  # noqa: E402
+from app.models.payments import Payment  # noqa: E402
+from app.models.tour_assignment import TourAssignment  # noqa: E402
+from app.pagination import encode_cursor  # noqa: E402
+from app.scheduling import _overlapping  # noqa: E402
+
+ID_PAGE = encode_cursor([100])
+DATE_PAGE = encode_cursor([datetime(2026, 1, 1).isoformat(), 100])
+
+ENDPOINTS = (
+    '/api/v1/users/?after=' + ID_PAGE,
+    '/api/v1/users/?sort=created_at&after=' + DATE_PAGE,
+    '/api/v1/users/guides?after=' + ID_PAGE,
+    '/api/v1/users/guides?sort=created_at&after=' + DATE_PAGE,
+    '/api/v1/users/user/1',
+    '/api/v1/users/search?query=jo&role=guide',
+    '/api/v1/users/search?query=jo+ka&after=' + encode_cursor(['ka', 'kamu', 100]),
+    '/api/v1/customer/?after=' + ID_PAGE,
+    '/api/v1/customer/?sort=created_at&after=' + DATE_PAGE,
+    '/api/v1/tour-guides/?after=' + ID_PAGE,
+    '/api/v1/tours/?after=' + ID_PAGE,
+    '/api/v1/tours/?sort=created_at',
+    '/api/v1/tours/1',
+    '/api/v1/tours/availability?from=2026-01-01&to=2026-02-01&people=2',
+    '/api/v1/tours/availability?from=2026-01-01&people=2&after=' + encode_cursor(['2026-01-05', 100]),
+    '/api/v1/bookings/?after=' + ID_PAGE,
+    '/api/v1/bookings/1',
+    '/api/v1/payments/?after=' + ID_PAGE,
+    '/api/v1/payments/1',
+    '/api/v1/payments/revenue?from=2026-01-01&to=2026-01-31',
+    '/api/v1/tour-assignments/?after=' + ID_PAGE,
+    '/api/v1/tour-assignments/free-guides?from=2026-01-01&to=2026-01-07&after=' + ID_PAGE,
+    '/api/v1/accommodations/?after=' + ID_PAGE,
+)
+
+
+def access_paths():
+    seat_total = (
+        select(func.sum(Booking.number_of_people))
+        .where(Booking.tour_id == 1)
+        .where(Booking.status.notin_(INACTIVE_BOOKING_STATUSES))
+    )
+    return {
+        "a user's bookings": select(Booking).where(Booking.user_id == 1).order_by(Booking.id).limit(51),
+        "a user's payments": select(Payment).where(Payment.user_id == 1).order_by(Payment.id).limit(51),
+        "a booking's payments": select(Payment).where(Payment.booking_id == 1, Payment.status == 'paid'),
+        "a guide's assignments": select(TourAssignment).where(TourAssignment.guide_id == 1),
+        "a guide's clashing assignments": select(TourAssignment).where(
+            TourAssignment.guide_id == 1, *_overlapping(date(2026, 1, 1), date(2026, 1, 7))),
+        "a tour's seat total": seat_total,
+    }
+
+
+# "SCAN tour" is a full scan; "SCAN tour USING INDEX ..." walks an index.
+_full_scan = re.compile(r'^SCAN (\w+)( LEFT-JOIN)?$')
+
+
+def plan(connection, statement, parameters):
+    rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+    return [row[-1] for row in rows]
+
+
+def main():
+    app = create_app(lazy=False)
+    app.config['TESTING'] = True
+    captured = []
+
+    with app.app_context():
+        db.create_all(bind_key=None)
+        engine = db.engine
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith('SELECT') and not statement.startswith('EXPLAIN'):
+                captured.append((statement, parameters))
+
+        headers = {'Authorization': 'Bearer ' + create_access_token(
+            identity='1', additional_claims={'user_type': 'admin'})}
+        client = app.test_client()
+        checks = []
+        for url in ENDPOINTS:
+            captured.clear()
+            response = client.get(url, headers=headers)
+            if response.status_code >= 500:
+                checks.append((url, None, [f'HTTP {response.status_code}: {response.get_json()}']))
+            for statement, parameters in captured:
+                checks.append((url, statement, parameters))
+        captured.clear()
+        for label, stmt in access_paths().items():
+            compiled = stmt.compile(engine, compile_kwargs={'literal_binds': True})
+            checks.append((label, str(compiled), ()))
+
+        event.remove(engine, 'before_cursor_execute', capture)
+        tables = set(db.metadata.tables)  # subquery scans (anon_1, ...) are fine
+        failures = 0
+        with engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+            for label, statement, parameters in checks:
+                if statement is None:
+                    print(f'ERROR {label}: {parameters[0]}')
+                    failures += 1
+                    continue
+                steps = plan(connection, statement, parameters)
+                scans = [step for step in steps
+                         if (match := _full_scan.search(step)) and match.group(1) in tables]
+                failures += bool(scans)
+                print(f'{"FULL SCAN" if scans else "ok":<10}{label}')
+                for step in steps:
+                    print(f'{"":<12}{step}')
+
+    print(f'\n{failures} quer{"y" if failures == 1 else "ies"} with full table scans or errors')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
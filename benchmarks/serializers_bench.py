@@ -0,0 +1,79 @@
+"""Per-row cost of the declarative serializers vs the old hand-built loops.
+
+The serializer rows already hold ISO date strings while the legacy rows
+leave datetimes for the JSON encoder, so compare the "+ json" lines for
+the real end-to-end cost.
+
+Run from the repo root:
+
+    python -m benchmarks.serializers_bench [rows]
+"""
+import json
+import sys
+import timeit
+from datetime import datetime
+
+from app.models.users import User
+from app.serializers import json_default, user_list_serializer
+
+
+def make_users(count):
+    now = datetime.now()
+    users = []
+    for i in range(count):
+        user = User(
+            first_name=f'First{i}', last_name=f'Last{i}', email=f'user{i}@example.com',
+            contact=f'+2567{i:08d}', password='x', biography='bio', user_type='guide'
+        )
+        user.id = i + 1
+        user.languages = 'en'
+        user.created_at = now
+        users.append(user)
+    return users
+
+
+def legacy_loop(users):
+    # What get_all_users used to do for every row.
+    data = []
+    for user in users:
+        data.append({
+            'id': user.id,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'username': user.get_full_name(),
+            'email': user.email,
+            'contact': user.contact,
+            'role': user.user_type,
+            'languages': user.languages,
+            'created_at': user.created_at
+        })
+    return data
+
+
+def flask_default(value):
+    # Flask's default provider formats datetimes through http_date().
+    from werkzeug.http import http_date
+    if isinstance(value, datetime):
+        return http_date(value)
+    raise TypeError
+
+
+def main(count):
+    users = make_users(count)
+    runs = 20
+
+    cases = {
+        'legacy loop': lambda: legacy_loop(users),
+        'serializer': lambda: user_list_serializer.many(users),
+        'legacy loop + json': lambda: json.dumps(legacy_loop(users), default=flask_default),
+        'serializer + json': lambda: json.dumps(user_list_serializer.many(users), default=json_default),
+    }
+
+    print(f'{count} rows, best of {runs} runs')
+    for name, fn in cases.items():
+        best = min(timeit.repeat(fn, number=1, repeat=runs))
+        print(f'  {name:<22} {best * 1e3:8.2f} ms  {best / count * 1e9:8.0f} ns/row')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,122 @@
+"""Cold-start time of create_app, eager and lazy, against a budget.
+
+Starts fresh interpreters that import the app, call create_app() and serve
+one request, and reports the median boot and first-request times for both
+modes (see app/blueprints.py). It then prints where import time goes
+(python -X importtime, summed per package) and checks the blueprint manifest
+against what the controllers define. Exits 1 if a median boot time is over
+its budget or the manifest is stale.
+
+Run from the repo root after adding imports to app/ or new blueprints:
+
+    python -m benchmarks.startup_time
+    python -m benchmarks.startup_time --runs 10 --lazy-budget-ms 800
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import Counter
+from statistics import median
+
+PROBE = '''
+import json, time
+start = time.perf_counter()
+import config
+config.Config.SQLALCHEMY_DATABASE_URI = 'sqlite://'
+from app import create_app
+app = create_app(lazy={lazy})
+booted = time.perf_counter()
+if {serve}:
+    app.test_client().get('/')
+served = time.perf_counter()
+print(json.dumps({{'boot_ms': (booted - start) * 1000, 'first_request_ms': (served - booted) * 1000}}))
+'''
+
+_importtime = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$')
+
+
+def run_probe(lazy, importtime=False):
+    # The import report covers boot only, so it skips the request.
+    probe = PROBE.format(lazy=lazy, serve=not importtime)
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', probe]
+    result = subprocess.run(command, capture_output=True, text=True, cwd=os.getcwd(), check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def package_of(module):
+    parts = module.split('.')
+    return '.'.join(parts[:2]) if parts[0] == 'app' else parts[0]
+
+
+def import_report(stderr, top):
+    by_package = Counter()
+    for line in stderr.splitlines():
+        match = _importtime.match(line)
+        if match:
+            by_package[package_of(match.group(4))] += int(match.group(1))
+    total = sum(by_package.values())
+    print(f'  {"package":<32}{"self ms":>9}{"share":>8}')
+    for package, micros in by_package.most_common(top):
+        print(f'  {package:<32}{micros / 1000:>9.1f}{micros / total:>8.1%}')
+    print(f'  {"total":<32}{total / 1000:>9.1f}')
+
+
+def check_manifest():
+    """Problems with app/blueprints.py's lists, compared with an eager app."""
+    import config
+    config.Config.SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    from app import create_app
+    from app.blueprints import BLUEPRINT_COMMANDS
+
+    eager = create_app(lazy=False)
+    lazy = create_app(lazy=True)
+    lazy.test_client().get('/')
+
+    problems = []
+    with_commands = sorted(name for name, blueprint in eager.blueprints.items() if blueprint.cli.commands)
+    if with_commands != sorted(BLUEPRINT_COMMANDS):
+        problems.append(f'BLUEPRINT_COMMANDS should be {tuple(with_commands)}')
+    eager_rules = sorted((rule.rule, rule.endpoint) for rule in eager.url_map.iter_rules())
+    lazy_rules = sorted((rule.rule, rule.endpoint) for rule in lazy.url_map.iter_rules())
+    if eager_rules != lazy_rules:
+        problems.append('lazy and eager apps register different routes')
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters per mode')
+    parser.add_argument('--eager-budget-ms', type=float, default=1500, help='median eager boot budget')
+    parser.add_argument('--lazy-budget-ms', type=float, default=1000, help='median lazy boot budget')
+    parser.add_argument('--top', type=int, default=15, help='packages to list in the import report')
+    args = parser.parse_args()
+
+    budgets = {'eager': args.eager_budget_ms, 'lazy': args.lazy_budget_ms}
+    failures = 0
+    print(f'{"mode":<8}{"boot p50":>10}{"first req p50":>15}{"budget":>9}')
+    for mode in ('eager', 'lazy'):
+        samples = [run_probe(mode == 'lazy')[0] for _ in range(args.runs)]
+        boot = median(sample['boot_ms'] for sample in samples)
+        first = median(sample['first_request_ms'] for sample in samples)
+        over = boot > budgets[mode]
+        failures += over
+        print(f'{mode:<8}{boot:>8.0f}ms{first:>13.0f}ms{budgets[mode]:>7.0f}ms{"  OVER BUDGET" if over else ""}')
+
+    for mode in ('eager', 'lazy'):
+        print(f'\nImport time by package ({mode} boot):')
+        import_report(run_probe(mode == 'lazy', importtime=True)[1], args.top)
+
+    problems = check_manifest()
+    for problem in problems:
+        print('MANIFEST', problem)
+    failures += len(problems)
+
+    print(f'\n{failures} problem{"" if failures == 1 else "s"}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
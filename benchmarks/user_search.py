@@ -0,0 +1,126 @@
+"""Latency of the indexed user search at a realistic size.
+
+Seeds a users table with generated first and last names (plus the
+user_search_token index), then times app.search.search_user_ids for the
+queries a type-ahead sends: single letters on the first keystroke, longer
+prefixes, whole names, two-term queries and role-filtered variants, both the
+first page and the page after it.
+
+Exits 1 if any query's p95 is over --budget-ms (20 ms by default).
+
+Run from the repo root:
+
+    python -m benchmarks.user_search
+    python -m benchmarks.user_search --users 1m
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from statistics import median, quantiles
+
+import config
+from benchmarks.endpoints_bench import SEED_BATCH, configure, mark_seeded, needs_seeding, parse_rows
+
+FIRST_NAMES = (
+    'Aaron', 'Abigail', 'Adam', 'Agnes', 'Alice', 'Amina', 'Amos', 'Andrew', 'Angela', 'Ann', 'Anna', 'Arthur',
+    'Brian', 'Brenda', 'Charles', 'Christine', 'Daniel', 'David', 'Dorothy', 'Edward', 'Elizabeth', 'Emmanuel',
+    'Esther', 'Faith', 'Francis', 'Grace', 'Hannah', 'Henry', 'Isaac', 'Jacob', 'James', 'Jane', 'Joan', 'John',
+    'Johnson', 'Jonathan', 'Joseph', 'Joy', 'Julius', 'Kevin', 'Lydia', 'Margaret', 'Maria', 'Mark', 'Martha',
+    'Mary', 'Michael', 'Moses', 'Nancy', 'Patrick', 'Paul', 'Peter', 'Phillip', 'Rachel', 'Robert', 'Ruth',
+    'Samuel', 'Sarah', 'Simon', 'Stephen', 'Susan', 'Timothy', 'Victoria', 'William',
+)
+SYLLABLES = ('ka', 'mu', 'na', 'se', 'bi', 'to', 'lu', 'ga', 'wa', 'ki', 'ny', 'ama', 'oke', 'ru', 'zi', 'be',
+             'smi', 'th', 'son', 'jo', 'an', 'el', 'di', 'ma', 'ri', 'ye', 'ol', 'ng')
+QUERIES = ('a', 'j', 'jo', 'joh', 'john', 'mar', 'ka', 'kamu', 'smith', 'jo ka', 'john smi', 'a b', 'mary na')
+PAGE_SIZE = 20
+
+
+def seed(users):
+    from sqlalchemy import insert
+
+    from app.extensions import db
+    from app.models.users import User
+    from app.search import rebuild_user_index
+
+    rng = random.Random(42)
+    last_names = sorted({''.join(rng.choices(SYLLABLES, k=rng.randrange(2, 4))).capitalize() for _ in range(20000)})
+
+    def user(i):
+        return {'id': i, 'first_name': rng.choice(FIRST_NAMES), 'last_name': rng.choice(last_names),
+                'email': f'user{i}@bench.test', 'contact': f'+2567{i:08d}', 'password': 'x',
+                'biography': '', 'user_type': 'guide' if i % 20 == 0 else 'customer'}
+
+    db.create_all(bind_key=None)
+    for start in range(1, users + 1, SEED_BATCH):
+        db.session.execute(insert(User.__table__), [user(i) for i in range(start, min(start + SEED_BATCH, users + 1))])
+    db.session.commit()
+    started = time.perf_counter()
+    rebuild_user_index()
+    print(f'  indexed names in {time.perf_counter() - started:.1f}s', flush=True)
+    mark_seeded()
+
+
+def measure(query, role, runs):
+    from app.pagination import decode_cursor
+    from app.search import search_user_ids
+
+    first, second, found = [], [], 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        rows, cursor = search_user_ids(query, role=role, limit=PAGE_SIZE)
+        first.append((time.perf_counter() - start) * 1000)
+        found = len(rows)
+        if cursor:
+            start = time.perf_counter()
+            search_user_ids(query, role=role, limit=PAGE_SIZE, after=decode_cursor(cursor))
+            second.append((time.perf_counter() - start) * 1000)
+    samples = first + second
+    return {
+        'found': found,
+        'p50_ms': median(first),
+        'p95_ms': quantiles(samples, n=20)[18] if len(samples) > 1 else samples[0],
+        'next_p50_ms': median(second) if second else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--users', type=parse_rows, default=parse_rows('1m'), help='users to seed (100k, 1m)')
+    parser.add_argument('--runs', type=int, default=20, help='searches per query')
+    parser.add_argument('--budget-ms', type=float, default=20, help='p95 allowed per query')
+    parser.add_argument('--db', help='SQLite file to seed/reuse (default: temp dir, per size)')
+    args = parser.parse_args()
+
+    db_path = os.path.abspath(args.db or os.path.join(tempfile.gettempdir(), f'bench_search_{args.users}.db'))
+    configure(db_path)
+    config.Config.SQL_PROFILING = False
+
+    from app import create_app
+
+    app = create_app(lazy=False)
+    with app.app_context():
+        if needs_seeding(db_path):
+            print(f'Seeding {db_path} with {args.users} users', flush=True)
+            seed(args.users)
+        results = {(query, role): measure(query, role, args.runs) for query in QUERIES for role in (None, 'guide')}
+
+    print(f'{args.users} users, {PAGE_SIZE} per page')
+    print(f'{"query":<12}{"role":<8}{"found":>6}{"p50":>10}{"p95":>10}{"next p50":>11}')
+    over = []
+    for (query, role), stats in results.items():
+        next_p50 = f'{stats["next_p50_ms"]:>9.2f}ms' if stats['next_p50_ms'] is not None else f'{"-":>11}'
+        print(f'{query!r:<12}{role or "-":<8}{stats["found"]:>6}{stats["p50_ms"]:>8.2f}ms'
+              f'{stats["p95_ms"]:>8.2f}ms{next_p50}')
+        if stats['p95_ms'] > args.budget_ms:
+            over.append(f'{query!r} role={role}: p95 {stats["p95_ms"]:.1f} ms')
+    if over:
+        print(f'FAILED over the {args.budget_ms:g} ms budget: ' + '; '.join(over))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,65 @@
+import os
+from datetime import timedelta
+
+
 class Config:
     SQLALCHEMY_DATABASE_URI='mysql+pymysql://root:@localhost/'
     JWT_SECRET_KEY = ""
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=15)
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+
+    # Logout / token revocation (app/revocation.py)
+    JWT_REVOCATION_MAX_ENTRIES = 100000  # revoked tokens held in memory per worker
+    JWT_REVOCATION_SYNC_INTERVAL = 5  # seconds between picking up other workers' revocations
+
+    # Register controllers on the first request instead of at start-up (app/blueprints.py)
+    LAZY_BLUEPRINTS = os.environ.get('LAZY_BLUEPRINTS', '0') in ('1', 'true', 'True')
+
+    # Connection pool (app/pool.py), overridable from the environment
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))  # seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))  # keep below MySQL's wait_timeout
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', '1') not in ('0', 'false', 'False')
+
+    # Read replicas (app/replicas.py): comma-separated URIs, GET requests read from them
+    SQLALCHEMY_REPLICA_URIS = [uri for uri in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if uri]
+    DB_REPLICA_HEALTH_INTERVAL = 5  # seconds between health checks of a replica
+    DB_READ_PRIMARY_WINDOW = 5  # seconds a client reads from the primary after writing
+
+    # ASGI serving mode (app/asgi.py); unset derives it from SQLALCHEMY_DATABASE_URI
+    SQLALCHEMY_ASYNC_DATABASE_URI = os.environ.get('DATABASE_ASYNC_URL')
+
+    # Password hashing (app/passwords.py)
+    PASSWORD_HASH_ROUNDS = int(os.environ.get('PASSWORD_HASH_ROUNDS', 12))  # bcrypt cost; changing it rehashes on login
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))  # 0 hashes on the request thread
+    PASSWORD_HASH_QUEUE = 4  # in-flight hashes allowed per worker process
+    PASSWORD_HASH_TIMEOUT = 10  # seconds to wait for a slot before answering 503
+    PASSWORD_HASH_NICE = 10  # hashing processes yield the CPU to request threads
+
+    # Server-Timing headers and slow-query log (app/profiling.py)
+    SQL_PROFILING = os.environ.get('SQL_PROFILING', '0') in ('1', 'true', 'True')
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 200))
+
+    # Idempotency-Key support on create endpoints (app/idempotency.py)
+    IDEMPOTENCY_KEY_TTL = 24 * 60 * 60  # seconds a key and its stored response are kept
+    IDEMPOTENCY_LOCK_TIMEOUT = 120  # seconds after which a claim that never committed counts as abandoned
+
+    # Image uploads (app/images.py)
+    IMAGE_STORAGE_DIR = os.environ.get('IMAGE_STORAGE_DIR', 'uploads/images')  # relative to the repo root
+    IMAGE_MAX_BYTES = 10 * 1024 * 1024
+    # Largest request body Werkzeug reads, counted as it reads, so chunked uploads
+    # without a Content-Length are cut off too: an image plus multipart boundaries and part headers
+    MAX_CONTENT_LENGTH = IMAGE_MAX_BYTES + 64 * 1024
+    IMAGE_THUMBNAIL_SIZES = (128, 512)  # longest side in pixels; listings show the smallest
+    IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', 1))  # thumbnail processes; 0 makes them inline
+    IMAGE_THUMBNAIL_QUEUE = 16  # images queued per thumbnail process before new jobs are dropped
+    IMAGE_NICE = 10  # thumbnail processes yield the CPU to request threads
+    IMAGE_CACHE_MAX_AGE = 365 * 24 * 60 * 60  # seconds; stored files never change
+
+    # In-process tour catalog cache (app/cache.py)
+    TOUR_CACHE_MAX_ENTRIES = 1024
+    TOUR_CACHE_TTL = 300  # seconds
 
 
     #Config is for storing configuration settings for the application
\ No newline at end of file
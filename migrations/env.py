@@ -104,7 +104,7 @@ def run_migrations_online():
         )
 
         with context.begin_transaction():
-            context.run_migrations(schema=None)
+            context.run_migrations()
 
 
 
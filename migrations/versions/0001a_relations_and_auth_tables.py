@@ -0,0 +1,153 @@
+"""relations and auth tables
+
+What the models gained before migrations were versioned: the owner and
+relationship columns (users.languages/experience_years, tour.user_id and
+seats_booked, the booking, payment, accommodation and assignment foreign
+keys, payment.status), lengths on the unbounded accomodation.type and
+customer.status, and the revoked_token and user_search_token tables.
+
+Columns, tables and indexes that already exist are skipped, so a database
+upgraded from an earlier copy of 0001 that already had them upgrades too
+(losing that copy's revoked_token.user_id foreign key).
+Existing users are not in the search index until `flask users
+reindex-search` runs.
+
+Revision ID: 0001a
+Revises: 0001
+Create Date: 2026-10-18 09:05:12.318420
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001a'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+# (table, column, referenced table) for the relationship columns
+FOREIGN_KEYS = (
+    ('accomodation', 'user_id', 'users'),
+    ('tour', 'user_id', 'users'),
+    ('customer', 'user_id', 'users'),
+    ('customer', 'accommodation_id', 'accomodation'),
+    ('customer', 'tour_id', 'tour'),
+    ('tour_assignment', 'tour_id', 'tour'),
+    ('tour_assignment', 'guide_id', 'users'),
+    ('payment', 'user_id', 'users'),
+    ('payment', 'booking_id', 'customer'),
+)
+
+
+# Names batch mode gives reflected foreign keys that have none (SQLite), as _fk_name does
+REFLECTED_FK_NAMES = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+
+def _fk_name(table, column, referred):
+    return f'fk_{table}_{column}_{referred}'
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    columns = {table: {column['name'] for column in inspector.get_columns(table)} for table in tables}
+    indexes = {table: {index['name'] for index in inspector.get_indexes(table)} for table in tables}
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        if 'languages' not in columns['users']:
+            batch_op.add_column(sa.Column('languages', sa.String(length=255), nullable=True))
+        if 'experience_years' not in columns['users']:
+            batch_op.add_column(sa.Column('experience_years', sa.Integer(), nullable=True))
+
+    for table in ('accomodation', 'tour', 'customer', 'tour_assignment', 'payment'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for fk_table, column, referred in FOREIGN_KEYS:
+                if fk_table == table and column not in columns[table]:
+                    batch_op.add_column(sa.Column(column, sa.Integer(), nullable=True))
+                    batch_op.create_foreign_key(_fk_name(table, column, referred), referred, [column], ['id'])
+
+            if table == 'accomodation':
+                batch_op.alter_column('type', existing_type=sa.String(), type_=sa.String(length=50),
+                                      existing_nullable=False)
+            elif table == 'customer':
+                batch_op.alter_column('status', existing_type=sa.String(), type_=sa.String(length=50),
+                                      existing_nullable=False)
+            elif table == 'tour':
+                if 'seats_booked' not in columns['tour']:
+                    # Bookings had no tour_id before this revision, so 0 is every tour's total.
+                    batch_op.add_column(sa.Column('seats_booked', sa.Integer(), server_default='0', nullable=False))
+                if 'ix_tour_start_end_date' not in indexes['tour']:
+                    batch_op.create_index('ix_tour_start_end_date', ['start_date', 'end_date'], unique=False)
+            elif table == 'payment' and 'status' not in columns['payment']:
+                # Existing payments become 'pending'; the default is only for them.
+                batch_op.add_column(sa.Column('status', sa.String(length=50), server_default='pending', nullable=False))
+
+    if 'status' not in columns['payment']:
+        with op.batch_alter_table('payment', schema=None) as batch_op:
+            batch_op.alter_column('status', existing_type=sa.String(length=50), server_default=None,
+                                  existing_nullable=False)
+
+    if 'revoked_token' not in tables:
+        op.create_table('revoked_token',
+        sa.Column('jti', sa.String(length=36), nullable=False),
+        sa.Column('token_type', sa.String(length=10), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('revoked_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('jti')
+        )
+        with op.batch_alter_table('revoked_token', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_revoked_token_expires_at'), ['expires_at'], unique=False)
+            batch_op.create_index(batch_op.f('ix_revoked_token_revoked_at'), ['revoked_at'], unique=False)
+    else:
+        # An earlier copy of 0001 made user_id a foreign key; a revocation outlives its user.
+        for fk in inspector.get_foreign_keys('revoked_token'):
+            name = fk['name'] or _fk_name('revoked_token', 'user_id', 'users')  # SQLite: unnamed
+            with op.batch_alter_table('revoked_token', schema=None, naming_convention=REFLECTED_FK_NAMES) as batch_op:
+                batch_op.drop_constraint(name, type_='foreignkey')
+
+    if 'user_search_token' not in tables:
+        op.create_table('user_search_token',
+        sa.Column('token', sa.String(length=50), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('user_type', sa.String(length=20), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('token', 'user_id')
+        )
+        with op.batch_alter_table('user_search_token', schema=None) as batch_op:
+            batch_op.create_index('ix_user_search_token_type_token', ['user_type', 'token', 'user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user_search_token', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_search_token_type_token')
+
+    op.drop_table('user_search_token')
+    with op.batch_alter_table('revoked_token', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_revoked_token_revoked_at'))
+        batch_op.drop_index(batch_op.f('ix_revoked_token_expires_at'))
+
+    op.drop_table('revoked_token')
+    for table in ('payment', 'tour_assignment', 'customer', 'tour', 'accomodation'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            if table == 'payment':
+                batch_op.drop_column('status')
+            elif table == 'customer':
+                batch_op.alter_column('status', existing_type=sa.String(length=50), type_=sa.String(),
+                                      existing_nullable=False)
+            elif table == 'tour':
+                batch_op.drop_index('ix_tour_start_end_date')
+                batch_op.drop_column('seats_booked')
+            elif table == 'accomodation':
+                batch_op.alter_column('type', existing_type=sa.String(length=50), type_=sa.String(),
+                                      existing_nullable=False)
+            for fk_table, column, referred in reversed(FOREIGN_KEYS):
+                if fk_table == table:
+                    batch_op.drop_constraint(_fk_name(table, column, referred), type_='foreignkey')
+                    batch_op.drop_column(column)
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('experience_years')
+        batch_op.drop_column('languages')